@@ -12,7 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
 import datetime
+import hashlib
 import logging
 import re
 from collections.abc import AsyncGenerator
@@ -22,6 +24,7 @@ from google.adk.agents import BaseAgent, LlmAgent, LoopAgent, SequentialAgent
 from google.adk.agents.callback_context import CallbackContext
 from google.adk.agents.invocation_context import InvocationContext
 from google.adk.events import Event, EventActions
+from google.adk.models import LlmResponse
 from google.adk.planners import BuiltInPlanner
 from google.adk.tools import google_search
 from google.adk.tools.agent_tool import AgentTool
@@ -29,6 +32,15 @@ from google.genai import types as genai_types
 from pydantic import BaseModel, Field
 
 from .config import config
+from .context_cache import make_context_cache_callback
+from .fake_llm import resolve_model
+from .model_routing import make_escalation_callback, remember_request_callback
+from .rate_limit import rate_limit_callback
+from .usage import (
+    record_usage_callback,
+    start_model_timer_callback,
+    usage_summary_callback,
+)
 
 
 # --- Structured Output Models ---
@@ -64,15 +76,35 @@ def collect_research_sources_callback(callback_context: CallbackContext) -> None
     (from `grounding_supports`). The aggregated source information and a mapping of URLs to short
     IDs are cumulatively stored in `callback_context.state`.
 
+    Collection is incremental: a cursor (number of processed events and the id of the last
+    one) is kept in state so every call only walks the events added since the previous call.
+    Claims are de-duplicated by (short_id, text segment) through a compact index of claim keys,
+    keeping the highest confidence seen, so repeated calls inside the refinement loop do not
+    re-append the same evidence. New events are ordered by branch before processing, so the
+    ids assigned to sources found by parallel sub-researchers are deterministic.
+
     Args:
         callback_context (CallbackContext): The context object providing access to the agent's
             session events and persistent state.
     """
     session = callback_context._invocation_context.session
+    events = session.events
     url_to_short_id = callback_context.state.get("url_to_short_id", {})
     sources = callback_context.state.get("sources", {})
+    claim_index = callback_context.state.get("source_claim_index", {})
+    cursor = callback_context.state.get("sources_event_cursor", 0)
+    # Rescan from the start if the session no longer matches the cursor (e.g. it was
+    # rewritten); the claim index keeps the rescan from duplicating evidence.
+    if cursor > len(events) or (
+        cursor
+        and events[cursor - 1].id
+        != callback_context.state.get("sources_event_cursor_id")
+    ):
+        cursor = 0
     id_counter = len(url_to_short_id) + 1
-    for event in session.events:
+    # Parallel sub-researchers interleave their events; a stable sort by branch assigns
+    # short ids in task order no matter which sub-researcher finished first.
+    for event in sorted(events[cursor:], key=lambda event: event.branch or ""):
         if not (event.grounding_metadata and event.grounding_metadata.grounding_chunks):
             continue
         chunks_info = {}
@@ -108,7 +140,14 @@ def collect_research_sources_callback(callback_context: CallbackContext) -> None
                             confidence_scores[i] if i < len(confidence_scores) else 0.5
                         )
                         text_segment = support.segment.text if support.segment else ""
-                        sources[short_id]["supported_claims"].append(
+                        claims = sources[short_id]["supported_claims"]
+                        claim_key = f"{short_id}:{hashlib.sha1((text_segment or '').encode('utf-8')).hexdigest()[:16]}"
+                        if claim_key in claim_index:
+                            claim = claims[claim_index[claim_key]]
+                            claim["confidence"] = max(claim["confidence"], confidence)
+                            continue
+                        claim_index[claim_key] = len(claims)
+                        claims.append(
                             {
                                 "text_segment": text_segment,
                                 "confidence": confidence,
@@ -116,6 +155,211 @@ def collect_research_sources_callback(callback_context: CallbackContext) -> None
                         )
     callback_context.state["url_to_short_id"] = url_to_short_id
     callback_context.state["sources"] = sources
+    callback_context.state["source_claim_index"] = claim_index
+    callback_context.state["sources_event_cursor"] = len(events)
+    callback_context.state["sources_event_cursor_id"] = (
+        events[-1].id if events else None
+    )
+
+
+# Long grounding segments add little for the composer beyond their first sentences
+MAX_CLAIM_CHARS = 300
+
+
+def build_citation_table(
+    sources: dict, claims_per_source: int, token_budget: int
+) -> str:
+    """Builds a compact, plain-text citation table from the collected sources.
+
+    Every source gets one line with its short id, title and domain, followed by its
+    highest-confidence claims. When the table would exceed `token_budget` (about 4
+    characters per token), the lowest-ranked claims are dropped first, then whole sources
+    in order of their best claim confidence.
+
+    Args:
+        sources (dict): The `sources` state entry built by `collect_research_sources_callback`.
+        claims_per_source (int): Maximum number of claims listed per source.
+        token_budget (int): Approximate token budget of the whole table.
+
+    Returns:
+        str: One header line per kept source in short id order, claims indented below it.
+    """
+
+    def best_confidence(source: dict) -> float:
+        return max((c["confidence"] for c in source["supported_claims"]), default=0.0)
+
+    ranked = sorted(sources.values(), key=best_confidence, reverse=True)
+    budget = token_budget * 4
+    used = 0
+    headers = {}
+    for source in ranked:
+        title = source.get("title") or source.get("domain") or ""
+        domain = source.get("domain") or ""
+        header = f"{source['short_id']} | {title}" + (
+            f" | {domain}" if domain and domain != title else ""
+        )
+        if used + len(header) + 1 > budget:
+            break
+        headers[source["short_id"]] = header
+        used += len(header) + 1
+
+    kept = [source for source in ranked if source["short_id"] in headers]
+    top_claims = {
+        source["short_id"]: sorted(
+            (c for c in source["supported_claims"] if c.get("text_segment")),
+            key=lambda c: c["confidence"],
+            reverse=True,
+        )[:claims_per_source]
+        for source in kept
+    }
+    lines = {short_id: [] for short_id in headers}
+    # Fill claims breadth-first so every source gets its best claim before any gets a second
+    for rank in range(claims_per_source):
+        for source in kept:
+            claims = top_claims[source["short_id"]]
+            if rank >= len(claims):
+                continue
+            text = " ".join(claims[rank]["text_segment"].split())
+            if len(text) > MAX_CLAIM_CHARS:
+                text = text[: MAX_CLAIM_CHARS - 3].rstrip() + "..."
+            line = f'  - "{text}" ({claims[rank]["confidence"]:.2f})'
+            if used + len(line) + 1 > budget:
+                continue
+            lines[source["short_id"]].append(line)
+            used += len(line) + 1
+
+    def id_number(short_id: str) -> int:
+        return int(short_id.rsplit("-", 1)[-1])
+
+    return "\n".join(
+        "\n".join([headers[short_id], *lines[short_id]])
+        for short_id in sorted(headers, key=id_number)
+    )
+
+
+def build_citation_table_callback(callback_context: CallbackContext) -> None:
+    """Stores a compact citation table for the report composer in `citation_table`.
+
+    The full `sources` entry stays in state for `citation_replacement_callback`; only
+    the composer prompt uses the compact table.
+
+    Args:
+        callback_context (CallbackContext): Provides access to the collected sources.
+    """
+    sources = callback_context.state.get("sources", {})
+    table = build_citation_table(
+        sources, config.citation_claims_per_source, config.citation_table_token_budget
+    )
+    callback_context.state["citation_table"] = table
+    kept = sum(1 for line in table.splitlines() if not line.startswith(" "))
+    logging.info(
+        f"[{callback_context.agent_name}] Citation table: {kept}/{len(sources)} sources, "
+        f"{len(table)} chars (full sources: {len(str(sources))} chars)"
+    )
+
+
+CITE_TAG_PATTERN = re.compile(r'<cite\s+source\s*=\s*["\']?\s*(src-\d+)\s*["\']?\s*/>')
+
+# Longest text held back while waiting for a possible citation tag to close
+MAX_PENDING_TAG_CHARS = 80
+
+
+def format_citation(short_id: str, sources: dict) -> str:
+    """Returns the Markdown link for a source id, or "" for an unknown id.
+
+    Args:
+        short_id (str): Source id such as "src-3".
+        sources (dict): The `sources` state entry.
+
+    Returns:
+        str: The link, preceded by a space.
+    """
+    if not (source_info := sources.get(short_id)):
+        return ""
+    display_text = source_info.get("title", source_info.get("domain", short_id))
+    return f" [{display_text}]({source_info['url']})"
+
+
+class CiteTagStreamResolver:
+    """Replaces `<cite source="src-N"/>` tags with links in a stream of text chunks.
+
+    Text from an unclosed `<` onwards is held back until the tag closes (or grows
+    too long to be one), so a tag split across chunks is still resolved.
+    """
+
+    def __init__(self, sources: dict, pending: str = ""):
+        self.sources = sources
+        self._buffer = pending
+
+    @property
+    def pending(self) -> str:
+        """Text held back until a later chunk shows whether it is a tag."""
+        return self._buffer
+
+    def feed(self, chunk: str) -> str:
+        """Adds a chunk and returns the text that is now safe to emit.
+
+        Args:
+            chunk (str): The next piece of streamed text.
+
+        Returns:
+            str: Resolved text; may be empty while a tag is pending.
+        """
+        self._buffer += chunk
+        hold = self._buffer.rfind("<")
+        if (
+            hold == -1
+            or ">" in self._buffer[hold:]
+            or len(self._buffer) - hold > MAX_PENDING_TAG_CHARS
+        ):
+            hold = len(self._buffer)
+        ready, self._buffer = self._buffer[:hold], self._buffer[hold:]
+        return CITE_TAG_PATTERN.sub(
+            lambda match: format_citation(match.group(1), self.sources), ready
+        )
+
+
+# State key of the text a streaming report composition holds back. "temp:" keys only
+# live for the invocation, so a stream that errors or is cancelled leaves nothing behind.
+CITATION_STREAM_KEY = "temp:citation_stream_pending"
+
+
+def stream_citations_callback(
+    callback_context: CallbackContext, llm_response: LlmResponse
+) -> LlmResponse | None:
+    """Resolves citation tags in the partial responses streamed by the report composer.
+
+    Partial events then show readable links while the report is still being written.
+    The final response is left untouched: `output_key` keeps the tagged report and
+    `citation_replacement_callback` resolves it once it is complete.
+
+    Args:
+        callback_context (CallbackContext): Provides access to the collected sources.
+        llm_response (LlmResponse): A partial or final model response.
+
+    Returns:
+        LlmResponse | None: The partial response with resolved text, or None to keep
+            the response as is.
+    """
+    if not llm_response.partial:
+        callback_context.state[CITATION_STREAM_KEY] = None
+        return None
+    if not (llm_response.content and llm_response.content.parts):
+        return None
+    resolver = CiteTagStreamResolver(
+        callback_context.state.get("sources", {}),
+        callback_context.state.get(CITATION_STREAM_KEY) or "",
+    )
+    parts = [
+        part.model_copy(update={"text": resolver.feed(part.text)})
+        if part.text and not part.thought
+        else part
+        for part in llm_response.content.parts
+    ]
+    callback_context.state[CITATION_STREAM_KEY] = resolver.pending
+    return llm_response.model_copy(
+        update={"content": llm_response.content.model_copy(update={"parts": parts})}
+    )
 
 
 def citation_replacement_callback(
@@ -137,18 +381,11 @@ def citation_replacement_callback(
     sources = callback_context.state.get("sources", {})
 
     def tag_replacer(match: re.Match) -> str:
-        short_id = match.group(1)
-        if not (source_info := sources.get(short_id)):
+        if not (citation := format_citation(match.group(1), sources)):
             logging.warning(f"Invalid citation tag found and removed: {match.group(0)}")
-            return ""
-        display_text = source_info.get("title", source_info.get("domain", short_id))
-        return f" [{display_text}]({source_info['url']})"
-
-    processed_report = re.sub(
-        r'<cite\s+source\s*=\s*["\']?\s*(src-\d+)\s*["\']?\s*/>',
-        tag_replacer,
-        final_report,
-    )
+        return citation
+
+    processed_report = CITE_TAG_PATTERN.sub(tag_replacer, final_report)
     processed_report = re.sub(r"\s+([.,;:])", r"\1", processed_report)
     callback_context.state["final_report_with_citations"] = processed_report
     return genai_types.Content(parts=[genai_types.Part(text=processed_report)])
@@ -178,17 +415,322 @@ class EscalationChecker(BaseAgent):
             yield Event(author=self.name)
 
 
-# --- AGENT DEFINITIONS ---
-plan_generator = LlmAgent(
-    model=config.worker_model,
-    name="plan_generator",
-    description="Generates or refine the existing 5 line action-oriented research plan, using minimal search only for topic clarification.",
-    instruction=f"""
-    You are a research strategist. Your job is to create a high-level RESEARCH PLAN, not a summary. If there is already a RESEARCH PLAN in the session state,
-    improve upon it based on the user feedback.
+# --- Parallel Research ---
+# Instructions start with a static block, identical for every task, so it can be
+# served from a context cache; the task-specific part follows it
+GOAL_RESEARCHER_INSTRUCTION = """
+    You are a highly capable and diligent research agent. You are responsible for ONE goal of a larger research plan;
+    other researchers handle the remaining goals in parallel. Your goal and the full plan are given below.
+
+    1.  **Query Generation:** Formulate a comprehensive set of 4-5 targeted search queries that cover the intent of your goal from multiple angles.
+    2.  **Execution:** Utilize the `google_search` tool to execute **all** generated queries.
+    3.  **Summarization:** Synthesize the search results into a detailed, coherent summary that directly addresses your goal.
+
+    Output only the summary for your goal.
+    """
+
+GOAL_RESEARCHER_TASK = """
+    Full research plan, for context only: {{research_plan}}
+
+    **Your research goal:** {goal}
+    """
+
+FOLLOW_UP_RESEARCHER_INSTRUCTION = """
+    You are a specialist researcher executing one query of a refinement pass. The feedback on the previous
+    research and your follow-up query are given below.
+
+    1.  Execute the follow-up query using the 'google_search' tool.
+    2.  Synthesize the new findings into a detailed summary that fills the gap the query targets.
+
+    Output only the new findings.
+    """
+
+FOLLOW_UP_RESEARCHER_TASK = """
+    The previous research was graded as 'fail' with this feedback: {comment}
+
+    Full research plan, for context only: {{research_plan}}
+
+    **Follow-up query:** {query}
+    """
+
+# Created once, so both blocks are part of the fast model's shared cached prefix
+# before the first request
+goal_researcher_cache_callback = make_context_cache_callback(
+    config.fast_model, "goal_researcher", GOAL_RESEARCHER_INSTRUCTION
+)
+follow_up_researcher_cache_callback = make_context_cache_callback(
+    config.fast_model, "follow_up_researcher", FOLLOW_UP_RESEARCHER_INSTRUCTION
+)
+
+DELIVERABLE_BUILDER_INSTRUCTION = """
+    You are a synthesis agent. The `[RESEARCH]` goals of the research plan have been completed; produce the `[DELIVERABLE]` goals.
+
+    *   Research Plan: `{research_plan}`
+    *   Research Findings: `{section_research_findings}`
+
+    *   Process **every** goal prefixed with `[DELIVERABLE]` and interpret its text as a **direct and non-negotiable instruction** to generate a specific output artifact.
+        *   *If the instruction details a table (e.g., "Create a Detailed Comparison Table in Markdown format"), your output for this step **MUST** be a properly formatted Markdown table.*
+        *   *If the instruction states to prepare a summary, report, or any other structured output, your output for this step **MUST** be that precise artifact.*
+    *   Use **ONLY** the research findings above. You **MUST NOT** perform new searches.
+
+    **Final Output:** All generated `[DELIVERABLE]` artifacts, each under a heading naming its goal.
+    """
+
+
+def _template_safe(text: str) -> str:
+    """Replaces curly braces so ADK instruction templating leaves the text untouched."""
+    return text.replace("{", "(").replace("}", ")")
 
-    RESEARCH PLAN(SO FAR):
-    {{ research_plan? }}
+
+def parse_plan_goals(research_plan: str) -> tuple[list[str], list[str]]:
+    """Splits a research plan into its `[RESEARCH]` and `[DELIVERABLE]` goals.
+
+    Args:
+        research_plan (str): The approved plan with one tagged goal per line.
+
+    Returns:
+        tuple[list[str], list[str]]: The research goals and the deliverable goals in plan
+            order, without bullet markers and task tags.
+    """
+    research_goals, deliverables = [], []
+    for line in research_plan.splitlines():
+        match = re.search(r"\[(RESEARCH|DELIVERABLE)\]", line)
+        if not match:
+            continue
+        goal = re.sub(r"^\s*(?:[-*•]|\d+[.)])\s*", "", line)
+        goal = re.sub(r"[*`]*(?:\[[A-Z]+\])+[*`]*:?", " ", goal)
+        goal = _template_safe(" ".join(goal.split()))
+        if goal:
+            (research_goals if match.group(1) == "RESEARCH" else deliverables).append(
+                goal
+            )
+    return research_goals, deliverables
+
+
+def _make_researcher(
+    name: str,
+    instruction: str,
+    with_search: bool = True,
+    cache_callback=None,
+) -> LlmAgent:
+    """Creates a single-task sub-researcher.
+
+    It has no `output_key`: `ParallelResearcher` reads its result from its final
+    event, so only the merged findings are kept in session state. When given,
+    `cache_callback` serves the static start of `instruction` from the context
+    cache.
+    """
+    before_model_callbacks = [rate_limit_callback]
+    if cache_callback:
+        before_model_callbacks.append(cache_callback)
+    return LlmAgent(
+        model=resolve_model(config.fast_model),
+        before_model_callback=[*before_model_callbacks, start_model_timer_callback],
+        after_model_callback=record_usage_callback,
+        name=name,
+        description="Researches a single task of a parallel research pass.",
+        planner=BuiltInPlanner(
+            thinking_config=genai_types.ThinkingConfig(include_thoughts=True)
+        )
+        if with_search
+        else None,
+        include_contents="none",
+        instruction=instruction,
+        tools=[google_search] if with_search else [],
+        disallow_transfer_to_parent=True,
+        disallow_transfer_to_peers=True,
+    )
+
+
+def _final_response_text(agent: LlmAgent, event: Event) -> str | None:
+    """Returns the answer text of `agent`'s final response event, without thoughts."""
+    if event.author != agent.name or not event.is_final_response():
+        return None
+    if not event.content or not event.content.parts:
+        return None
+    return "".join(
+        part.text for part in event.content.parts if part.text and not part.thought
+    )
+
+
+async def merge_event_streams(
+    streams: list[AsyncGenerator[Event, None]],
+) -> AsyncGenerator[Event, None]:
+    """Yields the events of several agent runs as soon as each one is produced.
+
+    As in ADK's `ParallelAgent`, a run only advances after its previous event has been
+    consumed, so the runner persists every state change before the run continues.
+
+    Args:
+        streams (list[AsyncGenerator[Event, None]]): The event streams to merge.
+
+    Yields:
+        Event: The next event produced by any of the streams.
+    """
+    pending = {asyncio.ensure_future(stream.__anext__()): stream for stream in streams}
+    try:
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                stream = pending.pop(task)
+                try:
+                    event = task.result()
+                except StopAsyncIteration:
+                    continue
+                yield event
+                pending[asyncio.ensure_future(stream.__anext__())] = stream
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+class ParallelResearcher(BaseAgent):
+    """Researches independent tasks concurrently and merges the findings in task order.
+
+    Each task, a `[RESEARCH]` goal of the plan or a follow-up query of the research
+    evaluation, gets its own search-enabled sub-researcher on a separate branch, so
+    sub-researchers neither see each other's turns nor race on a shared output key. At
+    most `max_concurrency` of them run at once. Their answers are collected from their
+    final events, and only `section_research_findings` is written to session state,
+    once all of them finish, ordered by task rather than by completion time. The plan's
+    `[DELIVERABLE]` goals are then produced from the merged findings.
+
+    Attributes:
+        task_source (str): "plan" to research the goals of `research_plan`, "follow_up" to
+            run the follow-up queries of `research_evaluation`.
+        max_concurrency (int): Maximum number of sub-researchers running at the same time.
+    """
+
+    task_source: Literal["plan", "follow_up"] = "plan"
+    max_concurrency: int = 5
+
+    def _tasks(self, state) -> list[tuple[str, str]]:
+        """Returns (heading, instruction) for every task of this pass."""
+        if self.task_source == "plan":
+            research_goals, _ = parse_plan_goals(state.get("research_plan", ""))
+            if not research_goals:
+                # Untagged plan: research it as a whole, like the single researcher did
+                research_goals = [_template_safe(state.get("research_plan", ""))]
+            return [
+                (
+                    goal,
+                    GOAL_RESEARCHER_INSTRUCTION
+                    + GOAL_RESEARCHER_TASK.format(goal=goal),
+                )
+                for goal in research_goals
+            ]
+        evaluation = state.get("research_evaluation") or {}
+        comment = _template_safe(evaluation.get("comment") or "")
+        return [
+            (
+                query,
+                FOLLOW_UP_RESEARCHER_INSTRUCTION
+                + FOLLOW_UP_RESEARCHER_TASK.format(comment=comment, query=query),
+            )
+            for query in (
+                _template_safe(item["search_query"])
+                for item in evaluation.get("follow_up_queries") or []
+            )
+        ]
+
+    async def _run_researcher(
+        self,
+        researcher: LlmAgent,
+        ctx: InvocationContext,
+        semaphore: asyncio.Semaphore,
+        results: dict[str, str],
+    ) -> AsyncGenerator[Event, None]:
+        async with semaphore:
+            branch_ctx = ctx.model_copy()
+            branch_suffix = f"{self.name}.{researcher.name}"
+            branch_ctx.branch = (
+                f"{ctx.branch}.{branch_suffix}" if ctx.branch else branch_suffix
+            )
+            async for event in researcher.run_async(branch_ctx):
+                if (text := _final_response_text(researcher, event)) is not None:
+                    results[researcher.name] = text
+                yield event
+
+    def _findings_event(self, ctx: InvocationContext, findings: str) -> Event:
+        return Event(
+            invocation_id=ctx.invocation_id,
+            author=self.name,
+            branch=ctx.branch,
+            content=genai_types.Content(
+                role="model", parts=[genai_types.Part(text=findings)]
+            ),
+            actions=EventActions(state_delta={"section_research_findings": findings}),
+        )
+
+    async def _run_async_impl(
+        self, ctx: InvocationContext
+    ) -> AsyncGenerator[Event, None]:
+        tasks = self._tasks(ctx.session.state)
+        if not tasks:
+            logging.info(f"[{self.name}] No research tasks to run.")
+            return
+        cache_callback = (
+            goal_researcher_cache_callback
+            if self.task_source == "plan"
+            else follow_up_researcher_cache_callback
+        )
+        # Zero-padded names keep branch order equal to task order
+        researchers = [
+            _make_researcher(
+                f"{self.name}_{i:02d}", instruction, cache_callback=cache_callback
+            )
+            for i, (_, instruction) in enumerate(tasks, start=1)
+        ]
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+        logging.info(
+            f"[{self.name}] Researching {len(tasks)} tasks, at most {self.max_concurrency} at a time."
+        )
+        results: dict[str, str] = {}
+        async for event in merge_event_streams(
+            [self._run_researcher(r, ctx, semaphore, results) for r in researchers]
+        ):
+            yield event
+
+        sections = [
+            (heading, results.get(researcher.name, ""))
+            for (heading, _), researcher in zip(tasks, researchers, strict=True)
+        ]
+        if self.task_source == "plan":
+            findings = "\n\n".join(
+                f"## {heading}\n\n{text.strip()}" for heading, text in sections
+            )
+        else:
+            findings = "\n\n".join(
+                [
+                    ctx.session.state.get("section_research_findings", ""),
+                    "## Follow-up research",
+                    *(f"### {heading}\n\n{text.strip()}" for heading, text in sections),
+                ]
+            )
+        yield self._findings_event(ctx, findings)
+
+        if self.task_source != "plan":
+            return
+        _, deliverables = parse_plan_goals(ctx.session.state.get("research_plan", ""))
+        if not deliverables:
+            return
+        builder = _make_researcher(
+            f"{self.name}_deliverables",
+            DELIVERABLE_BUILDER_INSTRUCTION,
+            with_search=False,
+        )
+        artifacts = ""
+        async for event in builder.run_async(ctx):
+            if (text := _final_response_text(builder, event)) is not None:
+                artifacts = text
+            yield event
+        yield self._findings_event(ctx, f"{findings}\n\n{artifacts.strip()}")
+
+
+# --- AGENT DEFINITIONS ---
+PLAN_GENERATOR_INSTRUCTION = f"""
+    You are a research strategist. Your job is to create a high-level RESEARCH PLAN, not a summary. If there is already a RESEARCH PLAN in the session state
+    (shown at the end), improve upon it based on the user feedback.
 
     **GENERAL INSTRUCTION: CLASSIFY TASK TYPES**
     Your plan must clearly classify each goal for downstream execution. Each bullet point should start with a task type prefix:
@@ -214,13 +756,33 @@ plan_generator = LlmAgent(
     Only use `google_search` if a topic is ambiguous or time-sensitive and you absolutely cannot create a plan without a key piece of identifying information.
     You are explicitly forbidden from researching the *content* or *themes* of the topic. That is the next agent's job. Your search is only to identify the subject, not to investigate it.
     Current date: {datetime.datetime.now().strftime("%Y-%m-%d")}
+    """
+
+plan_generator = LlmAgent(
+    model=resolve_model(config.fast_model),
+    before_model_callback=[
+        rate_limit_callback,
+        make_context_cache_callback(
+            config.fast_model, "plan_generator", PLAN_GENERATOR_INSTRUCTION
+        ),
+        start_model_timer_callback,
+    ],
+    after_model_callback=record_usage_callback,
+    name="plan_generator",
+    description="Generates or refine the existing 5 line action-oriented research plan, using minimal search only for topic clarification.",
+    instruction=PLAN_GENERATOR_INSTRUCTION
+    + """
+    RESEARCH PLAN(SO FAR):
+    { research_plan? }
     """,
     tools=[google_search],
 )
 
 
 section_planner = LlmAgent(
-    model=config.worker_model,
+    model=resolve_model(config.fast_model),
+    before_model_callback=[rate_limit_callback, start_model_timer_callback],
+    after_model_callback=record_usage_callback,
     name="section_planner",
     description="Breaks down the research plan into a structured markdown outline of report sections.",
     instruction="""
@@ -238,58 +800,23 @@ section_planner = LlmAgent(
 )
 
 
-section_researcher = LlmAgent(
-    model=config.worker_model,
+section_researcher = ParallelResearcher(
     name="section_researcher",
-    description="Performs the crucial first pass of web research.",
-    planner=BuiltInPlanner(
-        thinking_config=genai_types.ThinkingConfig(include_thoughts=True)
-    ),
-    instruction="""
-    You are a highly capable and diligent research and synthesis agent. Your comprehensive task is to execute a provided research plan with **absolute fidelity**, first by gathering necessary information, and then by synthesizing that information into specified outputs.
-
-    You will be provided with a sequential list of research plan goals, stored in the `research_plan` state key. Each goal will be clearly prefixed with its primary task type: `[RESEARCH]` or `[DELIVERABLE]`.
-
-    Your execution process must strictly adhere to these two distinct and sequential phases:
-
-    ---
-
-    **Phase 1: Information Gathering (`[RESEARCH]` Tasks)**
-
-    *   **Execution Directive:** You **MUST** systematically process every goal prefixed with `[RESEARCH]` before proceeding to Phase 2.
-    *   For each `[RESEARCH]` goal:
-        *   **Query Generation:** Formulate a comprehensive set of 4-5 targeted search queries. These queries must be expertly designed to broadly cover the specific intent of the `[RESEARCH]` goal from multiple angles.
-        *   **Execution:** Utilize the `google_search` tool to execute **all** generated queries for the current `[RESEARCH]` goal.
-        *   **Summarization:** Synthesize the search results into a detailed, coherent summary that directly addresses the objective of the `[RESEARCH]` goal.
-        *   **Internal Storage:** Store this summary, clearly tagged or indexed by its corresponding `[RESEARCH]` goal, for later and exclusive use in Phase 2. You **MUST NOT** lose or discard any generated summaries.
-
-    ---
-
-    **Phase 2: Synthesis and Output Creation (`[DELIVERABLE]` Tasks)**
-
-    *   **Execution Prerequisite:** This phase **MUST ONLY COMMENCE** once **ALL** `[RESEARCH]` goals from Phase 1 have been fully completed and their summaries are internally stored.
-    *   **Execution Directive:** You **MUST** systematically process **every** goal prefixed with `[DELIVERABLE]`. For each `[DELIVERABLE]` goal, your directive is to **PRODUCE** the artifact as explicitly described.
-    *   For each `[DELIVERABLE]` goal:
-        *   **Instruction Interpretation:** You will interpret the goal's text (following the `[DELIVERABLE]` tag) as a **direct and non-negotiable instruction** to generate a specific output artifact.
-            *   *If the instruction details a table (e.g., "Create a Detailed Comparison Table in Markdown format"), your output for this step **MUST** be a properly formatted Markdown table utilizing columns and rows as implied by the instruction and the prepared data.*
-            *   *If the instruction states to prepare a summary, report, or any other structured output, your output for this step **MUST** be that precise artifact.*
-        *   **Data Consolidation:** Access and utilize **ONLY** the summaries generated during Phase 1 (`[RESEARCH]` tasks`) to fulfill the requirements of the current `[DELIVERABLE]` goal. You **MUST NOT** perform new searches.
-        *   **Output Generation:** Based on the specific instruction of the `[DELIVERABLE]` goal:
-            *   Carefully extract, organize, and synthesize the relevant information from your previously gathered summaries.
-            *   Must always produce the specified output artifact (e.g., a concise summary, a structured comparison table, a comprehensive report, a visual representation, etc.) with accuracy and completeness.
-        *   **Output Accumulation:** Maintain and accumulate **all** the generated `[DELIVERABLE]` artifacts. These are your final outputs.
-
-    ---
-
-    **Final Output:** Your final output will comprise the complete set of processed summaries from `[RESEARCH]` tasks AND all the generated artifacts from `[DELIVERABLE]` tasks, presented clearly and distinctly.
-    """,
-    tools=[google_search],
-    output_key="section_research_findings",
+    description="Performs the crucial first pass of web research, one sub-researcher per research goal.",
+    task_source="plan",
+    max_concurrency=config.max_parallel_researchers,
     after_agent_callback=collect_research_sources_callback,
 )
 
 research_evaluator = LlmAgent(
-    model=config.critic_model,
+    model=resolve_model(config.fast_model),
+    before_model_callback=[
+        rate_limit_callback,
+        start_model_timer_callback,
+        remember_request_callback,
+    ],
+    # A verdict from the fast tier that does not parse is asked again of the strong tier
+    after_model_callback=[record_usage_callback, make_escalation_callback(Feedback)],
     name="research_evaluator",
     description="Critically evaluates research and generates follow-up queries.",
     instruction=f"""
@@ -315,41 +842,16 @@ research_evaluator = LlmAgent(
     output_key="research_evaluation",
 )
 
-enhanced_search_executor = LlmAgent(
-    model=config.worker_model,
+enhanced_search_executor = ParallelResearcher(
     name="enhanced_search_executor",
-    description="Executes follow-up searches and integrates new findings.",
-    planner=BuiltInPlanner(
-        thinking_config=genai_types.ThinkingConfig(include_thoughts=True)
-    ),
-    instruction="""
-    You are a specialist researcher executing a refinement pass.
-    You have been activated because the previous research was graded as 'fail'.
-
-    1.  Review the 'research_evaluation' state key to understand the feedback and required fixes.
-    2.  Execute EVERY query listed in 'follow_up_queries' using the 'google_search' tool.
-    3.  Synthesize the new findings and COMBINE them with the existing information in 'section_research_findings'.
-    4.  Your output MUST be the new, complete, and improved set of research findings.
-    """,
-    tools=[google_search],
-    output_key="section_research_findings",
+    description="Executes follow-up searches concurrently and integrates new findings.",
+    task_source="follow_up",
+    max_concurrency=config.max_parallel_researchers,
     after_agent_callback=collect_research_sources_callback,
 )
 
-report_composer = LlmAgent(
-    model=config.critic_model,
-    name="report_composer_with_citations",
-    include_contents="none",
-    description="Transforms research data and a markdown outline into a final, cited report.",
-    instruction="""
-    Transform the provided data into a polished, professional, and meticulously cited research report.
-
-    ---
-    ### INPUT DATA
-    *   Research Plan: `{research_plan}`
-    *   Research Findings: `{section_research_findings}`
-    *   Citation Sources: `{sources}`
-    *   Report Structure: `{report_sections}`
+REPORT_COMPOSER_INSTRUCTION = """
+    Transform the provided data (see INPUT DATA at the end) into a polished, professional, and meticulously cited research report.
 
     ---
     ### CRITICAL: Citation System
@@ -362,8 +864,33 @@ report_composer = LlmAgent(
     Generate a comprehensive report using ONLY the `<cite source="src-ID_NUMBER" />` tag system for all citations.
     The final report must strictly follow the structure provided in the **Report Structure** markdown outline.
     Do not include a "References" or "Sources" section; all citations must be in-line.
+    """
+
+report_composer = LlmAgent(
+    model=resolve_model(config.strong_model),
+    before_model_callback=[
+        rate_limit_callback,
+        make_context_cache_callback(
+            config.strong_model, "report_composer", REPORT_COMPOSER_INSTRUCTION
+        ),
+        start_model_timer_callback,
+    ],
+    after_model_callback=[record_usage_callback, stream_citations_callback],
+    name="report_composer_with_citations",
+    include_contents="none",
+    description="Transforms research data and a markdown outline into a final, cited report.",
+    instruction=REPORT_COMPOSER_INSTRUCTION
+    + """
+    ---
+    ### INPUT DATA
+    *   Research Plan: `{research_plan}`
+    *   Research Findings: `{section_research_findings}`
+    *   Citation Sources: `{citation_table}`
+        (one source per line as `short_id | title | domain`, followed by its strongest supported claims and their confidence)
+    *   Report Structure: `{report_sections}`
     """,
     output_key="final_cited_report",
+    before_agent_callback=build_citation_table_callback,
     after_agent_callback=citation_replacement_callback,
 )
 
@@ -384,11 +911,14 @@ research_pipeline = SequentialAgent(
         ),
         report_composer,
     ],
+    after_agent_callback=usage_summary_callback,
 )
 
 interactive_planner_agent = LlmAgent(
     name="interactive_planner_agent",
-    model=config.worker_model,
+    model=resolve_model(config.fast_model),
+    before_model_callback=[rate_limit_callback, start_model_timer_callback],
+    after_model_callback=record_usage_callback,
     description="The primary research assistant. It collaborates with the user to create a research plan, and then executes it upon approval.",
     instruction=f"""
     You are a research planning assistant. Your primary function is to convert ANY user request into a research plan.
@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import os
+import warnings
 from dataclasses import dataclass
 
 import google.auth
@@ -22,10 +23,12 @@ import google.auth
 #    GOOGLE_GENAI_USE_VERTEXAI=FALSE
 #    GOOGLE_API_KEY=PASTE_YOUR_ACTUAL_API_KEY_HERE
 # 2. This will override the default Vertex AI configuration
-_, project_id = google.auth.default()
-os.environ.setdefault("GOOGLE_CLOUD_PROJECT", project_id)
-os.environ.setdefault("GOOGLE_CLOUD_LOCATION", "global")
-os.environ.setdefault("GOOGLE_GENAI_USE_VERTEXAI", "True")
+# The offline fake backend (MODEL_BACKEND=fake) needs no credentials.
+if os.environ.get("MODEL_BACKEND", "vertexai") != "fake":
+    _, project_id = google.auth.default()
+    os.environ.setdefault("GOOGLE_CLOUD_PROJECT", project_id)
+    os.environ.setdefault("GOOGLE_CLOUD_LOCATION", "global")
+    os.environ.setdefault("GOOGLE_GENAI_USE_VERTEXAI", "True")
 
 
 @dataclass
@@ -33,14 +36,116 @@ class ResearchConfiguration:
     """Configuration for research-related models and parameters.
 
     Attributes:
-        critic_model (str): Model for evaluation tasks.
-        worker_model (str): Model for working/generation tasks.
+        fast_model (str): Model of the fast tier, used for planning, the
+            sub-researchers and the research evaluation.
+        strong_model (str): Model of the strong tier, used for the final report
+            and for escalated evaluations.
+        model_escalation (bool): Repeats an evaluation on the strong tier when
+            the fast tier's output does not validate against its schema.
         max_search_iterations (int): Maximum search iterations allowed.
+        max_parallel_researchers (int): Maximum number of research goals or
+            follow-up queries researched concurrently.
+        citation_claims_per_source (int): Highest-confidence claims shown per
+            source in the citation table given to the report composer.
+        citation_table_token_budget (int): Approximate token budget of that
+            citation table; low-ranked claims and sources are dropped to fit.
+        rate_limit_rpm (int): Requests per minute allowed per model across
+            processes sharing the rate limit store. 0 (default) disables the
+            limit.
+        rate_limit_tpm (int): Estimated prompt tokens per minute allowed per
+            model. 0 (default) disables the limit.
+        rate_limit_db_path (str): SQLite file holding the shared rate limit
+            buckets.
+        model_backend (str): "vertexai", or "fake" for the deterministic
+            offline stand-in in `app.fake_llm`.
+        fake_model_latency (float): Simulated latency of every fake model call.
+        fake_model_rate_limit_probability (float): Probability that a fake
+            model call fails with an injected 429 error.
+        context_cache_mode (str): "off" (default), "explicit", "local" or
+            "auto" (explicit caching on Vertex AI / AI Studio, the local
+            stand-in with the fake backend). Caches the static instruction
+            blocks of the agents routed to a model together, as one cached
+            content per model. Explicit caching creates billed cached contents
+            on the provider, so it is opt-in.
+        context_cache_ttl_seconds (int): Lifetime of a cached prefix.
+        context_cache_refresh_seconds (int): A cached prefix used this close
+            to its expiry has its TTL extended first.
+        context_cache_min_tokens (int): Shared prefixes estimated below this
+            many tokens are not cached explicitly (the API's minimum for the
+            fast model; the strong model's is higher).
+        fake_model_malformed_output_probability (float): Probability that a
+            fake response to a request with an output schema misses a required field.
+        critic_model (str): Deprecated alias of `strong_model`.
+        worker_model (str): Deprecated alias of `fast_model`.
     """
 
-    critic_model: str = "gemini-2.5-pro"
-    worker_model: str = "gemini-2.5-pro"
+    fast_model: str = os.environ.get("FAST_MODEL", "gemini-2.5-flash")
+    strong_model: str = os.environ.get("STRONG_MODEL", "gemini-2.5-pro")
+    model_escalation: bool = (
+        os.environ.get("MODEL_ESCALATION", "true").lower() == "true"
+    )
     max_search_iterations: int = 5
+    max_parallel_researchers: int = int(os.environ.get("MAX_PARALLEL_RESEARCHERS", "5"))
+    citation_claims_per_source: int = int(
+        os.environ.get("CITATION_CLAIMS_PER_SOURCE", "3")
+    )
+    citation_table_token_budget: int = int(
+        os.environ.get("CITATION_TABLE_TOKEN_BUDGET", "6000")
+    )
+    rate_limit_rpm: int = int(os.environ.get("RATE_LIMIT_RPM", "0"))
+    rate_limit_tpm: int = int(os.environ.get("RATE_LIMIT_TPM", "0"))
+    rate_limit_db_path: str = os.environ.get(
+        "RATE_LIMIT_DB_PATH",
+        os.path.join(os.path.dirname(__file__), "..", ".cache", "rate_limits.sqlite3"),
+    )
+    model_backend: str = os.environ.get("MODEL_BACKEND", "vertexai")
+    fake_model_latency: float = float(os.environ.get("FAKE_MODEL_LATENCY", "0"))
+    fake_model_rate_limit_probability: float = float(
+        os.environ.get("FAKE_MODEL_RATE_LIMIT_PROBABILITY", "0")
+    )
+    context_cache_mode: str = os.environ.get("CONTEXT_CACHE_MODE", "off")
+    context_cache_ttl_seconds: int = int(
+        os.environ.get("CONTEXT_CACHE_TTL_SECONDS", "3600")
+    )
+    context_cache_refresh_seconds: int = int(
+        os.environ.get("CONTEXT_CACHE_REFRESH_SECONDS", "300")
+    )
+    context_cache_min_tokens: int = int(
+        os.environ.get("CONTEXT_CACHE_MIN_TOKENS", "1024")
+    )
+    fake_model_malformed_output_probability: float = float(
+        os.environ.get("FAKE_MODEL_MALFORMED_OUTPUT_PROBABILITY", "0")
+    )
+
+    @property
+    def critic_model(self) -> str:
+        """Deprecated alias of `strong_model`."""
+        _warn_renamed("critic_model", "strong_model")
+        return self.strong_model
+
+    @critic_model.setter
+    def critic_model(self, value: str) -> None:
+        _warn_renamed("critic_model", "strong_model")
+        self.strong_model = value
+
+    @property
+    def worker_model(self) -> str:
+        """Deprecated alias of `fast_model`."""
+        _warn_renamed("worker_model", "fast_model")
+        return self.fast_model
+
+    @worker_model.setter
+    def worker_model(self, value: str) -> None:
+        _warn_renamed("worker_model", "fast_model")
+        self.fast_model = value
+
+
+def _warn_renamed(old: str, new: str) -> None:
+    warnings.warn(
+        f"ResearchConfiguration.{old} is deprecated; use {new} instead.",
+        DeprecationWarning,
+        stacklevel=3,
+    )
 
 
 config = ResearchConfiguration()
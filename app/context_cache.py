@@ -0,0 +1,340 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import hashlib
+import json
+import logging
+import textwrap
+import time
+from dataclasses import dataclass
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest
+from google.genai import types as genai_types
+
+from .config import config
+
+
+@dataclass
+class LocalCachedContent:
+    """A cached prefix held by `LocalContextCacheBackend`."""
+
+    name: str
+    model: str
+    system_instruction: str
+    tools: list[genai_types.Tool] | None
+    expires_at: float
+
+
+class LocalContextCacheBackend:
+    """In-process stand-in for the Gemini cached content API, used with `FakeLlm`.
+
+    Behaves like the API where it matters for testing: entries expire after
+    their TTL and looking up an expired or unknown entry fails.
+    """
+
+    def __init__(self):
+        self._entries: dict[str, LocalCachedContent] = {}
+
+    async def create(
+        self,
+        model: str,
+        system_instruction: str,
+        tools: list[genai_types.Tool] | None,
+        ttl_seconds: int,
+        display_name: str,
+    ) -> str:
+        digest = hashlib.sha256(f"{model}{system_instruction}{time.time_ns()}".encode())
+        name = f"localCachedContents/{digest.hexdigest()[:16]}"
+        self._entries[name] = LocalCachedContent(
+            name, model, system_instruction, tools, time.time() + ttl_seconds
+        )
+        return name
+
+    async def refresh(self, name: str, ttl_seconds: int) -> None:
+        self.get(name).expires_at = time.time() + ttl_seconds
+
+    def get(self, name: str) -> LocalCachedContent:
+        """Returns a live entry, raising like the API does for unknown or expired ones."""
+        entry = self._entries.get(name)
+        if entry is None or entry.expires_at <= time.time():
+            self._entries.pop(name, None)
+            raise LookupError(
+                f"404 NOT_FOUND: cached content {name} does not exist or expired"
+            )
+        return entry
+
+
+class GenaiContextCacheBackend:
+    """Explicit context caching through the google-genai `caches` API (Vertex AI or AI Studio)."""
+
+    def __init__(self):
+        self._client = None
+
+    async def _get_client(self):
+        if self._client is None:
+            from google import genai
+
+            # Creating the client may read credentials from disk
+            self._client = await asyncio.to_thread(genai.Client)
+        return self._client
+
+    async def create(
+        self,
+        model: str,
+        system_instruction: str,
+        tools: list[genai_types.Tool] | None,
+        ttl_seconds: int,
+        display_name: str,
+    ) -> str:
+        client = await self._get_client()
+        cached = await client.aio.caches.create(
+            model=model,
+            config=genai_types.CreateCachedContentConfig(
+                system_instruction=system_instruction,
+                tools=tools,
+                ttl=f"{ttl_seconds}s",
+                display_name=display_name,
+            ),
+        )
+        return cached.name
+
+    async def refresh(self, name: str, ttl_seconds: int) -> None:
+        client = await self._get_client()
+        await client.aio.caches.update(
+            name=name,
+            config=genai_types.UpdateCachedContentConfig(ttl=f"{ttl_seconds}s"),
+        )
+
+
+@dataclass
+class CachedPrefix:
+    name: str
+    expires_at: float
+
+
+class ContextCacheManager:
+    """Creates one cached content per model, static instruction and tool set, and keeps it alive.
+
+    An entry is created on first use in the process. A use within
+    `refresh_seconds` of its expiry extends the TTL first, so requests never
+    reference an expired cache. Any cache API error falls back to an uncached
+    request, and the prefix is not tried again for `refresh_seconds`.
+    """
+
+    def __init__(
+        self, backend, ttl_seconds: int, refresh_seconds: int, min_tokens: int
+    ):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.refresh_seconds = min(refresh_seconds, ttl_seconds // 2)
+        self.min_tokens = min_tokens
+        self._entries: dict[str, CachedPrefix] = {}
+        self._failed_until: dict[str, float] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self.stats = {
+            "created": 0,
+            "refreshed": 0,
+            "reused": 0,
+            "too_small": 0,
+            "errors": 0,
+        }
+
+    async def aget(
+        self,
+        model: str,
+        static_instruction: str,
+        tools: list[genai_types.Tool] | None,
+        display_name: str,
+    ) -> str | None:
+        """Returns the name of the live cached content for this prefix, or None to send it uncached."""
+        if (len(static_instruction) + 3) // 4 < self.min_tokens:
+            self.stats["too_small"] += 1
+            return None
+        tools_key = json.dumps(
+            [tool.model_dump(mode="json", exclude_none=True) for tool in tools or []],
+            sort_keys=True,
+        )
+        key = hashlib.sha256(
+            f"{model}\0{static_instruction}\0{tools_key}".encode()
+        ).hexdigest()
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            entry = self._entries.get(key)
+            now = time.time()
+            if entry is not None and entry.expires_at - now > self.refresh_seconds:
+                self.stats["reused"] += 1
+                return entry.name
+            if self._failed_until.get(key, 0.0) > now:
+                return None
+            try:
+                if entry is not None and entry.expires_at > now:
+                    await self.backend.refresh(entry.name, self.ttl_seconds)
+                    self.stats["refreshed"] += 1
+                else:
+                    entry = CachedPrefix(
+                        await self.backend.create(
+                            model,
+                            static_instruction,
+                            tools,
+                            self.ttl_seconds,
+                            display_name,
+                        ),
+                        0.0,
+                    )
+                    self.stats["created"] += 1
+                    logging.info(
+                        f"[{display_name}] Cached {len(static_instruction)} characters of static instruction "
+                        f"for {model} as {entry.name}"
+                    )
+            except Exception as e:
+                self.stats["errors"] += 1
+                self._entries.pop(key, None)
+                self._failed_until[key] = now + self.refresh_seconds
+                logging.warning(
+                    f"[{display_name}] Context caching failed, sending the prefix uncached: {e}"
+                )
+                return None
+            entry.expires_at = now + self.ttl_seconds
+            self._entries[key] = entry
+            return entry.name
+
+
+SHARED_INSTRUCTION_HEADER = """You serve several roles of a research pipeline; each has its instructions under its own heading below.
+The first user message of a request names your role. Follow only the instructions of that role and ignore the other roles.
+"""
+
+# Static instruction blocks of the agents routed to each model, by role. All of
+# a model's blocks are cached together, since a single agent's block is below
+# the minimum size of a cached content.
+_static_instructions: dict[str, dict[str, str]] = {}
+
+
+def register_static_instruction(model: str, role: str, static_instruction: str) -> None:
+    """Adds the static instruction block of `role` to the shared cached prefix of `model`.
+
+    Register every role at import time: a later registration changes the
+    shared prefix, and with it the cached content.
+    """
+    _static_instructions.setdefault(model, {})[role] = static_instruction
+
+
+def shared_static_instruction(model: str) -> str:
+    """Returns the cached system instruction of `model`: every registered role's block."""
+    return SHARED_INSTRUCTION_HEADER + "".join(
+        f"\n## Role: {role}\n{textwrap.dedent(block).strip()}\n"
+        for role, block in _static_instructions.get(model, {}).items()
+    )
+
+
+local_context_cache = LocalContextCacheBackend()
+_managers: dict[str, ContextCacheManager] = {}
+
+
+def context_cache_mode() -> str:
+    """Returns the effective mode: "explicit", "local" or "off"."""
+    if config.context_cache_mode == "auto":
+        return "local" if config.model_backend == "fake" else "explicit"
+    return config.context_cache_mode
+
+
+def get_context_cache() -> ContextCacheManager | None:
+    """Returns the process-wide cache manager of the configured mode, None when caching is off."""
+    mode = context_cache_mode()
+    if mode == "off":
+        return None
+    if mode not in _managers:
+        if mode == "local":
+            # The stand-in has no minimum size, so short test prompts are cached too
+            backend, min_tokens = local_context_cache, 0
+        else:
+            backend, min_tokens = (
+                GenaiContextCacheBackend(),
+                config.context_cache_min_tokens,
+            )
+        _managers[mode] = ContextCacheManager(
+            backend,
+            config.context_cache_ttl_seconds,
+            config.context_cache_refresh_seconds,
+            min_tokens,
+        )
+    return _managers[mode]
+
+
+def context_cache_stats() -> dict:
+    """Returns the counters of the active cache manager."""
+    manager = _managers.get(context_cache_mode())
+    return dict(manager.stats) if manager else {}
+
+
+def make_context_cache_callback(model: str, role: str, static_instruction: str):
+    """Creates a before-model callback that serves `static_instruction` from a context cache.
+
+    The agent's instruction must start with `static_instruction`, which must not
+    contain state placeholders. The block is registered under `role` in the
+    shared prefix of `model`, which is cached together with the request's
+    tools; agents sharing a cached content must therefore use the same tools.
+    The request then names its role and carries the rest of the instruction as
+    its first user message, since a request using a cache cannot set its own
+    system instruction or tools.
+
+    Args:
+        model (str): The model the agent runs on.
+        role (str): The name of the block in the shared prefix.
+        static_instruction (str): The unchanging start of the agent's instruction.
+
+    Returns:
+        The async callback.
+    """
+    register_static_instruction(model, role, static_instruction)
+
+    async def context_cache_callback(
+        callback_context: CallbackContext, llm_request: LlmRequest
+    ) -> None:
+        manager = get_context_cache()
+        request_config = llm_request.config
+        system_instruction = request_config and request_config.system_instruction
+        if (
+            manager is None
+            or llm_request.model != model
+            or not isinstance(system_instruction, str)
+            or not system_instruction.startswith(static_instruction)
+        ):
+            return None
+        cached_content = await manager.aget(
+            model,
+            shared_static_instruction(model),
+            request_config.tools,
+            f"{model} shared instructions",
+        )
+        if cached_content is None:
+            return None
+        request_config.cached_content = cached_content
+        request_config.system_instruction = None
+        request_config.tools = None
+        dynamic_instruction = system_instruction[len(static_instruction) :].strip()
+        llm_request.contents.insert(
+            0,
+            genai_types.Content(
+                role="user",
+                parts=[
+                    genai_types.Part(
+                        text=f"Your role: {role}\n\n{dynamic_instruction}".strip()
+                    )
+                ],
+            ),
+        )
+        return None
+
+    return context_cache_callback
@@ -0,0 +1,254 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import asyncio
+import hashlib
+import itertools
+import json
+import random
+import types
+from collections.abc import AsyncGenerator
+from typing import Any, Literal, Union, get_args, get_origin
+
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.genai import types as genai_types
+from pydantic import BaseModel, PrivateAttr
+
+from .config import config
+from .context_cache import local_context_cache
+
+# Synthetic sources are drawn from a fixed pool so goals partly share URLs,
+# like real searches on related topics do
+SOURCE_POOL_SIZE = 200
+
+WORDS = (
+    "analysis framework regulation market evidence court decision policy data "
+    "report trend impact benchmark adoption risk standard case review practice"
+).split()
+
+
+def _digest(text: str) -> int:
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+
+
+def _sentences(seed: int, count: int) -> list[str]:
+    rng = random.Random(seed)
+    return [
+        f"The {' '.join(rng.choice(WORDS) for _ in range(8))}." for _ in range(count)
+    ]
+
+
+def _request_text(llm_request: LlmRequest) -> str:
+    texts = []
+    if llm_request.config and isinstance(llm_request.config.system_instruction, str):
+        texts.append(llm_request.config.system_instruction)
+    for content in llm_request.contents or []:
+        texts.extend(part.text for part in content.parts or [] if part.text)
+    return "\n".join(texts)
+
+
+class FakeLlm(BaseLlm):
+    """Deterministic offline stand-in for Gemini used by the ADK agents.
+
+    Needs no network or credentials. Requests with an output schema get a
+    schema-valid JSON response, requests with the google_search tool get text
+    with synthetic grounding chunks and supports, everything else gets plain
+    text. The first `failed_evaluations` pass/fail verdicts are "fail" so the
+    refinement loop runs. Requests using `cached_content` are resolved through
+    the local context cache and report the cached prefix as cached tokens.
+    Latency, 429 injection and schema responses with a missing required field
+    are configurable.
+
+    Attributes:
+        latency (float): Simulated latency of every call, in seconds.
+        rate_limit_probability (float): Probability of an injected 429 error.
+        malformed_output_probability (float): Probability that a schema response
+            leaves out a required field.
+        failed_evaluations (int): Number of "fail" verdicts before "pass".
+        sources_per_response (int): Grounding chunks per grounded response.
+    """
+
+    latency: float = 0.0
+    rate_limit_probability: float = 0.0
+    malformed_output_probability: float = 0.0
+    failed_evaluations: int = 1
+    sources_per_response: int = 4
+    _verdicts: int = PrivateAttr(default=0)
+    _draw_counters: dict = PrivateAttr(default_factory=dict)
+
+    @classmethod
+    def supported_models(cls) -> list[str]:
+        return []
+
+    def _synthesize(self, annotation: Any, seed: int) -> Any:
+        origin = get_origin(annotation)
+        if origin is Literal:
+            values = get_args(annotation)
+            if {"pass", "fail"} <= set(values):
+                self._verdicts += 1
+                return "fail" if self._verdicts <= self.failed_evaluations else "pass"
+            return values[0]
+        if origin in (Union, types.UnionType):
+            options = [arg for arg in get_args(annotation) if arg is not type(None)]
+            return self._synthesize(options[0], seed)
+        if origin is list:
+            (item,) = get_args(annotation) or (str,)
+            return [self._synthesize(item, seed + i) for i in range(3)]
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            return {
+                name: self._synthesize(field.annotation, seed + i)
+                for i, (name, field) in enumerate(annotation.model_fields.items())
+            }
+        if annotation is bool:
+            return False
+        if annotation in (int, float):
+            return 1
+        return " ".join(_sentences(seed, 2))
+
+    def _grounding_metadata(
+        self, sentences: list[str], seed: int
+    ) -> genai_types.GroundingMetadata:
+        rng = random.Random(seed)
+        chunks, supports, offset = [], [], 0
+        for idx, sentence in enumerate(sentences[: self.sources_per_response]):
+            source = rng.randrange(SOURCE_POOL_SIZE)
+            domain = f"source-{source}.example.com"
+            chunks.append(
+                genai_types.GroundingChunk(
+                    web=genai_types.GroundingChunkWeb(
+                        uri=f"https://{domain}/article/{source}",
+                        title=domain,
+                        domain=domain,
+                    )
+                )
+            )
+            supports.append(
+                genai_types.GroundingSupport(
+                    segment=genai_types.Segment(
+                        start_index=offset,
+                        end_index=offset + len(sentence),
+                        text=sentence,
+                    ),
+                    grounding_chunk_indices=[idx],
+                    confidence_scores=[round(0.5 + rng.random() / 2, 3)],
+                )
+            )
+            offset += len(sentence) + 1
+        return genai_types.GroundingMetadata(
+            grounding_chunks=chunks, grounding_supports=supports
+        )
+
+    def _draw(self, kind: str, prompt: str) -> random.Random:
+        # Seeded from the prompt and how often it was drawn for before, so
+        # retries get new draws while runs stay reproducible
+        counter = self._draw_counters.setdefault((kind, prompt), itertools.count())
+        return random.Random(f"{kind}-{prompt}-{next(counter)}")
+
+    def _respond(self, llm_request: LlmRequest) -> LlmResponse:
+        request_config = llm_request.config or genai_types.GenerateContentConfig()
+        cached_text, cached_tools = "", None
+        if request_config.cached_content:
+            cached = local_context_cache.get(request_config.cached_content)
+            cached_text, cached_tools = cached.system_instruction + "\n", cached.tools
+        prompt = cached_text + _request_text(llm_request)
+        seed = _digest(prompt)
+        if self.rate_limit_probability > 0:
+            if self._draw("rate-limit", prompt).random() < self.rate_limit_probability:
+                raise Exception("429 RESOURCE_EXHAUSTED: injected by FakeLlm")
+
+        grounding_metadata = None
+        schema = request_config.response_schema
+        if isinstance(schema, type) and issubclass(schema, BaseModel):
+            data = self._synthesize(schema, seed)
+            required = [n for n, f in schema.model_fields.items() if f.is_required()]
+            if (
+                required
+                and self.malformed_output_probability > 0
+                and self._draw("malformed", prompt).random()
+                < self.malformed_output_probability
+            ):
+                data.pop(required[-1])
+            text = json.dumps(data)
+        elif any(
+            tool.google_search for tool in request_config.tools or cached_tools or []
+        ):
+            sentences = _sentences(seed, self.sources_per_response + 1)
+            text = " ".join(sentences)
+            grounding_metadata = self._grounding_metadata(sentences, seed)
+        elif "<cite source=" in prompt:
+            sentences = _sentences(seed, 6)
+            text = " ".join(
+                f'{sentence[:-1]} <cite source="src-{i + 1}" />.'
+                for i, sentence in enumerate(sentences)
+            )
+        else:
+            text = " ".join(_sentences(seed, 6))
+
+        prompt_tokens = (len(prompt) + 3) // 4
+        output_tokens = (len(text) + 3) // 4
+        return LlmResponse(
+            content=genai_types.Content(
+                role="model", parts=[genai_types.Part(text=text)]
+            ),
+            grounding_metadata=grounding_metadata,
+            usage_metadata=genai_types.GenerateContentResponseUsageMetadata(
+                prompt_token_count=prompt_tokens,
+                cached_content_token_count=(len(cached_text) + 3) // 4,
+                candidates_token_count=output_tokens,
+                total_token_count=prompt_tokens + output_tokens,
+            ),
+        )
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        response = self._respond(llm_request)
+        if stream and response.content and response.content.parts:
+            text = response.content.parts[0].text or ""
+            words = text.split(" ")
+            for start in range(0, len(words), 8):
+                chunk = " ".join(words[start : start + 8])
+                yield LlmResponse(
+                    content=genai_types.Content(
+                        role="model",
+                        parts=[
+                            genai_types.Part(text=chunk if start == 0 else " " + chunk)
+                        ],
+                    ),
+                    partial=True,
+                )
+        yield response
+
+
+def resolve_model(model_name: str) -> str | BaseLlm:
+    """Returns the model to use for an agent under the configured backend.
+
+    Args:
+        model_name (str): The Gemini model name from the configuration.
+
+    Returns:
+        str | BaseLlm: The model name for Vertex AI / AI Studio, or a `FakeLlm`
+            with that name when `MODEL_BACKEND=fake`.
+    """
+    if config.model_backend == "fake":
+        return FakeLlm(
+            model=model_name,
+            latency=config.fake_model_latency,
+            rate_limit_probability=config.fake_model_rate_limit_probability,
+            malformed_output_probability=config.fake_model_malformed_output_probability,
+        )
+    return model_name
@@ -0,0 +1,128 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import time
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import BaseLlm, LlmRequest, LlmResponse
+from google.adk.models.registry import LLMRegistry
+from pydantic import BaseModel, ValidationError
+
+from .config import config
+from .fake_llm import resolve_model
+from .rate_limit import rate_limit_callback
+from .usage import append_usage_record
+
+# Requests of the calls in flight of agents that may escalate, keyed by
+# (invocation, agent), so a failed answer can be asked again of the strong tier
+_requests_in_flight: dict[tuple[str, str], LlmRequest] = {}
+
+# Counters of how the schema-bound calls ended, for this process
+escalation_stats = {"calls": 0, "escalated": 0, "failed": 0}
+
+
+def _strong_llm() -> BaseLlm:
+    model = resolve_model(config.strong_model)
+    return model if isinstance(model, BaseLlm) else LLMRegistry.new_llm(model)
+
+
+def _response_text(llm_response: LlmResponse) -> str:
+    if not llm_response.content or not llm_response.content.parts:
+        return ""
+    return "".join(part.text or "" for part in llm_response.content.parts)
+
+
+def _is_valid(schema: type[BaseModel], llm_response: LlmResponse) -> bool:
+    try:
+        schema.model_validate_json(_response_text(llm_response))
+    except ValidationError:
+        return False
+    return True
+
+
+def remember_request_callback(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> None:
+    """Keeps the request of a schema-bound call so it can be escalated.
+
+    Args:
+        callback_context (CallbackContext): The context of the calling agent.
+        llm_request (LlmRequest): The request about to be sent to the model.
+    """
+    key = (callback_context.invocation_id, callback_context.agent_name)
+    _requests_in_flight[key] = llm_request.model_copy(deep=True)
+    return None
+
+
+def make_escalation_callback(schema: type[BaseModel]):
+    """Creates an after-model callback that escalates invalid structured output.
+
+    When the fast tier's response does not validate against `schema`, the same
+    request is sent once to the strong tier and its response replaces the
+    original one. Use it with `remember_request_callback` and put it last in
+    `after_model_callback`, after `record_usage_callback`.
+
+    Args:
+        schema (type[BaseModel]): The agent's `output_schema`.
+
+    Returns:
+        The async callback.
+    """
+
+    async def escalate_invalid_output_callback(
+        callback_context: CallbackContext, llm_response: LlmResponse
+    ) -> LlmResponse | None:
+        if llm_response.partial:
+            return None
+        key = (callback_context.invocation_id, callback_context.agent_name)
+        llm_request = _requests_in_flight.pop(key, None)
+        escalation_stats["calls"] += 1
+        if _is_valid(schema, llm_response):
+            return None
+        if (
+            llm_request is None
+            or not config.model_escalation
+            or llm_request.model == config.strong_model
+        ):
+            escalation_stats["failed"] += 1
+            return None
+
+        logging.warning(
+            f"[{callback_context.agent_name}] {llm_request.model} output does not match "
+            f"{schema.__name__}; escalating to {config.strong_model}."
+        )
+        llm_request.model = config.strong_model
+        await rate_limit_callback(callback_context, llm_request)
+        start = time.perf_counter()
+        strong_response = None
+        async for response in _strong_llm().generate_content_async(llm_request):
+            if not response.partial:
+                strong_response = response
+        if strong_response is None:
+            escalation_stats["failed"] += 1
+            return None
+        append_usage_record(
+            callback_context,
+            config.strong_model,
+            time.perf_counter() - start,
+            strong_response.usage_metadata,
+        )
+        escalation_stats["escalated"] += 1
+        logging.info(
+            f"[{callback_context.agent_name}] Escalation stats: {escalation_stats}"
+        )
+        return strong_response
+
+    return escalate_invalid_output_callback
@@ -0,0 +1,209 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import asyncio
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest
+
+from .config import config
+
+# Upper bound for one sleep so waiters re-check the shared buckets regularly
+MAX_POLL_INTERVAL = 5.0
+
+
+class TokenBucketRateLimiter:
+    """Per-model request-per-minute and token-per-minute buckets.
+
+    Bucket levels live in a SQLite file and are updated inside `BEGIN IMMEDIATE`
+    transactions, so the limit holds across event loops, threads and worker
+    processes that point at the same file. The store uses the same layout as
+    the LangGraph backend, so both stacks can share one budget by setting
+    `RATE_LIMIT_DB_PATH` to the same file.
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.path, check_same_thread=False, timeout=30, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS buckets (
+                model TEXT PRIMARY KEY,
+                requests REAL NOT NULL,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._queue_depth: dict[str, int] = defaultdict(int)
+        self._stats: dict[str, dict] = defaultdict(
+            lambda: {"acquired": 0, "waited": 0, "total_wait": 0.0, "max_wait": 0.0}
+        )
+
+    def try_acquire(self, model: str, tokens: int, rpm: int, tpm: int) -> float:
+        """Takes one request and `tokens` tokens from the model's buckets.
+
+        Returns:
+            float: 0 if the quota was taken, otherwise the number of seconds
+                until enough quota should be available.
+        """
+        # A single prompt larger than the whole minute budget can never fit, so cap it
+        tokens = min(tokens, tpm)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT requests, tokens, updated_at FROM buckets WHERE model = ?",
+                    (model,),
+                ).fetchone()
+                if row is None:
+                    requests_left, tokens_left = float(rpm), float(tpm)
+                else:
+                    elapsed = max(now - row[2], 0.0)
+                    requests_left = min(rpm, row[0] + elapsed * rpm / 60)
+                    tokens_left = min(tpm, row[1] + elapsed * tpm / 60)
+
+                if requests_left >= 1 and tokens_left >= tokens:
+                    requests_left -= 1
+                    tokens_left -= tokens
+                    wait = 0.0
+                else:
+                    wait = max(
+                        (1 - requests_left) * 60 / rpm,
+                        (tokens - tokens_left) * 60 / tpm,
+                    )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO buckets (model, requests, tokens, updated_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (model, requests_left, tokens_left, now),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    async def acquire(self, model: str, tokens: int, rpm: int, tpm: int) -> float:
+        """Waits until the model has quota for one request of `tokens` tokens.
+
+        Returns:
+            float: The number of seconds spent waiting.
+        """
+        if rpm <= 0 or tpm <= 0:
+            return 0.0
+        start = time.monotonic()
+        self._queue_depth[model] += 1
+        try:
+            while True:
+                wait = await asyncio.to_thread(
+                    self.try_acquire, model, tokens, rpm, tpm
+                )
+                if wait <= 0:
+                    break
+                # Jitter keeps waiters from waking up in lockstep
+                await asyncio.sleep(
+                    min(wait, MAX_POLL_INTERVAL) + random.uniform(0, 0.1)
+                )
+        finally:
+            self._queue_depth[model] -= 1
+        waited = time.monotonic() - start
+        stats = self._stats[model]
+        stats["acquired"] += 1
+        if waited > 0.01:
+            stats["waited"] += 1
+        stats["total_wait"] += waited
+        stats["max_wait"] = max(stats["max_wait"], waited)
+        return waited
+
+    def queue_depth(self, model: str | None = None) -> int:
+        """Returns the number of calls in this process currently waiting for quota."""
+        if model is not None:
+            return self._queue_depth[model]
+        return sum(self._queue_depth.values())
+
+    def snapshot(self) -> dict:
+        """Returns per-model queue depth and wait statistics for this process."""
+        return {
+            model: {**stats, "queue_depth": self._queue_depth[model]}
+            for model, stats in self._stats.items()
+        }
+
+
+_rate_limiter: TokenBucketRateLimiter | None = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> TokenBucketRateLimiter:
+    """Returns the process-wide rate limiter, creating its SQLite store on first use."""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = TokenBucketRateLimiter(config.rate_limit_db_path)
+        return _rate_limiter
+
+
+def estimate_request_tokens(llm_request: LlmRequest) -> int:
+    """Roughly estimates the prompt tokens of a request (about 4 characters per token)."""
+    chars = 0
+    if llm_request.config and isinstance(llm_request.config.system_instruction, str):
+        chars += len(llm_request.config.system_instruction)
+    for content in llm_request.contents or []:
+        for part in content.parts or []:
+            if part.text:
+                chars += len(part.text)
+    return (chars + 3) // 4
+
+
+async def rate_limit_callback(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> None:
+    """Waits for the shared per-model rate limit before every model call.
+
+    Without a limit configured the call goes through at once and the rate
+    limit store is never created.
+
+    Args:
+        callback_context (CallbackContext): The context of the calling agent.
+        llm_request (LlmRequest): The request about to be sent to the model.
+    """
+    if config.rate_limit_rpm <= 0 or config.rate_limit_tpm <= 0:
+        return None
+    rate_limiter = get_rate_limiter()
+    model = llm_request.model or config.fast_model
+    waited = await rate_limiter.acquire(
+        model,
+        estimate_request_tokens(llm_request),
+        config.rate_limit_rpm,
+        config.rate_limit_tpm,
+    )
+    if waited >= 1:
+        logging.info(
+            f"[{callback_context.agent_name}] Waited {waited:.2f}s for {model} quota "
+            f"(queue depth {rate_limiter.queue_depth(model)})"
+        )
+    return None
@@ -0,0 +1,244 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import re
+import time
+
+from google.adk.agents.callback_context import CallbackContext
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types as genai_types
+
+from .config import config
+from .context_cache import context_cache_stats
+
+USAGE_FIELDS = (
+    "prompt_tokens",
+    "output_tokens",
+    "thoughts_tokens",
+    "cached_tokens",
+    "total_tokens",
+)
+
+# State key prefix of the usage records; every agent appends to its own list
+USAGE_KEY_PREFIX = "token_usage:"
+
+# List prices in USD per million tokens as (input, cached input, output); only
+# used to estimate the cost of a session, models not listed count as free.
+# Keep in sync with MODEL_PRICES in langgraph_backend/src/agent/usage.py; the
+# unit tests of both stacks fail when the two tables differ.
+MODEL_PRICES = {
+    "gemini-2.5-pro": (1.25, 0.31, 10.0),
+    "gemini-2.5-flash": (0.30, 0.075, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.025, 0.40),
+}
+
+# State key prefix of the start time and model of an agent's model call in flight.
+# "temp:" keys only live for the invocation, so a call that raises and never
+# reaches `record_usage_callback` leaves nothing behind once the invocation ends.
+# Parallel sub-researchers have distinct agent names, so the keys never collide.
+CALL_KEY_PREFIX = "temp:model_call:"
+
+
+def start_model_timer_callback(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> None:
+    """Remembers when a model call starts so its latency can be recorded.
+
+    Args:
+        callback_context (CallbackContext): The context of the calling agent.
+        llm_request (LlmRequest): The request about to be sent to the model.
+    """
+    callback_context.state[CALL_KEY_PREFIX + callback_context.agent_name] = [
+        time.perf_counter(),
+        llm_request.model or "",
+    ]
+    return None
+
+
+def model_tier(model: str) -> str:
+    """Returns the routing tier ("fast" or "strong") a model is configured for."""
+    if model == config.strong_model:
+        return "strong"
+    if model == config.fast_model:
+        return "fast"
+    return "other"
+
+
+def estimate_cost(model: str, record: dict) -> float:
+    """Estimates the USD cost of one model call from its token counts.
+
+    Cached prompt tokens are billed at the cached price, the rest of the
+    prompt at the input price, and thinking tokens like output tokens. The
+    LangGraph stack prices its calls by the same rule.
+    """
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        return 0.0
+    input_price, cached_price, output_price = prices
+    cached = record["cached_tokens"]
+    return (
+        (record["prompt_tokens"] - cached) * input_price
+        + cached * cached_price
+        + (record["output_tokens"] + record["thoughts_tokens"]) * output_price
+    ) / 1_000_000
+
+
+def append_usage_record(
+    callback_context: CallbackContext,
+    model: str,
+    latency: float,
+    usage: genai_types.GenerateContentResponseUsageMetadata | None,
+) -> dict:
+    """Appends the usage of one model call to the calling agent's usage list.
+
+    Each agent has its own `token_usage:<agent>` state key, so the state delta
+    of a call only holds that agent's records, and parallel sub-researchers
+    never overwrite each other's lists.
+
+    Args:
+        callback_context (CallbackContext): The context of the calling agent.
+        model (str): The model that answered.
+        latency (float): Seconds the call took.
+        usage (GenerateContentResponseUsageMetadata | None): Token counts of the response.
+
+    Returns:
+        dict: The appended record.
+    """
+    record = {
+        "agent": callback_context.agent_name,
+        "model": model,
+        "tier": model_tier(model),
+        "latency": round(latency, 3),
+        "prompt_tokens": (usage and usage.prompt_token_count) or 0,
+        "output_tokens": (usage and usage.candidates_token_count) or 0,
+        "thoughts_tokens": (usage and usage.thoughts_token_count) or 0,
+        "cached_tokens": (usage and usage.cached_content_token_count) or 0,
+        "total_tokens": (usage and usage.total_token_count) or 0,
+    }
+    record["cost_usd"] = round(estimate_cost(model, record), 6)
+    key = USAGE_KEY_PREFIX + callback_context.agent_name
+    callback_context.state[key] = [*callback_context.state.get(key, []), record]
+    logging.info(f"[{record['agent']}] Model usage: {record}")
+    return record
+
+
+def record_usage_callback(
+    callback_context: CallbackContext, llm_response: LlmResponse
+) -> None:
+    """Appends the token usage and latency of a model call to the agent's usage list.
+
+    Partial streaming chunks are skipped; the complete response carries the usage.
+
+    Args:
+        callback_context (CallbackContext): The context of the calling agent.
+        llm_response (LlmResponse): The response returned by the model.
+    """
+    if llm_response.partial:
+        return None
+    key = CALL_KEY_PREFIX + callback_context.agent_name
+    start, model = callback_context.state.get(key) or (None, "")
+    callback_context.state[key] = None
+    append_usage_record(
+        callback_context,
+        model,
+        time.perf_counter() - start if start else 0.0,
+        llm_response.usage_metadata,
+    )
+    return None
+
+
+def _empty_totals() -> dict:
+    return {
+        "calls": 0,
+        "latency": 0.0,
+        "cost_usd": 0.0,
+        **dict.fromkeys(USAGE_FIELDS, 0),
+    }
+
+
+def summarize_usage(records: list[dict]) -> dict:
+    """Aggregates usage records in total and per agent, pipeline stage, model and tier.
+
+    Args:
+        records (list[dict]): Records written by `record_usage_callback`, as
+            collected by `usage_records`.
+
+    Returns:
+        dict: Totals under "total", "by_agent", "by_stage", "by_model" and
+            "by_tier". A stage groups the numbered sub-researchers of one parallel
+            research pass.
+    """
+    summary = {
+        "total": _empty_totals(),
+        "by_agent": {},
+        "by_stage": {},
+        "by_model": {},
+        "by_tier": {},
+    }
+    for record in records:
+        for totals in (
+            summary["total"],
+            summary["by_agent"].setdefault(record["agent"], _empty_totals()),
+            summary["by_stage"].setdefault(
+                re.sub(r"_\d+$", "", record["agent"]), _empty_totals()
+            ),
+            summary["by_model"].setdefault(record["model"], _empty_totals()),
+            summary["by_tier"].setdefault(
+                record.get("tier") or model_tier(record["model"]), _empty_totals()
+            ),
+        ):
+            totals["calls"] += 1
+            totals["latency"] = round(totals["latency"] + record["latency"], 3)
+            totals["cost_usd"] = round(
+                totals["cost_usd"] + record.get("cost_usd", 0.0), 6
+            )
+            for field in USAGE_FIELDS:
+                totals[field] += record[field]
+    return summary
+
+
+def usage_records(state: dict) -> list[dict]:
+    """Collects the usage records of every agent from the session state."""
+    return [
+        record
+        for key, records in state.items()
+        if key.startswith(USAGE_KEY_PREFIX)
+        for record in records or []
+    ]
+
+
+def usage_summary_callback(callback_context: CallbackContext) -> None:
+    """Stores the usage summary of the session in `usage_summary` and logs it.
+
+    Args:
+        callback_context (CallbackContext): Provides access to the recorded usage.
+    """
+    summary = summarize_usage(usage_records(callback_context.state.to_dict()))
+    callback_context.state["usage_summary"] = summary
+    for stage, totals in summary["by_stage"].items():
+        logging.info(f"[{callback_context.agent_name}] Usage of {stage}: {totals}")
+    for tier, totals in summary["by_tier"].items():
+        logging.info(
+            f"[{callback_context.agent_name}] Usage of the {tier} tier: {totals}"
+        )
+    logging.info(f"[{callback_context.agent_name}] Total usage: {summary['total']}")
+    total = summary["total"]
+    if total["prompt_tokens"]:
+        logging.info(
+            f"[{callback_context.agent_name}] Cached prompt tokens: {total['cached_tokens']} of "
+            f"{total['prompt_tokens']} ({total['cached_tokens'] / total['prompt_tokens']:.0%}); "
+            f"context cache: {context_cache_stats()}"
+        )
+    return None
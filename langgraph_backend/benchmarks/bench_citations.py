@@ -0,0 +1,158 @@
+"""Micro-benchmark for the citation helpers in agent.utils.
+
+Times `insert_citation_markers` and `get_citations` against the original
+slice-per-citation / list-index implementations on synthetic grounded
+responses. That both produce identical output is checked by
+tests/unit_tests/test_citations.py.
+
+Usage:
+    uv run --with-editable . python benchmarks/bench_citations.py --supports 50 200 800
+"""
+
+import argparse
+import random
+import timeit
+
+from langchain_core.messages import AIMessage
+
+from agent.utils import get_citations, insert_citation_markers, resolve_urls
+
+
+def legacy_insert_citation_markers(text, citations_list):
+    """Insert citation markers with the original slice-per-citation algorithm."""
+    # The original algorithm, with markers in the current `[label](short_url)` format
+    sorted_citations = sorted(
+        citations_list, key=lambda c: (c["end_index"], c["start_index"]), reverse=True
+    )
+    modified_text = text
+    for citation_info in sorted_citations:
+        end_idx = citation_info["end_index"]
+        marker_to_insert = ""
+        for segment in citation_info["segments"]:
+            marker_to_insert += f" [{segment['label']}]({segment['short_url']})"
+        modified_text = (
+            modified_text[:end_idx] + marker_to_insert + modified_text[end_idx:]
+        )
+    return modified_text
+
+
+def legacy_get_citations(response_message, resolved_urls_map):
+    """Extract citations with the original list-index label lookup."""
+    citations = []
+    metadata = response_message.response_metadata.get("grounding_metadata", {})
+    grounding_chunks = metadata.get("grounding_chunks", [])
+    grounding_supports = metadata.get("grounding_supports", [])
+    for support in grounding_supports:
+        segment = support.get("segment", {})
+        end_index = segment.get("end_index")
+        if end_index is None:
+            continue
+        citation = {
+            "start_index": segment.get("start_index", 0),
+            "end_index": end_index,
+            "segments": [],
+        }
+        for ind in support.get("grounding_chunk_indices", []):
+            try:
+                chunk = grounding_chunks[ind]
+                uri = chunk.get("web", {}).get("uri")
+                resolved_url = resolved_urls_map.get(uri, None)
+                if resolved_url:
+                    citation["segments"].append(
+                        {
+                            "label": str(
+                                len(resolved_urls_map)
+                                - list(resolved_urls_map.keys()).index(uri)
+                            ),
+                            "short_url": resolved_url,
+                            "value": uri,
+                            "title": chunk.get("web", {}).get("title"),
+                        }
+                    )
+            except (IndexError, AttributeError, KeyError):
+                pass
+        citations.append(citation)
+    return citations
+
+
+def make_response(num_supports: int, seed: int) -> AIMessage:
+    """Build a grounded response with `num_supports` supports over ~num_supports/2 sources."""
+    rng = random.Random(seed)
+    num_chunks = max(1, num_supports // 2)
+    text = " ".join(
+        f"Sentence {i} about the topic with some detail."
+        for i in range(num_supports * 2)
+    )
+    chunks = [
+        {
+            "web": {
+                "uri": f"https://example.com/{rng.randrange(num_chunks * 2)}",
+                "title": f"t{i}",
+            }
+        }
+        for i in range(num_chunks)
+    ]
+    supports = []
+    for _ in range(num_supports):
+        end = rng.randrange(1, len(text) + 1)
+        supports.append(
+            {
+                "segment": {"start_index": rng.randrange(end), "end_index": end},
+                "grounding_chunk_indices": rng.sample(
+                    range(num_chunks), min(3, num_chunks)
+                ),
+            }
+        )
+    # Repeat a few positions exactly to exercise tie ordering
+    supports.extend(supports[: num_supports // 10])
+    return AIMessage(
+        content=text,
+        response_metadata={
+            "grounding_metadata": {
+                "grounding_chunks": chunks,
+                "grounding_supports": supports,
+            }
+        },
+    )
+
+
+def time_helpers(num_supports: int, number: int) -> tuple[float, float, float, float]:
+    """Time both implementations of each helper, in ms per call."""
+    response = make_response(num_supports, 0)
+    chunks = response.response_metadata["grounding_metadata"]["grounding_chunks"]
+    resolved = resolve_urls(chunks, 0)
+    citations = get_citations(response, resolved)
+
+    def ms(fn):
+        return timeit.timeit(fn, number=number) / number * 1000
+
+    return (
+        ms(lambda: legacy_get_citations(response, resolved)),
+        ms(lambda: get_citations(response, resolved)),
+        ms(lambda: legacy_insert_citation_markers(response.content, citations)),
+        ms(lambda: insert_citation_markers(response.content, citations)),
+    )
+
+
+def main():
+    """Time the citation helpers against the originals for each number of supports."""
+    parser = argparse.ArgumentParser(description="Benchmark the citation helpers")
+    parser.add_argument("--supports", type=int, nargs="+", default=[50, 200, 800])
+    parser.add_argument(
+        "--number", type=int, default=20, help="Timing iterations per measurement"
+    )
+    args = parser.parse_args()
+
+    print(f"{'supports':>8} {'get_citations':>26} {'insert_citation_markers':>30}")  # noqa: T201
+    for num_supports in args.supports:
+        old_get, new_get, old_insert, new_insert = time_helpers(
+            num_supports, args.number
+        )
+        print(  # noqa: T201
+            f"{num_supports:>8} {old_get:>9.3f} -> {new_get:>7.3f} ms "
+            f"{old_insert:>12.3f} -> {new_insert:>7.3f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+"""Benchmark the research graph end to end on the offline fake model backend.
+
+Runs the compiled `pro-search-agent` graph over a matrix of
+`initial_search_query_count` x `max_research_loops` x `num_parallel_tasks`
+and reports per-node wall time, event-loop lag, memory, checkpointable state
+size and runs per minute. Results are written as JSON so two commits can be
+compared with `--compare`.
+
+Usage:
+    uv run --with-editable . python benchmarks/bench_graph.py
+    uv run --with-editable . python benchmarks/bench_graph.py --initial-queries 5 30 --max-loops 3 --compare old.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import pickle
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import UTC, datetime
+from itertools import product
+
+# Select the fake backend before the graph module reads its startup configuration
+os.environ.setdefault("MODEL_BACKEND", "fake")
+os.environ.setdefault("WARM_MODEL_CLIENTS", "false")
+
+from agent.checkpoint_store import BlobCheckpointSaver  # noqa: E402
+from agent.graph import builder, graph  # noqa: E402
+from agent.structured_output import structured_output_stats  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+class LoopLagMonitor:
+    """Measure how late the event loop wakes up a task that sleeps `interval` seconds."""
+
+    def __init__(self, interval: float = 0.01):
+        """Sample the loop every `interval` seconds."""
+        self.interval = interval
+        self.lags: list[float] = []
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(loop.time() - start - self.interval, 0.0))
+
+    def __enter__(self):
+        """Start sampling on the running event loop."""
+        self._task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    def __exit__(self, *exc):
+        """Stop sampling."""
+        self._task.cancel()
+
+    def summary(self) -> dict:
+        """Return the mean, p99 and max lag in milliseconds."""
+        if not self.lags:
+            return {"mean_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        lags = sorted(self.lags)
+        return {
+            "mean_ms": round(statistics.fmean(lags) * 1000, 3),
+            "p99_ms": round(lags[min(len(lags) - 1, int(len(lags) * 0.99))] * 1000, 3),
+            "max_ms": round(lags[-1] * 1000, 3),
+        }
+
+
+def process_peak_rss_mb() -> float:
+    """Return the peak resident set size of the whole process so far in MB.
+
+    This is a high-water mark: a cell run after a larger one reports the larger
+    cell's value. Use `--trace-memory` for a per-cell peak.
+    """
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    return round(usage / (1024 * 1024 if sys.platform == "darwin" else 1024), 2)
+
+
+async def run_once(
+    initial_queries: int, max_loops: int, parallel: int, args, saver=None
+) -> dict:
+    """Run the graph once and collect timings from the debug stream."""
+    log_path = os.path.join(tempfile.gettempdir(), "bench_graph_server.log")
+    run_graph = (
+        graph
+        if saver is None
+        else builder.compile(name="pro-search-agent", checkpointer=saver)
+    )
+    config = {
+        "recursion_limit": 1000,
+        "configurable": {
+            "thread_id": f"bench-{initial_queries}-{max_loops}-{parallel}-{time.time_ns()}",
+            "model_backend": "fake",
+            "fake_model_latency_seconds": args.latency,
+            "fake_model_rate_limit_probability": args.rate_limit_probability,
+            "fake_model_malformed_output_probability": args.malformed_output_probability,
+            "num_parallel_tasks": parallel,
+            "concurrency_mode": args.concurrency_mode,
+            "search_cache_mode": args.search_cache,
+            "search_cache_path": os.path.join(args.work_dir, "search_cache.sqlite3"),
+            "summary_store_mode": args.summary_store,
+            "summary_store_path": os.path.join(args.work_dir, "summaries.sqlite3"),
+            "rate_limit_rpm": 0,
+            "server_log_path": log_path,
+        },
+    }
+    input_data = {
+        "messages": [("user", args.topic)],
+        "initial_search_query_count": initial_queries,
+        "max_research_loops": max_loops,
+    }
+
+    task_starts: dict[str, tuple[str, datetime]] = {}
+    node_times: dict[str, list[float]] = defaultdict(list)
+    final_state = None
+    start = time.perf_counter()
+    with LoopLagMonitor() as lag:
+        async for mode, chunk in run_graph.astream(
+            input_data, config, stream_mode=["debug", "values"]
+        ):
+            if mode == "values":
+                final_state = chunk
+                continue
+            payload = chunk.get("payload", {})
+            timestamp = datetime.fromisoformat(
+                chunk["timestamp"].replace("Z", "+00:00")
+            )
+            if chunk["type"] == "task":
+                task_starts[payload["id"]] = (payload["name"], timestamp)
+            elif chunk["type"] == "task_result" and payload["id"] in task_starts:
+                name, started = task_starts.pop(payload["id"])
+                node_times[name].append((timestamp - started).total_seconds())
+    wall_time = time.perf_counter() - start
+
+    checkpoints = {}
+    if saver is not None:
+        stats = saver.stats(config["configurable"]["thread_id"])
+        checkpoints = {
+            "count": sum(thread["checkpoints"] for thread in stats["threads"].values()),
+            "logical_bytes": stats["logical_bytes"],
+            "store_file_bytes": stats["file_bytes"],
+        }
+
+    return {
+        "wall_time_s": round(wall_time, 4),
+        "nodes": {
+            name: {
+                "calls": len(times),
+                "total_s": round(sum(times), 4),
+                "mean_s": round(statistics.fmean(times), 4),
+                "max_s": round(max(times), 4),
+            }
+            for name, times in sorted(node_times.items())
+        },
+        "event_loop_lag": lag.summary(),
+        "state_size_bytes": len(pickle.dumps(final_state)) if final_state else 0,
+        "research_loops": (final_state or {}).get("research_loop_count", 0),
+        "queries_run": len((final_state or {}).get("search_query", [])),
+        "token_usage": (final_state or {}).get("usage_summary", {}).get("total", {}),
+        "tiers": (final_state or {}).get("usage_summary", {}).get("by_tier", {}),
+        "checkpoints": checkpoints,
+    }
+
+
+async def run_matrix(args) -> list[dict]:
+    """Run every cell of the benchmark matrix `args.repeat` times."""
+    results = []
+    saver = (
+        BlobCheckpointSaver(args.checkpoint_store) if args.checkpoint_store else None
+    )
+    for initial_queries, max_loops, parallel in product(
+        args.initial_queries, args.max_loops, args.parallel
+    ):
+        if args.trace_memory:
+            tracemalloc.reset_peak()
+        runs = [
+            await run_once(initial_queries, max_loops, parallel, args, saver)
+            for _ in range(args.repeat)
+        ]
+        traced_peak_mb = (
+            round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+            if args.trace_memory
+            else None
+        )
+        total_time = sum(run["wall_time_s"] for run in runs)
+        result = {
+            "initial_search_query_count": initial_queries,
+            "max_research_loops": max_loops,
+            "num_parallel_tasks": parallel,
+            "repeat": args.repeat,
+            "runs_per_minute": round(60 * len(runs) / total_time, 2)
+            if total_time
+            else None,
+            "mean_wall_time_s": round(total_time / len(runs), 4),
+            "process_peak_rss_mb": process_peak_rss_mb(),
+            "traced_peak_mb": traced_peak_mb,
+            "runs": runs,
+        }
+        results.append(result)
+        print(  # noqa: T201
+            f"queries={initial_queries:<3} loops={max_loops:<3} parallel={parallel:<3} "
+            f"wall={result['mean_wall_time_s']:.3f}s runs/min={result['runs_per_minute']} "
+            f"process_rss={result['process_peak_rss_mb']}MB "
+            + (f"traced={traced_peak_mb}MB " if args.trace_memory else "")
+            + f"state={runs[-1]['state_size_bytes']}B "
+            f"lag_max={runs[-1]['event_loop_lag']['max_ms']}ms"
+        )
+    return results
+
+
+def git_commit() -> str:
+    """Return the short hash of the checked-out commit, or "unknown"."""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def matrix_key(result: dict) -> tuple:
+    """Return the matrix cell a result belongs to."""
+    return (
+        result["initial_search_query_count"],
+        result["max_research_loops"],
+        result["num_parallel_tasks"],
+    )
+
+
+def compare(previous_path: str, results: list[dict]) -> None:
+    """Print the change in mean wall time against a previous results file."""
+    with open(previous_path, encoding="utf-8") as f:
+        previous = json.load(f)
+    baseline = {matrix_key(r): r for r in previous["results"]}
+    print(f"\n--- Compared with {previous['meta']['commit']} ---")  # noqa: T201
+    for result in results:
+        if (old := baseline.get(matrix_key(result))) is None:
+            continue
+        change = (
+            (result["mean_wall_time_s"] - old["mean_wall_time_s"])
+            / old["mean_wall_time_s"]
+            * 100
+        )
+        print(  # noqa: T201
+            "queries={:<3} loops={:<3} parallel={:<3} ".format(*matrix_key(result))
+            + f"{old['mean_wall_time_s']:.3f}s -> {result['mean_wall_time_s']:.3f}s ({change:+.1f}%)"
+        )
+
+
+def main():
+    """Run the benchmark matrix and write, print and optionally compare the results."""
+    parser = argparse.ArgumentParser(description="Benchmark the research graph offline")
+    parser.add_argument("--initial-queries", type=int, nargs="+", default=[3, 10, 30])
+    parser.add_argument("--max-loops", type=int, nargs="+", default=[1, 3])
+    parser.add_argument("--parallel", type=int, nargs="+", default=[4, 16])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="Fake model latency in seconds"
+    )
+    parser.add_argument("--rate-limit-probability", type=float, default=0.0)
+    parser.add_argument(
+        "--malformed-output-probability",
+        type=float,
+        default=0.0,
+        help="Share of fake structured-output responses that need repair or a re-ask",
+    )
+    parser.add_argument(
+        "--concurrency-mode", choices=["adaptive", "fixed"], default="fixed"
+    )
+    parser.add_argument(
+        "--topic", default="Impact of open-source licensing on cloud vendors"
+    )
+    parser.add_argument(
+        "--output",
+        help="Results file (default: benchmarks/results/<time>-<commit>.json)",
+    )
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    parser.add_argument(
+        "--search-cache",
+        choices=["off", "read_write", "refresh"],
+        default="off",
+        help="Search cache mode; the cache lives in a temporary directory, so "
+        "'read_write' measures repeated runs served from the cache",
+    )
+    parser.add_argument(
+        "--checkpoint-store",
+        help="Checkpoint every run into this blob store file and report its size",
+    )
+    parser.add_argument(
+        "--summary-store",
+        choices=["inline", "sqlite"],
+        default="inline",
+        help="Summary store mode; the side store lives in the temporary directory",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Report each cell's peak Python allocation with tracemalloc, which "
+        "slows the runs down",
+    )
+    args = parser.parse_args()
+
+    # Files the runs write (search cache, summary store) go to a directory
+    # removed afterwards
+    with tempfile.TemporaryDirectory(prefix="bench_graph-") as work_dir:
+        args.work_dir = work_dir
+        if args.trace_memory:
+            tracemalloc.start()
+        try:
+            results = asyncio.run(run_matrix(args))
+        finally:
+            tracemalloc.stop()
+
+    commit = git_commit()
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{commit}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "meta": {
+                    "commit": commit,
+                    "timestamp": datetime.now(UTC).isoformat(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "args": vars(args),
+                },
+                "results": results,
+                "structured_output": structured_output_stats.snapshot(),
+            },
+            f,
+            indent=2,
+        )
+    for schema_name, stats in structured_output_stats.snapshot().items():
+        print(  # noqa: T201
+            f"{schema_name}: {stats['calls']} calls, {stats['repaired']} repaired, "
+            f"{stats['reasked']} re-asked, {stats['escalated']} escalated, {stats['failed']} failed"
+        )
+    print(f"\n--- Results saved to {output} ---")  # noqa: T201
+
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+"""Research many topics concurrently against a LangGraph server, resumably."""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import statistics
+import time
+from datetime import datetime
+
+from cli_research import (
+    SERVER_URL,
+    EventLogOptions,
+    add_log_arguments,
+    log_options_from_args,
+    run_research,
+)
+from langgraph_sdk.client import get_client
+
+MANIFEST_NAME = "batch_manifest.json"
+REPORT_NAME = "batch_report.json"
+TOPIC_SUFFIXES = (".txt", ".md")
+
+
+def topic_id(name: str) -> str:
+    """Turn a file name or manifest id into a safe file name stem."""
+    return re.sub(r"[^\w.-]+", "_", name).strip("._") or "topic"
+
+
+def load_topics(source: str, initial_queries: int, max_loops: int) -> dict:
+    """Read the topics of a batch from a directory of query files or a JSON-lines manifest.
+
+    Every manifest line holds an optional `id`, either `query` or `file` (relative
+    to the manifest) and optionally its own `initial_queries` and `max_loops`.
+    """
+    entries = []
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if name.endswith(TOPIC_SUFFIXES):
+                entries.append(
+                    {
+                        "id": os.path.splitext(name)[0],
+                        "file": os.path.join(source, name),
+                    }
+                )
+    else:
+        with open(source, encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if "file" in entry:
+                    entry["file"] = os.path.join(
+                        os.path.dirname(os.path.abspath(source)), entry["file"]
+                    )
+                    entry.setdefault(
+                        "id", os.path.splitext(os.path.basename(entry["file"]))[0]
+                    )
+                entry.setdefault("id", f"topic_{number}")
+                entries.append(entry)
+
+    topics = {}
+    for entry in entries:
+        key = topic_id(str(entry["id"]))
+        if key in topics:
+            raise ValueError(f"Duplicate topic id: {key}")
+        if "file" in entry:
+            with open(entry["file"], encoding="utf-8") as f:
+                query = f.read()
+        else:
+            query = entry["query"]
+        topics[key] = {
+            "query": query,
+            "initial_queries": entry.get("initial_queries", initial_queries),
+            "max_loops": entry.get("max_loops", max_loops),
+        }
+    return topics
+
+
+class BatchManifest:
+    """Progress of a batch, saved after every change so a crashed batch can resume.
+
+    A topic is "pending", "running", "done" or "failed". Topics that were
+    running when the batch died are run again from the start.
+    """
+
+    def __init__(self, path: str):
+        """Load the manifest at `path`, or start an empty one."""
+        self.path = path
+        self.data = {"created_at": datetime.now().isoformat(), "topics": {}}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.data = json.load(f)
+
+    @property
+    def topics(self) -> dict:
+        """Return the per-topic progress, keyed by topic id."""
+        return self.data["topics"]
+
+    def add(self, key: str, topic: dict) -> None:
+        """Register a topic as pending unless the manifest already tracks it."""
+        self.topics.setdefault(
+            key,
+            {
+                "status": "pending",
+                "attempts": 0,
+                "initial_queries": topic["initial_queries"],
+                "max_loops": topic["max_loops"],
+            },
+        )
+
+    def pending(self, keys) -> list:
+        """Return the topics among `keys` still to run; running and failed ones run again."""
+        return [key for key in keys if self.topics[key]["status"] != "done"]
+
+    def update(self, key: str, **fields) -> None:
+        """Update a topic's progress and save the manifest."""
+        self.topics[key].update(fields)
+        self.save()
+
+    def save(self) -> None:
+        """Write the manifest atomically."""
+        # Write to a temp file first so a crash never leaves a truncated manifest
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+async def run_topic(
+    client,
+    key: str,
+    topic: dict,
+    manifest: BatchManifest,
+    output_path: str,
+    semaphore: asyncio.Semaphore,
+    retries: int,
+    log_options: EventLogOptions,
+) -> None:
+    """Research one topic under the batch's concurrency cap, recording its progress."""
+    async with semaphore:
+        for attempt in range(retries + 1):
+            manifest.update(
+                key,
+                status="running",
+                attempts=manifest.topics[key]["attempts"] + 1,
+                started_at=datetime.now().isoformat(),
+                error=None,
+            )
+            print(f"--- [{key}] started (attempt {attempt + 1}) ---", flush=True)  # noqa: T201
+            try:
+                result = await run_research(
+                    client,
+                    topic["query"],
+                    topic["initial_queries"],
+                    topic["max_loops"],
+                    output_path,
+                    key,
+                    echo=False,
+                    log_options=log_options,
+                )
+            except Exception as e:
+                manifest.update(
+                    key,
+                    status="failed",
+                    finished_at=datetime.now().isoformat(),
+                    error=f"{type(e).__name__}: {e}",
+                )
+                print(f"--- [{key}] failed: {type(e).__name__}: {e} ---", flush=True)  # noqa: T201
+                continue
+            manifest.update(
+                key, status="done", finished_at=datetime.now().isoformat(), **result
+            )
+            print(  # noqa: T201
+                f"--- [{key}] done in {result['timings']['total_s']:.1f}s: "
+                f"{result['completion_reason']} ---",
+                flush=True,
+            )
+            return
+
+
+def percentile(values: list, fraction: float) -> float:
+    """Return the value at `fraction` of the sorted values, nearest rank."""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def build_report(
+    manifest: BatchManifest, ran: list, wall_time: float, concurrency: int
+) -> dict:
+    """Aggregate the per-topic timings of the batch.
+
+    `ran` lists the topics run by this process; the speedup only counts them.
+    """
+    topics = manifest.topics
+    done = {key: topic for key, topic in topics.items() if topic["status"] == "done"}
+    totals = [topic["timings"]["total_s"] for topic in done.values()]
+    totals_ran = [done[key]["timings"]["total_s"] for key in ran if key in done]
+    answers = [
+        topic["timings"]["time_to_answer_s"]
+        for topic in done.values()
+        if "time_to_answer_s" in topic["timings"]
+    ]
+    report = {
+        "finished_at": datetime.now().isoformat(),
+        "concurrency": concurrency,
+        "wall_time_s": round(wall_time, 3),
+        "topics": len(topics),
+        "done": len(done),
+        "failed": sorted(
+            key for key, topic in topics.items() if topic["status"] == "failed"
+        ),
+        "total_tokens": sum(
+            topic.get("token_usage", {}).get("total_tokens", 0)
+            for topic in done.values()
+        ),
+        "per_topic": {
+            key: {
+                "status": topic["status"],
+                "attempts": topic["attempts"],
+                "research_loops": topic.get("research_loops"),
+                "stop_reason": topic.get("stop_reason"),
+                **topic.get("timings", {}),
+            }
+            for key, topic in topics.items()
+        },
+    }
+    if totals:
+        report["topic_time_s"] = {
+            "sum": round(sum(totals), 3),
+            "mean": round(statistics.fmean(totals), 3),
+            "p50": round(percentile(totals, 0.5), 3),
+            "p95": round(percentile(totals, 0.95), 3),
+            "max": round(max(totals), 3),
+        }
+        # How much the concurrent runs overlapped
+        report["speedup"] = round(sum(totals_ran) / wall_time, 2) if wall_time else None
+    if answers:
+        report["time_to_answer_s"] = {
+            "mean": round(statistics.fmean(answers), 3),
+            "p95": round(percentile(answers, 0.95), 3),
+        }
+    return report
+
+
+def main():
+    """Run many research topics concurrently over one LangGraph SDK client."""
+    parser = argparse.ArgumentParser(description="AI Research Agent Batch Client")
+    parser.add_argument(
+        "topics",
+        type=str,
+        help="A directory of query files (.txt, .md) or a JSON-lines manifest of topics.",
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=str,
+        help="Batch directory; pass the directory of an interrupted batch to resume it.",
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=4, help="Topics researched at the same time"
+    )
+    parser.add_argument(
+        "--retries", type=int, default=1, help="Retries of a failed topic"
+    )
+    parser.add_argument(
+        "--initial-queries",
+        type=int,
+        default=3,
+        help="Number of initial search queries",
+    )
+    parser.add_argument(
+        "--max-loops", type=int, default=2, help="Maximum number of research loops"
+    )
+    parser.add_argument(
+        "--url", type=str, default=SERVER_URL, help="LangGraph server url"
+    )
+    add_log_arguments(parser)
+    args = parser.parse_args()
+    log_options = log_options_from_args(args)
+
+    topics = load_topics(args.topics, args.initial_queries, args.max_loops)
+    base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+    output_path = args.output_dir or os.path.join(
+        base_path, "outputs", f"batch_{datetime.now().strftime('%d%m%Y_%H%M%S')}"
+    )
+    os.makedirs(output_path, exist_ok=True)
+
+    manifest = BatchManifest(os.path.join(output_path, MANIFEST_NAME))
+    for key, topic in topics.items():
+        manifest.add(key, topic)
+    manifest.save()
+    todo = manifest.pending(topics)
+    print(  # noqa: T201
+        f"--- {len(topics)} topics, {len(topics) - len(todo)} already done, "
+        f"running {len(todo)} with concurrency {args.concurrency} ---"
+    )
+
+    async def run_batch():
+        # One client, and with it one connection pool, for every run of the batch
+        client = get_client(url=args.url, timeout=None)
+        semaphore = asyncio.Semaphore(args.concurrency)
+        await asyncio.gather(
+            *(
+                run_topic(
+                    client,
+                    key,
+                    topics[key],
+                    manifest,
+                    output_path,
+                    semaphore,
+                    args.retries,
+                    log_options,
+                )
+                for key in todo
+            )
+        )
+
+    start = time.perf_counter()
+    try:
+        asyncio.run(run_batch())
+    finally:
+        report = build_report(
+            manifest, todo, time.perf_counter() - start, args.concurrency
+        )
+        report_path = os.path.join(output_path, REPORT_NAME)
+        with open(report_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print("\n--- Batch Report ---")  # noqa: T201
+    for key, topic in report["per_topic"].items():
+        print(  # noqa: T201
+            f"{key:<32} {topic['status']:<8} total={topic.get('total_s', 0):.1f}s "
+            f"answer_after={topic.get('time_to_answer_s', 0):.1f}s loops={topic['research_loops']}"
+        )
+    if "topic_time_s" in report:
+        print(  # noqa: T201
+            f"wall={report['wall_time_s']:.1f}s sum={report['topic_time_s']['sum']:.1f}s "
+            f"p50={report['topic_time_s']['p50']:.1f}s p95={report['topic_time_s']['p95']:.1f}s "
+            f"speedup={report['speedup']}x tokens={report['total_tokens']}"
+        )
+    print(f"--- Report saved to {report_path} ---")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
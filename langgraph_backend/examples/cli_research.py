@@ -1,175 +1,434 @@
 import argparse
-import os
 import asyncio
+import heapq
+import json
 import logging
-from pprint import pformat
-from langgraph_sdk.client import get_client
+import os
+import re
+import time
+from dataclasses import dataclass
 from datetime import datetime
+from fnmatch import fnmatch
+from logging.handlers import RotatingFileHandler
+from typing import Iterator
 
-def main():
-    """Main function to run the research agent via the LangGraph SDK."""
-    parser = argparse.ArgumentParser(description="AI Research Agent Client")
-    parser.add_argument(
-        "query_or_file",
-        type=str,
-        help="The research query or a path to a text file containing the query.",
-    )
-    parser.add_argument(
-        "--initial-queries",
-        type=int,
-        default=3,
-        help="Number of initial search queries",
-    )
-    parser.add_argument(
-        "--max-loops",
-        type=int,
-        default=2,
-        help="Maximum number of research loops",
-    )
-    args = parser.parse_args()
+from langgraph_sdk.client import get_client
 
-    query = args.query_or_file
-    if os.path.isfile(query):
-        with open(query, "r", encoding="utf-8") as f:
-            query = f.read()
+SERVER_URL = "http://127.0.0.1:2024"
 
-    # --- Setup Logging Paths ---
-    start_time = datetime.now()
-    date_folder = start_time.strftime("%d%m%Y")
-    base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
-    output_path = os.path.join(base_path, "outputs", date_folder)
-    os.makedirs(output_path, exist_ok=True)
-    
-    time_filename = start_time.strftime("%H%M%d%m")
-    research_base_name = f"research_{time_filename}"
-    
-    # Define paths for final and temp log files
-    final_log_path = os.path.join(output_path, f"{research_base_name}.log")
-    client_tmp_log_path = os.path.join(output_path, f"{research_base_name}.client.tmp")
-    server_tmp_log_path = os.path.join(output_path, f"{research_base_name}.server.tmp")
+STREAM_MODES = ("events", "updates", "values", "debug")
 
-    # Setup client-side logger to write to its temp file
-    client_logger = logging.getLogger('ClientEventLogger')
+# Token-by-token events make up most of an "events" stream and carry no
+# information the final state does not have
+DEFAULT_LOG_EXCLUDE = ("on_chat_model_stream", "on_llm_stream", "on_chain_stream")
+
+# Lines of the server debug log start with the same asctime as the client records
+SERVER_LOG_LINE = re.compile(
+    r"^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d,\d{3}) - SERVER - (\w+) - (.*)$"
+)
+
+
+@dataclass
+class EventLogOptions:
+    """What the client event log records and how large it may grow."""
+
+    stream_modes: tuple = ("events",)
+    include: tuple = ("*",)
+    exclude: tuple = DEFAULT_LOG_EXCLUDE
+    max_chars: int = 2000
+    max_items: int = 50
+    max_depth: int = 6
+    max_bytes: int = 50 * 1024 * 1024
+    backup_count: int = 3
+
+
+def truncate_payload(value, options: EventLogOptions, depth: int = 0):
+    """Cut long strings, long lists and deep nesting out of an event payload."""
+    if isinstance(value, str):
+        if len(value) <= options.max_chars:
+            return value
+        return (
+            value[: options.max_chars] + f"...[+{len(value) - options.max_chars} chars]"
+        )
+    if isinstance(value, dict):
+        if depth >= options.max_depth:
+            return f"<dict with {len(value)} keys>"
+        return {
+            key: truncate_payload(item, options, depth + 1)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        if depth >= options.max_depth:
+            return f"<list with {len(value)} items>"
+        items = [
+            truncate_payload(item, options, depth + 1)
+            for item in value[: options.max_items]
+        ]
+        if len(value) > options.max_items:
+            items.append(f"...[+{len(value) - options.max_items} items]")
+        return items
+    return value
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per record; the event payload travels in `record.payload`."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Return the record as one JSON line."""
+        entry = {"time": self.formatTime(record), "source": "client"}
+        if payload := getattr(record, "payload", None):
+            entry.update(payload)
+        else:
+            entry["message"] = record.getMessage()
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def setup_run_logger(
+    name: str, log_path: str, options: EventLogOptions
+) -> logging.Logger:
+    """Create the client event logger of one run, writing to its temp file."""
+    client_logger = logging.getLogger(name)
     client_logger.setLevel(logging.INFO)
+    client_logger.propagate = False
     # Remove any existing handlers to avoid duplicate logging
     if client_logger.hasHandlers():
         client_logger.handlers.clear()
-    client_file_handler = logging.FileHandler(client_tmp_log_path)
-    client_file_handler.setFormatter(logging.Formatter('%(asctime)s - CLIENT - %(message)s'))
+    client_file_handler = RotatingFileHandler(
+        log_path,
+        maxBytes=options.max_bytes,
+        backupCount=options.backup_count,
+        encoding="utf-8",
+    )
+    client_file_handler.setFormatter(JsonLinesFormatter())
     client_logger.addHandler(client_file_handler)
     client_logger.info("Client logger initialized.")
-    # --- End Logging Setup ---
+    return client_logger
 
-    async def run_agent():
+
+def event_kind(event) -> str:
+    """Return the kind the log filters match: the callback event in "events" mode, else the stream mode."""
+    if event.event == "events" and isinstance(event.data, dict):
+        return event.data.get("event", "events")
+    return event.event
+
+
+def log_event(client_logger: logging.Logger, event, options: EventLogOptions) -> None:
+    """Log a stream event, truncated, if the include and exclude filters let it through."""
+    kind = event_kind(event)
+    if not any(fnmatch(kind, pattern) for pattern in options.include):
+        return
+    if any(fnmatch(kind, pattern) for pattern in options.exclude):
+        return
+    payload = {"mode": event.event, "kind": kind}
+    if isinstance(event.data, dict) and event.event == "events":
+        payload["name"] = event.data.get("name")
+    payload["data"] = truncate_payload(event.data, options)
+    client_logger.info(kind, extra={"payload": payload})
+
+
+def message_content(message) -> str:
+    """Return the text content of a message dict or message object."""
+    if isinstance(message, dict):
+        return message.get("content", "")
+    return getattr(message, "content", "")
+
+
+def final_answer_from_event(event):
+    """Return the answer carried by an event of any stream mode, or None."""
+    data = event.data
+    if not isinstance(data, dict):
+        return None
+    if event.event == "events":
+        # Capture the final answer from the output of the main graph
+        if (
+            data.get("event") == "on_chain_end"
+            and data.get("name") == "pro-search-agent"
+        ):
+            if (output := data.get("output")) and (messages := output.get("messages")):
+                # Get the last message which should contain the final answer with sources
+                return message_content(messages[-1])
+    elif event.event == "updates":
+        if messages := (data.get("finalize_answer") or {}).get("messages"):
+            return message_content(messages[-1])
+    elif event.event == "values":
+        messages = data.get("messages") or []
+        if (
+            messages
+            and isinstance(messages[-1], dict)
+            and messages[-1].get("type") == "ai"
+        ):
+            return message_content(messages[-1])
+    return None
+
+
+def log_files(path: str, backup_count: int) -> list[str]:
+    """Return a rotated log and its backups that exist, oldest first."""
+    files = [f"{path}.{i}" for i in range(backup_count, 0, -1)] + [path]
+    return [file for file in files if os.path.exists(file)]
+
+
+def read_client_log(paths: list[str]) -> Iterator[tuple[str, str]]:
+    """Yield (time, line) for each record of the client logs, in file order."""
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)["time"], line.rstrip("\n")
+
+
+def read_server_log(path: str) -> Iterator[tuple[str, str]]:
+    """Server log records as JSON lines; continuation lines belong to the record above."""
+    if not os.path.exists(path):
+        return
+    record = None
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if match := SERVER_LOG_LINE.match(line.rstrip("\n")):
+                if record is not None:
+                    yield record["time"], json.dumps(record, ensure_ascii=False)
+                record = {
+                    "time": match.group(1),
+                    "source": "server",
+                    "level": match.group(2),
+                    "message": match.group(3),
+                }
+            elif record is not None:
+                record["message"] += "\n" + line.rstrip("\n")
+    if record is not None:
+        yield record["time"], json.dumps(record, ensure_ascii=False)
+
+
+def merge_logs(client_paths: list[str], server_path: str, output_path: str) -> None:
+    """Interleave the client and server logs by time into one JSON-lines file.
+
+    Both logs are read line by line, so memory use does not grow with their size.
+    """
+    with open(output_path, "w", encoding="utf-8") as outfile:
+        for _, line in heapq.merge(
+            read_client_log(client_paths),
+            read_server_log(server_path),
+            key=lambda item: item[0],
+        ):
+            outfile.write(line + "\n")
+
+
+async def run_research(
+    client,
+    query: str,
+    initial_queries: int,
+    max_loops: int,
+    output_path: str,
+    research_base_name: str,
+    echo: bool = True,
+    log_options: EventLogOptions = EventLogOptions(),
+) -> dict:
+    """Run one research query on the server and save its result and unified log.
+
+    Args:
+        client: A `langgraph_sdk` client; several runs may share one.
+        query: The research query.
+        initial_queries: Number of initial search queries.
+        max_loops: Maximum number of research loops.
+        output_path: Directory for the result and log files.
+        research_base_name: File name stem of the result and log files.
+        echo: Print progress and the streamed answer to stdout.
+        log_options: Stream modes to request and what to record of them.
+
+    Returns:
+        The thread id, the written files, how research ended and the run's timings.
+    """
+    say = print if echo else (lambda *args, **kwargs: None)
+    start_time = datetime.now()
+    start = time.perf_counter()
+    timings = {}
+
+    # Define paths for final and temp log files
+    final_log_path = os.path.join(output_path, f"{research_base_name}.log")
+    client_tmp_log_path = os.path.join(output_path, f"{research_base_name}.client.tmp")
+    server_tmp_log_path = os.path.join(output_path, f"{research_base_name}.server.tmp")
+    client_logger = setup_run_logger(
+        f"ClientEventLogger.{research_base_name}", client_tmp_log_path, log_options
+    )
+
+    try:
         # Pass the full path for the server's debug log in the config
         config = {"configurable": {"server_log_path": server_tmp_log_path}}
-        client = get_client(url="http://127.0.0.1:2024", timeout=None)
 
         # Create a new thread
         thread = await client.threads.create()
-        print(f"--- Running agent on thread {thread['thread_id']} ---")
+        say(f"--- Running agent on thread {thread['thread_id']} ---")
 
         # Define the initial state to send to the server
         input_data = {
             "messages": [("user", query)],
-            "initial_search_query_count": args.initial_queries,
-            "max_research_loops": args.max_loops,
+            "initial_search_query_count": initial_queries,
+            "max_research_loops": max_loops,
         }
 
         # The graph ID 'pro-search-agent' is taken from the `name` in graph.py
-        print("\n--- Agent is running, waiting for final result... ---")
-        
+        say("\n--- Agent is running, waiting for final result... ---")
+
         # Initialize variable to store the final answer from the stream
         final_answer_from_stream = None
-        
-        # Stream events to execute the run and log them, but we won't assemble the answer here.
+        answer_streamed = False
+
+        # Stream events to execute the run and log them. The answer itself arrives
+        # token by token on the custom stream, with citation urls already resolved.
         async for event in client.runs.stream(
             thread_id=thread["thread_id"],
             assistant_id="pro-search-agent",
             input=input_data,
-            stream_mode="events",
+            stream_mode=[*log_options.stream_modes, "custom"],
             config=config,
         ):
-            client_logger.info(pformat(event))
-            if event.event == "events" and (data := event.data) and data.get("event") == "on_chain_end" and data.get("name") == "pro-search-agent":
-                 print("\n--- Main graph finished. Fetching final state. ---")
-                 # Capture the final answer from the output of the main graph
-                 if output := data.get("output"):
-                     if messages := output.get("messages"):
-                         # Get the last message which should contain the final answer with sources
-                         if messages and len(messages) > 0:
-                             last_msg = messages[-1]
-                             if isinstance(last_msg, dict):
-                                 final_answer_from_stream = last_msg.get("content", "")
-                             else:
-                                 final_answer_from_stream = getattr(last_msg, "content", "")
+            if event.event == "custom" and isinstance(event.data, dict):
+                if event.data.get("answer_start"):
+                    say("\n\n--- Final Answer ---", flush=True)
+                    answer_streamed = True
+                    timings.setdefault(
+                        "time_to_answer_s", round(time.perf_counter() - start, 3)
+                    )
+                elif delta := event.data.get("answer_delta"):
+                    say(delta, end="", flush=True)
+                continue
+            log_event(client_logger, event, log_options)
+            if (answer := final_answer_from_event(event)) is not None:
+                final_answer_from_stream = answer
+        timings["run_s"] = round(time.perf_counter() - start, 3)
+        say("\n--- Main graph finished. Fetching final state. ---")
 
         # After the run is complete, get the final state of the thread
         final_state = await client.threads.get_state(thread_id=thread["thread_id"])
         client_logger.info("Final state received from server.")
-        client_logger.info(pformat(final_state))
-        
+        client_logger.info(
+            "final_state",
+            extra={
+                "payload": {
+                    "kind": "final_state",
+                    "data": truncate_payload(final_state, log_options),
+                }
+            },
+        )
+
         # Use the answer from the stream if available, otherwise fall back to state
         final_answer_content = ""
         sources_list = ""
-        
+
         if final_answer_from_stream:
             final_answer_content = final_answer_from_stream
             client_logger.info("Using final answer from stream output")
         else:
             # Fallback: Extract the final answer from the last message in the state
             # The final state is a dict with a 'values' key containing the OverallState
-            if final_state and (values := final_state.get('values')) and values.get('messages'):
-                last_message = values['messages'][-1]
+            if (
+                final_state
+                and (values := final_state.get("values"))
+                and values.get("messages")
+            ):
+                last_message = values["messages"][-1]
                 if isinstance(last_message, dict):
-                    final_answer_content = last_message.get('content', '')
-                else: # Handle AIMessage object case
-                    final_answer_content = getattr(last_message, 'content', '')
+                    final_answer_content = last_message.get("content", "")
+                else:  # Handle AIMessage object case
+                    final_answer_content = getattr(last_message, "content", "")
             client_logger.info("Using final answer from state (fallback)")
-        
+
         # Extract sources from the state if not already in the final answer
-        if "**Источники:**" not in final_answer_content and final_state and (values := final_state.get('values')):
-            sources_gathered = values.get('sources_gathered', [])
+        if (
+            "**Источники:**" not in final_answer_content
+            and final_state
+            and (values := final_state.get("values"))
+        ):
+            sources_gathered = values.get("sources_gathered", [])
             if sources_gathered:
                 # Remove duplicates by URL
                 unique_sources = {}
                 for source in sources_gathered:
-                    url = source.get('value', '')
+                    url = source.get("value", "")
                     if url and url not in unique_sources:
                         unique_sources[url] = source
-                
+
                 # Create sources list
                 if unique_sources:
                     sources_list = "\n\n**Источники:**\n"
                     for i, (url, source) in enumerate(unique_sources.items(), 1):
-                        title = source.get('title', 'Без названия')
-                        label = source.get('label', '')
+                        title = source.get("title", "Без названия")
+                        label = source.get("label", "")
                         # Format: number. [label] title - url
                         if label:
                             sources_list += f"{i}. [{label}] {title} - {url}\n"
                         else:
                             sources_list += f"{i}. {title} - {url}\n"
-                    client_logger.info(f"Added {len(unique_sources)} unique sources from state")
+                    client_logger.info(
+                        f"Added {len(unique_sources)} unique sources from state"
+                    )
 
         # Extract research completion info from state
         actual_loops = 0
         completion_reason = "Неизвестно"
-        if final_state and (values := final_state.get('values')):
-            actual_loops = values.get('research_loop_count', 0)
-            is_sufficient = values.get('is_sufficient', False)
-            
-            if is_sufficient:
+        stop_reason = None
+        usage_report = ""
+        usage_total = {}
+        if final_state and (values := final_state.get("values")):
+            actual_loops = values.get("research_loop_count", 0)
+            if usage_summary := values.get("usage_summary"):
+                usage_total = usage_summary["total"]
+                # One line per node and model tier, so it is clear which stage spends the quota
+                usage_report = (
+                    "\n--- Token Usage ---\n"
+                    + "\n".join(
+                        f"{name}: calls={totals['calls']}, input={totals['input_tokens']}, "
+                        f"output={totals['output_tokens']}, thinking={totals['reasoning_tokens']}, "
+                        f"cached={totals['cached_tokens']}, latency={totals['latency']:.1f}s, "
+                        f"cost=${totals.get('cost_usd', 0.0):.4f}"
+                        for name, totals in [
+                            ("total", usage_summary["total"]),
+                            *sorted(usage_summary["by_node"].items()),
+                            *(
+                                (f"tier:{tier}", totals)
+                                for tier, totals in sorted(
+                                    usage_summary.get("by_tier", {}).items()
+                                )
+                            ),
+                        ]
+                    )
+                    + "\n"
+                )
+                client_logger.info(
+                    "usage_summary",
+                    extra={"payload": {"kind": "usage_summary", "data": usage_summary}},
+                )
+            is_sufficient = values.get("is_sufficient", False)
+            # The graph records why research stopped; older servers do not
+            stop_reasons = {
+                "sufficient": "Достаточно информации",
+                "max_loops": f"Достигнут лимит циклов ({max_loops})",
+                "low_gain": "Новые циклы почти не добавляют информации",
+                "no_new_queries": "Нет новых поисковых запросов",
+            }
+
+            if stop_reason := values.get("stop_reason"):
+                completion_reason = stop_reasons.get(stop_reason, stop_reason)
+                if stop_reason == "low_gain" and (
+                    loop_gains := values.get("loop_gains")
+                ):
+                    completion_reason += f" (прирост {loop_gains[-1]['gain']})"
+            elif is_sufficient:
                 completion_reason = "Достаточно информации"
-            elif actual_loops >= args.max_loops:
-                completion_reason = f"Достигнут лимит циклов ({args.max_loops})"
+            elif actual_loops >= max_loops:
+                completion_reason = f"Достигнут лимит циклов ({max_loops})"
             else:
                 completion_reason = "Неизвестная причина"
 
         # Process and save the final answer
-        print("\n\n--- Final Answer ---")
-        print(final_answer_content)
+        if answer_streamed:
+            say()
+        else:
+            say("\n\n--- Final Answer ---")
+            say(final_answer_content)
         if sources_list:
-            print(sources_list)
+            say(sources_list)
+        if usage_report:
+            say(usage_report)
 
         # Create filename for the research result
         file_name = f"{research_base_name}.txt"
@@ -179,14 +438,15 @@ def main():
         file_content = (
             f"Thread ID: {thread['thread_id']}\n"
             f"Start Time: {start_time.strftime('%Y-%m-%d %H:%M:%S')}\n"
-            f"Initial Queries: {args.initial_queries}\n"
-            f"Max Loops: {args.max_loops}\n"
+            f"Initial Queries: {initial_queries}\n"
+            f"Max Loops: {max_loops}\n"
             f"Actual Loops Completed: {actual_loops}\n"
-            f"Completion Reason: {completion_reason}\n\n"
+            f"Completion Reason: {completion_reason}\n"
+            f"{usage_report}\n"
             f"--- Research Result ---\n"
             f"{final_answer_content}"
         )
-        
+
         # Add sources if they were extracted separately
         if sources_list:
             file_content += sources_list
@@ -194,32 +454,134 @@ def main():
         with open(full_path, "w", encoding="utf-8") as f:
             f.write(file_content)
 
-        print(f"\n--- Research saved to {full_path} ---")
-
+        say(f"\n--- Research saved to {full_path} ---")
+    finally:
         # --- Merge Logs ---
+        for handler in client_logger.handlers:
+            handler.close()
+        client_logger.handlers.clear()
+        client_log_files = log_files(client_tmp_log_path, log_options.backup_count)
         try:
-            with open(final_log_path, "w", encoding="utf-8") as outfile:
-                # 1. Write client events
-                if os.path.exists(client_tmp_log_path):
-                    with open(client_tmp_log_path, "r", encoding="utf-8") as infile:
-                        outfile.write(infile.read())
-                
-                # 2. Append server debug logs
-                if os.path.exists(server_tmp_log_path):
-                    outfile.write("\n\n" + "="*20 + " SERVER DEBUG LOG " + "="*20 + "\n\n")
-                    with open(server_tmp_log_path, "r", encoding="utf-8") as infile:
-                        outfile.write(infile.read())
-            
-            print(f"--- Unified log saved to {final_log_path} ---")
+            # Client events and server debug records, interleaved by time
+            merge_logs(client_log_files, server_tmp_log_path, final_log_path)
+            say(f"--- Unified log saved to {final_log_path} ---")
 
         finally:
-            # 3. Clean up temp files
-            if os.path.exists(client_tmp_log_path):
-                os.remove(client_tmp_log_path)
-            if os.path.exists(server_tmp_log_path):
-                os.remove(server_tmp_log_path)
+            # Clean up temp files
+            for path in [*client_log_files, server_tmp_log_path]:
+                if os.path.exists(path):
+                    os.remove(path)
         # --- End Merge ---
 
+    timings["total_s"] = round(time.perf_counter() - start, 3)
+    return {
+        "thread_id": thread["thread_id"],
+        "result_path": full_path,
+        "log_path": final_log_path,
+        "research_loops": actual_loops,
+        "stop_reason": stop_reason,
+        "completion_reason": completion_reason,
+        "token_usage": usage_total,
+        "timings": timings,
+    }
+
+
+def add_log_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the options of the client event log to `parser`."""
+    parser.add_argument(
+        "--stream-mode",
+        nargs="+",
+        choices=STREAM_MODES,
+        default=["events"],
+        help="Stream modes to request; 'updates' and 'values' are much lighter than 'events'",
+    )
+    parser.add_argument(
+        "--log-include",
+        nargs="+",
+        default=["*"],
+        help="Event kinds to log (glob patterns, e.g. 'on_chain_*' or 'updates')",
+    )
+    parser.add_argument(
+        "--log-exclude",
+        nargs="*",
+        default=list(DEFAULT_LOG_EXCLUDE),
+        help="Event kinds not to log (glob patterns)",
+    )
+    parser.add_argument(
+        "--log-max-chars",
+        type=int,
+        default=2000,
+        help="Longest string kept in a logged payload",
+    )
+    parser.add_argument(
+        "--log-max-mb",
+        type=float,
+        default=50,
+        help="Size of the client log before it rotates",
+    )
+
+
+def log_options_from_args(args) -> EventLogOptions:
+    """Build the event log options from parsed command line arguments."""
+    return EventLogOptions(
+        stream_modes=tuple(args.stream_mode),
+        include=tuple(args.log_include),
+        exclude=tuple(args.log_exclude),
+        max_chars=args.log_max_chars,
+        max_bytes=int(args.log_max_mb * 1024 * 1024),
+    )
+
+
+def main():
+    """Main function to run the research agent via the LangGraph SDK."""
+    parser = argparse.ArgumentParser(description="AI Research Agent Client")
+    parser.add_argument(
+        "query_or_file",
+        type=str,
+        help="The research query or a path to a text file containing the query.",
+    )
+    parser.add_argument(
+        "--initial-queries",
+        type=int,
+        default=3,
+        help="Number of initial search queries",
+    )
+    parser.add_argument(
+        "--max-loops",
+        type=int,
+        default=2,
+        help="Maximum number of research loops",
+    )
+    add_log_arguments(parser)
+    args = parser.parse_args()
+
+    query = args.query_or_file
+    if os.path.isfile(query):
+        with open(query, encoding="utf-8") as f:
+            query = f.read()
+
+    # --- Setup Logging Paths ---
+    start_time = datetime.now()
+    date_folder = start_time.strftime("%d%m%Y")
+    base_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+    output_path = os.path.join(base_path, "outputs", date_folder)
+    os.makedirs(output_path, exist_ok=True)
+
+    time_filename = start_time.strftime("%H%M%d%m")
+    research_base_name = f"research_{time_filename}"
+
+    async def run_agent():
+        client = get_client(url=SERVER_URL, timeout=None)
+        await run_research(
+            client,
+            query,
+            args.initial_queries,
+            args.max_loops,
+            output_path,
+            research_base_name,
+            log_options=log_options_from_args(args),
+        )
+
     asyncio.run(run_agent())
 
 
@@ -0,0 +1,837 @@
+"""Content-addressed, compressed checkpoint store for LangGraph runs."""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Iterator, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    SerializerProtocol,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.serde.types import TASKS
+
+from agent.summary_store import find_summary_refs
+
+try:
+    import zstandard
+except ImportError:  # zlib is used when zstandard is not installed
+    zstandard = None
+
+
+DEFAULT_CHECKPOINT_STORE_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "..", ".cache", "checkpoints.sqlite3"
+)
+
+# Values smaller than this are stored uncompressed
+MIN_COMPRESS_BYTES = 128
+
+# List channels (messages, summaries, sources, ...) only ever grow, so they are
+# stored as a list of element hashes and every element is stored once
+BLOB_LIST_TYPE = "blob-list"
+DIGEST_SIZE = 32
+
+# Decompressed blobs kept in memory; blobs never change, so the cache needs no invalidation
+BLOB_CACHE_SIZE = 4096
+
+# Checkpoint rows `list` reads from SQLite at a time
+LIST_PAGE_SIZE = 64
+
+
+def compress(data: bytes, codec: str) -> tuple[str, bytes]:
+    """Compress `data` with `codec`, returning the codec actually used."""
+    if codec == "raw" or len(data) < MIN_COMPRESS_BYTES:
+        return "raw", data
+    if codec == "zstd":
+        return "zstd", zstandard.ZstdCompressor(level=3).compress(data)
+    return "zlib", zlib.compress(data, 6)
+
+
+def decompress(codec: str, data: bytes) -> bytes:
+    """Return the original bytes of a blob stored with `codec`."""
+    if codec == "raw":
+        return data
+    if codec == "zlib":
+        return zlib.decompress(data)
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError(
+                "The checkpoint store holds zstd blobs; install zstandard to read them"
+            )
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f"Unknown blob codec: {codec}")
+
+
+def blob_digest(type_: str, data: bytes) -> bytes:
+    """Return the content hash of a blob of serializer type `type_`."""
+    return hashlib.sha256(type_.encode("utf-8") + b"\0" + data).digest()
+
+
+def split_digests(data: bytes) -> list[str]:
+    """Element hashes of a stored list."""
+    return [data[i : i + DIGEST_SIZE].hex() for i in range(0, len(data), DIGEST_SIZE)]
+
+
+CHECKPOINT_COLUMNS = (
+    "thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+    "type, codec, checkpoint, metadata_type, metadata"
+)
+
+
+class BlobCheckpointSaver(BaseCheckpointSaver):
+    """Checkpoint saver that stores channel values as compressed, content-addressed blobs.
+
+    Every checkpoint only references the blobs of its channel versions, so a
+    value that several checkpoints (or threads) share is stored once, and a
+    growing list channel only adds its new elements. The store is a SQLite file
+    in WAL mode. Blobs no checkpoint references any more are removed by `gc`
+    (`python src/agent/checkpoint_store.py gc`).
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CHECKPOINT_STORE_PATH,
+        *,
+        serde: SerializerProtocol | None = None,
+        compression: str = "auto",
+    ):
+        """Open the store at `path` and create its tables if needed.
+
+        Args:
+            path: SQLite file of the store.
+            serde: Serializer of channel values; LangGraph's default when None.
+            compression: "zstd", "zlib", "raw" or "auto" (zstd when installed).
+        """
+        super().__init__(serde=serde)
+        if compression == "auto":
+            compression = "zstd" if zstandard is not None else "zlib"
+        if compression not in ("zstd", "zlib", "raw"):
+            raise ValueError(f"Unknown compression: {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("zstd compression requires the zstandard package")
+        self.compression = compression
+        self.path = os.path.abspath(path)
+        self._lock = threading.Lock()
+        self._cache: OrderedDict[str, tuple[str, bytes]] = OrderedDict()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS blobs (
+                hash TEXT PRIMARY KEY,
+                type TEXT NOT NULL,
+                codec TEXT NOT NULL,
+                data BLOB NOT NULL,
+                raw_size INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS channel_blobs (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL,
+                channel TEXT NOT NULL,
+                version TEXT NOT NULL,
+                blob_hash TEXT NOT NULL,
+                PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+            );
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL,
+                checkpoint_id TEXT NOT NULL,
+                parent_checkpoint_id TEXT,
+                type TEXT NOT NULL,
+                codec TEXT NOT NULL,
+                checkpoint BLOB NOT NULL,
+                metadata_type TEXT NOT NULL,
+                metadata BLOB NOT NULL,
+                channel_versions TEXT NOT NULL,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+            );
+            CREATE TABLE IF NOT EXISTS writes (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL,
+                checkpoint_id TEXT NOT NULL,
+                task_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                channel TEXT NOT NULL,
+                task_path TEXT NOT NULL,
+                type TEXT NOT NULL,
+                codec TEXT NOT NULL,
+                value BLOB NOT NULL,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+            );
+            """
+        )
+        self._conn.commit()
+
+    # --- Blobs ---
+
+    def _encode_blobs(self, value: Any, blobs: dict) -> tuple[str, int]:
+        """Serialize `value` into `blobs` (hash -> row) and return its hash and raw size."""
+        if type(value) is list:
+            digests, raw_size = [], 0
+            for item in value:
+                item_hash, item_size = self._encode_blobs(item, blobs)
+                digests.append(bytes.fromhex(item_hash))
+                raw_size += item_size
+            type_, data = BLOB_LIST_TYPE, b"".join(digests)
+        else:
+            type_, data = self.serde.dumps_typed(value)
+            raw_size = len(data)
+        digest = blob_digest(type_, data).hex()
+        blobs[digest] = (type_, data, raw_size)
+        return digest, raw_size
+
+    def _insert_blobs(self, blobs: dict) -> None:
+        """Insert the blobs the store does not hold yet; the caller holds the lock."""
+        hashes = list(blobs)
+        for start in range(0, len(hashes), 500):
+            batch = hashes[start : start + 500]
+            existing = {
+                row[0]
+                for row in self._conn.execute(
+                    f"SELECT hash FROM blobs WHERE hash IN ({','.join('?' * len(batch))})",
+                    batch,
+                )
+            }
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO blobs (hash, type, codec, data, raw_size) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        digest,
+                        blobs[digest][0],
+                        *compress(blobs[digest][1], self.compression),
+                        blobs[digest][2],
+                    )
+                    for digest in batch
+                    if digest not in existing
+                ],
+            )
+
+    def _fetch_blobs(self, hashes) -> dict:
+        """Return hash -> (type, decompressed data), from the cache where possible."""
+        found, missing = {}, []
+        with self._lock:
+            for digest in dict.fromkeys(hashes):
+                if digest in self._cache:
+                    self._cache.move_to_end(digest)
+                    found[digest] = self._cache[digest]
+                else:
+                    missing.append(digest)
+            for start in range(0, len(missing), 500):
+                batch = missing[start : start + 500]
+                for digest, type_, codec, data in self._conn.execute(
+                    f"SELECT hash, type, codec, data FROM blobs WHERE hash IN ({','.join('?' * len(batch))})",
+                    batch,
+                ):
+                    found[digest] = self._cache[digest] = (
+                        type_,
+                        decompress(codec, data),
+                    )
+            while len(self._cache) > BLOB_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        if lost := [digest for digest in missing if digest not in found]:
+            raise KeyError(f"Blobs missing from {self.path}: {lost}")
+        return found
+
+    def _decode_blobs(self, hashes: dict) -> dict:
+        """Resolve key -> blob hash to key -> value, expanding stored lists."""
+        blobs, pending = {}, [*hashes.values()]
+        while pending:
+            fetched = self._fetch_blobs(pending)
+            blobs.update(fetched)
+            pending = [
+                element
+                for type_, data in fetched.values()
+                if type_ == BLOB_LIST_TYPE
+                for element in split_digests(data)
+                if element not in blobs
+            ]
+
+        def decode(digest: str) -> Any:
+            type_, data = blobs[digest]
+            if type_ == BLOB_LIST_TYPE:
+                return [decode(element) for element in split_digests(data)]
+            return self.serde.loads_typed((type_, data))
+
+        return {
+            key: decode(digest)
+            for key, digest in hashes.items()
+            if blobs[digest][0] != "empty"
+        }
+
+    # --- Checkpoints ---
+
+    def _load_channel_values(
+        self, thread_id: str, checkpoint_ns: str, versions: dict
+    ) -> dict:
+        with self._lock:
+            hashes = {
+                channel: row[0]
+                for channel, version in versions.items()
+                if (
+                    row := self._conn.execute(
+                        "SELECT blob_hash FROM channel_blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                        (thread_id, checkpoint_ns, channel, str(version)),
+                    ).fetchone()
+                )
+            }
+        return self._decode_blobs(hashes)
+
+    def _load_writes(
+        self, thread_id: str, checkpoint_ns: str, checkpoint_id: str
+    ) -> list:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT task_id, channel, task_path, idx, type, codec, value FROM writes "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+                (thread_id, checkpoint_ns, checkpoint_id),
+            ).fetchall()
+        return [
+            (
+                task_id,
+                channel,
+                task_path,
+                idx,
+                self.serde.loads_typed((type_, decompress(codec, value))),
+            )
+            for task_id, channel, task_path, idx, type_, codec, value in rows
+        ]
+
+    def _make_tuple(self, row: tuple) -> CheckpointTuple:
+        (
+            thread_id,
+            checkpoint_ns,
+            checkpoint_id,
+            parent_id,
+            type_,
+            codec,
+            data,
+            metadata_type,
+            metadata,
+        ) = row
+        checkpoint = self.serde.loads_typed((type_, decompress(codec, data)))
+        checkpoint["channel_values"] = self._load_channel_values(
+            thread_id, checkpoint_ns, checkpoint["channel_versions"]
+        )
+        if "pending_sends" in checkpoint:
+            # Checkpoints before format v4 carry the sends of the parent's tasks
+            sends = [
+                write
+                for write in (
+                    self._load_writes(thread_id, checkpoint_ns, parent_id)
+                    if parent_id
+                    else []
+                )
+                if write[1] == TASKS
+            ]
+            checkpoint["pending_sends"] = [
+                value for *_, value in sorted(sends, key=lambda w: (w[2], w[0], w[3]))
+            ]
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": checkpoint_id,
+                }
+            },
+            checkpoint=checkpoint,
+            metadata=self.serde.loads_typed((metadata_type, metadata)),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": parent_id,
+                    }
+                }
+                if parent_id
+                else None
+            ),
+            pending_writes=[
+                (task_id, channel, value)
+                for task_id, channel, _, _, value in self._load_writes(
+                    thread_id, checkpoint_ns, checkpoint_id
+                )
+            ],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        """Return the checkpoint `config` names, or the thread's latest one."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        with self._lock:
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self._conn.execute(
+                    f"SELECT {CHECKPOINT_COLUMNS} FROM checkpoints "
+                    "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    f"SELECT {CHECKPOINT_COLUMNS} FROM checkpoints "
+                    "WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+        return self._make_tuple(row) if row else None
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        """List the thread's checkpoints newest first, optionally filtered by metadata."""
+        where, params = [], []
+        if config is not None:
+            where.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (
+                checkpoint_ns := config["configurable"].get("checkpoint_ns")
+            ) is not None:
+                where.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                where.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before is not None and (before_id := get_checkpoint_id(before)):
+            where.append("checkpoint_id < ?")
+            params.append(before_id)
+        query = f"SELECT {CHECKPOINT_COLUMNS} FROM checkpoints"
+        if where:
+            query += " WHERE " + " AND ".join(where)
+        query += " ORDER BY checkpoint_id DESC"
+        if limit is not None and not filter:
+            # Without a metadata filter every row is returned, so SQLite can stop early
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            cursor = self._conn.execute(query, params)
+        count = 0
+        try:
+            # Read the rows in pages, so a filtered or unlimited listing never
+            # holds every checkpoint of the store in memory at once
+            while limit is None or count < limit:
+                with self._lock:
+                    rows = cursor.fetchmany(LIST_PAGE_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    if limit is not None and count >= limit:
+                        break
+                    if filter:
+                        # Check the metadata before loading any channel value
+                        metadata = self.serde.loads_typed((row[7], row[8]))
+                        if not all(
+                            metadata.get(key) == value for key, value in filter.items()
+                        ):
+                            continue
+                    count += 1
+                    yield self._make_tuple(row)
+        finally:
+            cursor.close()
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Store a checkpoint, writing only the channel blobs not stored yet."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        c = checkpoint.copy()
+        values = c.pop("channel_values")
+        blobs, channel_rows = {}, []
+        for channel, version in new_versions.items():
+            if channel in values:
+                digest, _ = self._encode_blobs(values[channel], blobs)
+            else:
+                digest = blob_digest("empty", b"").hex()
+                blobs[digest] = ("empty", b"", 0)
+            channel_rows.append(
+                (thread_id, checkpoint_ns, channel, str(version), digest)
+            )
+        type_, data = self.serde.dumps_typed(c)
+        metadata_type, metadata_data = self.serde.dumps_typed(
+            get_checkpoint_metadata(config, metadata)
+        )
+        with self._lock, self._conn:
+            self._insert_blobs(blobs)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO channel_blobs (thread_id, checkpoint_ns, channel, version, blob_hash) VALUES (?, ?, ?, ?, ?)",
+                channel_rows,
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+                "type, codec, checkpoint, metadata_type, metadata, channel_versions) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    thread_id,
+                    checkpoint_ns,
+                    checkpoint["id"],
+                    config["configurable"].get("checkpoint_id"),
+                    type_,
+                    *compress(data, self.compression),
+                    metadata_type,
+                    metadata_data,
+                    json.dumps(
+                        {
+                            channel: str(version)
+                            for channel, version in checkpoint[
+                                "channel_versions"
+                            ].items()
+                        }
+                    ),
+                ),
+            )
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Store the pending writes of a task; writes to special channels replace earlier ones."""
+        configurable = config["configurable"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, data = self.serde.dumps_typed(value)
+            rows.append(
+                (
+                    configurable["thread_id"],
+                    configurable.get("checkpoint_ns", ""),
+                    configurable["checkpoint_id"],
+                    task_id,
+                    WRITES_IDX_MAP.get(channel, idx),
+                    channel,
+                    task_path,
+                    type_,
+                    *compress(data, self.compression),
+                )
+            )
+        # Special writes (errors, interrupts, ...) replace earlier ones; regular
+        # writes of a task are only kept the first time
+        verb = (
+            "REPLACE"
+            if all(channel in WRITES_IDX_MAP for channel, _ in writes)
+            else "IGNORE"
+        )
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT OR {verb} INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, "
+                "channel, task_path, type, codec, value) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete the checkpoints and writes of a thread; `gc` frees the blobs."""
+        with self._lock, self._conn:
+            for table in ("checkpoints", "writes", "channel_blobs"):
+                self._conn.execute(
+                    f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,)
+                )
+
+    def get_next_version(self, current: str | None, channel: Any) -> str:
+        """Return the next channel version: a counter plus a random suffix."""
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        """Async version of `get_tuple`, run in a worker thread."""
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        """Async version of `list`, run in a worker thread."""
+        items = await asyncio.to_thread(
+            lambda: [*self.list(config, filter=filter, before=before, limit=limit)]
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Async version of `put`, run in a worker thread."""
+        return await asyncio.to_thread(
+            self.put, config, checkpoint, metadata, new_versions
+        )
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Async version of `put_writes`, run in a worker thread."""
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        """Async version of `delete_thread`, run in a worker thread."""
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    # --- Maintenance ---
+
+    def gc(self, keep_last: int | None = None, vacuum: bool = False) -> dict:
+        """Drop old checkpoints and every blob no remaining checkpoint references.
+
+        Args:
+            keep_last: Keep only the newest `keep_last` checkpoints of every thread
+                and namespace; `None` keeps all of them.
+            vacuum: Shrink the database file afterwards.
+
+        Returns:
+            The number of deleted checkpoints, writes, channel versions and blobs.
+        """
+        deleted = {}
+        with self._lock, self._conn:
+            conn = self._conn
+            deleted["checkpoints"] = 0
+            if keep_last is not None:
+                deleted["checkpoints"] = conn.execute(
+                    """
+                    DELETE FROM checkpoints WHERE rowid IN (
+                        SELECT rowid FROM (
+                            SELECT rowid, ROW_NUMBER() OVER (
+                                PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC
+                            ) AS position FROM checkpoints
+                        ) WHERE position > ?
+                    )
+                    """,
+                    (keep_last,),
+                ).rowcount
+            deleted["writes"] = conn.execute(
+                """
+                DELETE FROM writes WHERE NOT EXISTS (
+                    SELECT 1 FROM checkpoints c WHERE c.thread_id = writes.thread_id
+                    AND c.checkpoint_ns = writes.checkpoint_ns AND c.checkpoint_id = writes.checkpoint_id
+                )
+                """
+            ).rowcount
+
+            # Mark the channel versions the remaining checkpoints use...
+            conn.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS live_versions (thread_id TEXT, checkpoint_ns TEXT, channel TEXT, version TEXT, "
+                "PRIMARY KEY (thread_id, checkpoint_ns, channel, version))"
+            )
+            conn.execute("DELETE FROM live_versions")
+            for thread_id, checkpoint_ns, versions in conn.execute(
+                "SELECT thread_id, checkpoint_ns, channel_versions FROM checkpoints"
+            ).fetchall():
+                conn.executemany(
+                    "INSERT OR IGNORE INTO live_versions VALUES (?, ?, ?, ?)",
+                    [
+                        (thread_id, checkpoint_ns, channel, version)
+                        for channel, version in json.loads(versions).items()
+                    ],
+                )
+            deleted["channel_versions"] = conn.execute(
+                """
+                DELETE FROM channel_blobs WHERE NOT EXISTS (
+                    SELECT 1 FROM live_versions l WHERE l.thread_id = channel_blobs.thread_id
+                    AND l.checkpoint_ns = channel_blobs.checkpoint_ns
+                    AND l.channel = channel_blobs.channel AND l.version = channel_blobs.version
+                )
+                """
+            ).rowcount
+
+            # ...then the blobs they reach, following stored lists to their elements
+            conn.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS live_blobs (hash TEXT PRIMARY KEY)"
+            )
+            conn.execute("DELETE FROM live_blobs")
+            frontier = [
+                row[0]
+                for row in conn.execute("SELECT DISTINCT blob_hash FROM channel_blobs")
+            ]
+            while frontier:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO live_blobs VALUES (?)",
+                    [(h,) for h in frontier],
+                )
+                next_frontier = []
+                for start in range(0, len(frontier), 500):
+                    batch = frontier[start : start + 500]
+                    for codec, data in conn.execute(
+                        f"SELECT codec, data FROM blobs WHERE type = ? AND hash IN ({','.join('?' * len(batch))})",
+                        [BLOB_LIST_TYPE, *batch],
+                    ):
+                        next_frontier.extend(split_digests(decompress(codec, data)))
+                frontier = [
+                    digest
+                    for digest in dict.fromkeys(next_frontier)
+                    if not conn.execute(
+                        "SELECT 1 FROM live_blobs WHERE hash = ?", (digest,)
+                    ).fetchone()
+                ]
+            deleted["blobs"] = conn.execute(
+                "DELETE FROM blobs WHERE hash NOT IN (SELECT hash FROM live_blobs)"
+            ).rowcount
+            self._cache.clear()
+        if vacuum:
+            with self._lock:
+                self._conn.execute("VACUUM")
+        return deleted
+
+    def summary_refs(self) -> set[str]:
+        """Return every summary side store reference a stored checkpoint or write holds.
+
+        `SummaryStore.gc` keeps these, so a retained thread can always be resumed.
+        """
+        refs = set()
+        with self._lock:
+            for query, params in (
+                ("SELECT codec, data FROM blobs WHERE type != ?", (BLOB_LIST_TYPE,)),
+                ("SELECT codec, checkpoint FROM checkpoints", ()),
+                ("SELECT codec, value FROM writes", ()),
+            ):
+                for codec, data in self._conn.execute(query, params):
+                    refs |= find_summary_refs(decompress(codec, data))
+        return refs
+
+    def stats(self, thread_id: str | None = None) -> dict:
+        """Sizes of the store and the checkpoint history of every (or one) thread.
+
+        `logical_bytes` is what the channel values of all stored versions would
+        take serialized one by one; `stored_bytes` what their deduplicated,
+        compressed blobs take.
+        """
+        where, params = ("WHERE thread_id = ?", (thread_id,)) if thread_id else ("", ())
+        with self._lock:
+            threads = {
+                thread: {"checkpoints": count, "latest_checkpoint_id": latest}
+                for thread, count, latest in self._conn.execute(
+                    f"SELECT thread_id, COUNT(*), MAX(checkpoint_id) FROM checkpoints {where} GROUP BY thread_id",
+                    params,
+                )
+            }
+            for thread, count in self._conn.execute(
+                f"SELECT thread_id, COUNT(*) FROM writes {where} GROUP BY thread_id",
+                params,
+            ):
+                threads.setdefault(
+                    thread, {"checkpoints": 0, "latest_checkpoint_id": None}
+                )["writes"] = count
+            logical_bytes = self._conn.execute(
+                f"SELECT COALESCE(SUM(b.raw_size), 0) FROM channel_blobs c JOIN blobs b ON b.hash = c.blob_hash "
+                f"{where.replace('thread_id', 'c.thread_id')}",
+                params,
+            ).fetchone()[0]
+            blob_count, stored_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM blobs"
+            ).fetchone()
+        return {
+            "path": self.path,
+            "file_bytes": sum(
+                os.path.getsize(file)
+                for file in (self.path, self.path + "-wal")
+                if os.path.exists(file)
+            ),
+            "blobs": blob_count,
+            "stored_bytes": stored_bytes,
+            "logical_bytes": logical_bytes,
+            "threads": threads,
+        }
+
+
+_savers: dict[str, BlobCheckpointSaver] = {}
+_savers_lock = threading.Lock()
+
+
+def get_checkpoint_saver(
+    path: str = DEFAULT_CHECKPOINT_STORE_PATH,
+) -> BlobCheckpointSaver:
+    """Get or create the process-wide checkpoint saver backed by `path`."""
+    path = os.path.abspath(path)
+    with _savers_lock:
+        if path not in _savers:
+            _savers[path] = BlobCheckpointSaver(path)
+        return _savers[path]
+
+
+def main():
+    """Inspect or clean up the checkpoint store from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Inspect and clean up the checkpoint blob store"
+    )
+    parser.add_argument(
+        "--path",
+        default=os.getenv("CHECKPOINT_STORE_PATH", DEFAULT_CHECKPOINT_STORE_PATH),
+        help="SQLite file of the store",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    stats_parser = commands.add_parser(
+        "stats", help="Show the size of the store and its threads"
+    )
+    stats_parser.add_argument("--thread", help="Only show this thread")
+    gc_parser = commands.add_parser(
+        "gc", help="Delete old checkpoints and unreferenced blobs"
+    )
+    gc_parser.add_argument(
+        "--keep-last", type=int, help="Checkpoints to keep per thread (default: all)"
+    )
+    gc_parser.add_argument(
+        "--vacuum", action="store_true", help="Shrink the file afterwards"
+    )
+    delete_parser = commands.add_parser(
+        "delete-thread", help="Delete a thread's checkpoints"
+    )
+    delete_parser.add_argument("thread_id")
+    args = parser.parse_args()
+
+    saver = BlobCheckpointSaver(args.path)
+    if args.command == "stats":
+        print(json.dumps(saver.stats(args.thread), indent=2))  # noqa: T201
+    elif args.command == "gc":
+        print(  # noqa: T201
+            json.dumps(saver.gc(keep_last=args.keep_last, vacuum=args.vacuum), indent=2)
+        )
+    else:
+        saver.delete_thread(args.thread_id)
+        print(f"Deleted thread {args.thread_id}; run gc to free its blobs")  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
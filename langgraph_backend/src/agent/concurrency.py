@@ -0,0 +1,171 @@
+"""Adaptive concurrency limiting for calls to the model API."""
+
+import asyncio
+import logging
+import time
+import weakref
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """Whether an exception is a 429 / ResourceExhausted response from the model API."""
+    return "429" in str(error) or "ResourceExhausted" in str(error)
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD (additive increase, multiplicative decrease) concurrency limiter.
+
+    The window grows by roughly one slot for every window's worth of healthy
+    calls (success and latency under the target) and is cut by `backoff_ratio`
+    on `ResourceExhausted` or when the recent error rate gets too high. Cuts are
+    spaced by `cooldown` seconds so one burst of 429s only halves the window once.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        latency_target: float,
+        backoff_ratio: float = 0.5,
+        error_rate_threshold: float = 0.25,
+        window_size: int = 20,
+        cooldown: float = 5.0,
+    ):
+        """Create a limiter starting at `initial_limit` slots.
+
+        Args:
+            initial_limit: Starting window size.
+            min_limit: Smallest window the limiter shrinks to.
+            max_limit: Largest window the limiter grows to.
+            latency_target: Calls slower than this do not grow the window.
+            backoff_ratio: Factor the window is multiplied by on a decrease.
+            error_rate_threshold: Recent error rate above which the window shrinks.
+            window_size: Number of recent calls the error rate is measured over.
+            cooldown: Minimum seconds between two decreases.
+        """
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.latency_target = latency_target
+        self.backoff_ratio = backoff_ratio
+        self.error_rate_threshold = error_rate_threshold
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.waiting = 0
+        self._outcomes: deque[bool] = deque(maxlen=window_size)
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+        self._logger = logging.getLogger(__name__)
+        self.config_key: tuple = ()
+
+    @property
+    def window(self) -> int:
+        """Return the number of calls currently allowed in flight."""
+        return int(self.limit)
+
+    def _set_limit(self, limit: float, reason: str) -> None:
+        old_window = self.window
+        self.limit = min(max(limit, self.min_limit), self.max_limit)
+        if self.window != old_window:
+            self._logger.info(
+                f"Concurrency window {old_window} -> {self.window} ({reason})"
+            )
+
+    def _decrease(self, reason: str) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self._set_limit(self.limit * self.backoff_ratio, reason)
+
+    def on_success(self, latency: float) -> None:
+        """Grow the window if the call finished within the latency target."""
+        self._outcomes.append(True)
+        if latency <= self.latency_target:
+            self._set_limit(
+                self.limit + 1 / self.limit, f"healthy, latency {latency:.1f}s"
+            )
+
+    def on_error(self, error: BaseException) -> None:
+        """Shrink the window on a rate limit error or a high recent error rate."""
+        self._outcomes.append(False)
+        if is_rate_limit_error(error):
+            self._decrease("rate limited")
+            return
+        errors = self._outcomes.count(False)
+        if (
+            len(self._outcomes) >= self._outcomes.maxlen // 2
+            and errors / len(self._outcomes) > self.error_rate_threshold
+        ):
+            self._decrease(f"error rate {errors}/{len(self._outcomes)}")
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[float]:
+        """Hold one concurrency slot; yields the time spent waiting for it."""
+        start = time.monotonic()
+        async with self._condition:
+            self.waiting += 1
+            try:
+                await self._condition.wait_for(lambda: self.in_flight < self.window)
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+        call_start = time.monotonic()
+        try:
+            yield call_start - start
+        except Exception as e:
+            self.on_error(e)
+            raise
+        else:
+            self.on_success(time.monotonic() - call_start)
+        finally:
+            async with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+    def snapshot(self) -> dict:
+        """Return the window, the calls in flight and waiting, and the recent error rate."""
+        return {
+            "window": self.window,
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "recent_error_rate": (
+                round(self._outcomes.count(False) / len(self._outcomes), 3)
+                if self._outcomes
+                else 0.0
+            ),
+        }
+
+
+# Limiters are bound to the event loop that uses them, so keep one per loop.
+# The learned limit is remembered per configuration so a new loop starts from it.
+_limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = (
+    weakref.WeakKeyDictionary()
+)
+_learned_limits: dict[tuple, float] = {}
+
+
+def get_adaptive_limiter(
+    initial_limit: int, min_limit: int, max_limit: int, latency_target: float
+) -> AdaptiveConcurrencyLimiter:
+    """Get or create the adaptive limiter of the running event loop."""
+    key = (min_limit, max_limit, latency_target)
+    loop_limiters = _limiters.setdefault(asyncio.get_running_loop(), {})
+    if key not in loop_limiters:
+        limiter = AdaptiveConcurrencyLimiter(
+            initial_limit, min_limit, max_limit, latency_target
+        )
+        limiter.config_key = key
+        if key in _learned_limits:
+            limiter.limit = _learned_limits[key]
+        loop_limiters[key] = limiter
+    return loop_limiters[key]
+
+
+def remember_limit(limiter: AdaptiveConcurrencyLimiter) -> None:
+    """Store the limiter's current limit as the starting point for new loops."""
+    _learned_limits[limiter.config_key] = limiter.limit
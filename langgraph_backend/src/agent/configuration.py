@@ -1,31 +1,63 @@
 import os
-from pydantic import BaseModel, Field
-from typing import Any, Optional
+from typing import Any
 
 from langchain_core.runnables import RunnableConfig
+from pydantic import BaseModel, Field
+
+from agent.rate_limit import DEFAULT_RATE_LIMIT_PATH
+from agent.search_cache import DEFAULT_CACHE_PATH
+from agent.summary_store import DEFAULT_SUMMARY_STORE_PATH
 
 
 class Configuration(BaseModel):
     """The configuration for the agent."""
 
-    query_generator_model: str = Field(
-        default="gemini-2.5-pro",
+    fast_model: str = Field(
+        default="gemini-2.5-flash",
         metadata={
-            "description": "The name of the language model to use for the agent's query generation."
+            "description": "Model of the fast tier, used for query generation, web search summarization and reflection."
         },
     )
 
-    reflection_model: str = Field(
+    strong_model: str = Field(
         default="gemini-2.5-pro",
         metadata={
-            "description": "The name of the language model to use for the agent's reflection."
+            "description": "Model of the strong tier, used for the final answer and for escalated structured-output calls."
         },
     )
 
-    answer_model: str = Field(
-        default="gemini-2.5-pro",
+    model_escalation: bool = Field(
+        default=True,
+        metadata={
+            "description": "Repeat a fast-tier structured-output call on the strong tier when its output still fails validation after repair and re-ask."
+        },
+    )
+
+    query_generator_model: str | None = Field(
+        default=None,
+        metadata={
+            "description": "The name of the language model to use for the agent's query generation. Defaults to the fast tier model."
+        },
+    )
+
+    search_model: str | None = Field(
+        default=None,
+        metadata={
+            "description": "The name of the language model to use for the grounded web searches. Defaults to the fast tier model."
+        },
+    )
+
+    reflection_model: str | None = Field(
+        default=None,
+        metadata={
+            "description": "The name of the language model to use for the agent's reflection. Defaults to the fast tier model."
+        },
+    )
+
+    answer_model: str | None = Field(
+        default=None,
         metadata={
-            "description": "The name of the language model to use for the agent's answer."
+            "description": "The name of the language model to use for the agent's answer. Defaults to the strong tier model."
         },
     )
 
@@ -41,12 +73,228 @@ class Configuration(BaseModel):
 
     num_parallel_tasks: int = Field(
         default=4,
-        metadata={"description": "The maximum number of parallel web research tasks."},
+        metadata={
+            "description": "The number of parallel web research tasks. In adaptive concurrency mode this is the starting window."
+        },
+    )
+
+    concurrency_mode: str = Field(
+        default="adaptive",
+        metadata={
+            "description": "How web research parallelism is limited: 'adaptive' grows and shrinks the window (AIMD) from latency and 429s, 'fixed' keeps num_parallel_tasks."
+        },
+    )
+
+    min_parallel_tasks: int = Field(
+        default=1,
+        metadata={"description": "Lower bound of the adaptive concurrency window."},
+    )
+
+    max_parallel_tasks: int = Field(
+        default=16,
+        metadata={"description": "Upper bound of the adaptive concurrency window."},
+    )
+
+    latency_target_seconds: float = Field(
+        default=60.0,
+        metadata={
+            "description": "Web research calls slower than this do not grow the adaptive concurrency window."
+        },
+    )
+
+    answer_mode: str = Field(
+        default="auto",
+        metadata={
+            "description": "How the final answer is synthesized: 'stuff' puts every summary into one prompt, 'map_reduce' condenses summaries in parallel batches first, 'auto' switches to map-reduce above the thresholds below."
+        },
+    )
+
+    map_reduce_summary_threshold: int = Field(
+        default=40,
+        metadata={
+            "description": "Number of summaries above which the 'auto' answer mode uses map-reduce."
+        },
+    )
+
+    map_reduce_token_threshold: int = Field(
+        default=150_000,
+        metadata={
+            "description": "Estimated summary tokens above which the 'auto' answer mode uses map-reduce."
+        },
+    )
+
+    map_reduce_batch_size: int = Field(
+        default=8,
+        metadata={
+            "description": "Number of summaries condensed together in one map-reduce call."
+        },
+    )
+
+    model_backend: str = Field(
+        default="vertexai",
+        metadata={
+            "description": "Model backend: 'vertexai', or 'fake' for the deterministic offline stand-in used in benchmarks and local runs."
+        },
+    )
+
+    fake_model_latency_seconds: float = Field(
+        default=0.0,
+        metadata={"description": "Simulated latency of every fake model call."},
+    )
+
+    fake_model_rate_limit_probability: float = Field(
+        default=0.0,
+        metadata={
+            "description": "Probability that a fake model call fails with an injected 429 ResourceExhausted error."
+        },
+    )
+
+    fake_model_sufficient_after: int = Field(
+        default=1_000_000,
+        metadata={
+            "description": "Number of summaries after which the fake reflection reports the research as sufficient."
+        },
+    )
+
+    fake_model_malformed_output_probability: float = Field(
+        default=0.0,
+        metadata={
+            "description": "Probability that the fake model returns malformed structured output (commented JSON text or a tool call missing a field)."
+        },
+    )
+
+    structured_output_reask: bool = Field(
+        default=True,
+        metadata={
+            "description": "When structured output is still missing fields after local JSON repair, ask the model again for only those fields instead of failing the node."
+        },
+    )
+
+    server_log_max_open_files: int = Field(
+        default=32,
+        metadata={
+            "description": "Maximum number of per-run server debug log files kept open at once; the least recently used one is closed first."
+        },
+    )
+
+    warm_model_clients: bool = Field(
+        default=False,
+        metadata={
+            "description": "Whether to build the default model clients on a background thread when the graph module is loaded. Off by default; the thread is joined at interpreter exit."
+        },
+    )
+
+    search_cache_mode: str = Field(
+        default="off",
+        metadata={
+            "description": "Search cache behaviour for this run: 'off' (default), 'read_write', or 'refresh' (skip lookups but store results). The cache is a SQLite file on the local host, so enable it explicitly where that file is writable and meant to persist."
+        },
+    )
+
+    search_cache_path: str = Field(
+        default=DEFAULT_CACHE_PATH,
+        metadata={"description": "Path of the on-disk search result cache."},
+    )
+
+    search_cache_ttl_seconds: int = Field(
+        default=24 * 60 * 60,
+        metadata={"description": "How long a cached search result stays valid."},
+    )
+
+    search_cache_max_entries: int = Field(
+        default=5000,
+        metadata={
+            "description": "Maximum number of cached search results before least recently used ones are evicted."
+        },
+    )
+
+    reflection_mode: str = Field(
+        default="full",
+        metadata={
+            "description": "How reflection sees the research: 'full' resends every summary each loop, 'incremental' sends a rolling knowledge digest plus only the new summaries."
+        },
+    )
+
+    knowledge_digest_max_words: int = Field(
+        default=1500,
+        metadata={
+            "description": "Word budget for the knowledge digest kept in incremental reflection mode."
+        },
+    )
+
+    rate_limit_rpm: int = Field(
+        default=0,
+        metadata={
+            "description": "Requests per minute allowed per model across all runs and worker processes sharing the rate limit store. 0 (default) disables the limit."
+        },
+    )
+
+    rate_limit_tpm: int = Field(
+        default=0,
+        metadata={
+            "description": "Estimated prompt tokens per minute allowed per model. 0 (default) disables the limit."
+        },
+    )
+
+    rate_limit_db_path: str = Field(
+        default=DEFAULT_RATE_LIMIT_PATH,
+        metadata={
+            "description": "SQLite file holding the shared rate limit buckets. Point both agent stacks at the same file to share one budget."
+        },
+    )
+
+    query_dedup_threshold: float = Field(
+        default=0.85,
+        metadata={
+            "description": "Similarity (0-1) at or above which a follow-up query is skipped as a near-duplicate of an earlier one. The default 0.85 also skips rephrasings; 1.0 only skips exact repeats. Values above 1 disable de-duplication."
+        },
+    )
+
+    summary_store_mode: str = Field(
+        default="inline",
+        metadata={
+            "description": "Where web research summaries are kept: 'inline' keeps the text in the checkpointed state, 'sqlite' (opt-in) stores them in a content-addressed side store and keeps only their hashes in the state. The side store must outlive every thread that may be resumed and be reachable from every server replica."
+        },
+    )
+
+    summary_store_path: str = Field(
+        default=DEFAULT_SUMMARY_STORE_PATH,
+        metadata={
+            "description": "SQLite file of the summary side store. Every server process must be able to reach it."
+        },
+    )
+
+    summary_store_ttl_seconds: int = Field(
+        default=0,
+        metadata={
+            "description": "Summaries not stored or loaded for this many seconds are deleted from the side store (checked at most hourly, at the end of a run), except the ones the run's checkpoints still reference. Only runs whose checkpointer is a BlobCheckpointSaver can tell which those are; other runs never expire summaries. 0 (default) keeps them forever."
+        },
+    )
+
+    convergence_policy: str = Field(
+        default="off",
+        metadata={
+            "description": "When to end research loops early. 'gain' also stops once a loop's marginal information gain (new unique URLs, novelty of new summaries, novelty of its queries) falls below min_information_gain; 'off' only stops on sufficiency, the loop limit or when no new queries remain."
+        },
+    )
+
+    min_information_gain: float = Field(
+        default=0.15,
+        metadata={
+            "description": "Weighted information gain (0-1) below which a research loop ends the research with the 'gain' convergence policy."
+        },
+    )
+
+    trace_export_path: str = Field(
+        default="",
+        metadata={
+            "description": "JSONL file that finished tracing spans (run, node, retry attempt, model call) are appended to, one OTLP-style span per line. Empty disables the export."
+        },
     )
 
     @classmethod
     def from_runnable_config(
-        cls, config: Optional[RunnableConfig] = None
+        cls, config: RunnableConfig | None = None
     ) -> "Configuration":
         """Create a Configuration instance from a RunnableConfig."""
         configurable = (
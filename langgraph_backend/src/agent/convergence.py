@@ -0,0 +1,131 @@
+"""Measurement of how much each research loop adds, and when to stop."""
+
+import re
+from typing import Iterable
+
+from agent.query_dedup import QueryIndex
+
+# How much each signal contributes to the information gain of a loop
+GAIN_WEIGHTS = {
+    "new_url_ratio": 0.5,
+    "summary_novelty": 0.3,
+    "query_novelty": 0.2,
+}
+
+STOP_REASONS = ("sufficient", "max_loops", "low_gain", "no_new_queries")
+
+
+def word_shingles(text: str, n: int = 3) -> set:
+    """Return the set of lower-cased word n-grams of a text, ignoring citation markers."""
+    words = re.findall(
+        r"\w+", re.sub(r"\[[^\]]*\]\([^)]*\)|\[[^\]]*\]", " ", text.lower())
+    )
+    if len(words) < n:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i : i + n]) for i in range(len(words) - n + 1)}
+
+
+def summary_novelty(
+    new_summaries: Iterable[str], old_summaries: Iterable[str]
+) -> float:
+    """Share of the new summaries' word 3-grams that no earlier summary contains."""
+    seen = set()
+    for summary in old_summaries:
+        seen |= word_shingles(summary)
+    new = set()
+    for summary in new_summaries:
+        new |= word_shingles(summary)
+    if not new:
+        return 0.0
+    return len(new - seen) / len(new)
+
+
+def query_novelty(new_queries: Iterable[str], old_queries: Iterable[str]) -> float:
+    """One minus the mean similarity of each new query to its closest earlier query."""
+    index = QueryIndex(old_queries)
+    scores = [1 - index.most_similar(query)[1] for query in new_queries]
+    return sum(scores) / len(scores) if scores else 0.0
+
+
+def url_sightings(sources_gathered: list) -> int:
+    """Count the (query, URL) citations behind the merged sources, aliases included."""
+    return sum(1 + len(source.get("aliases", [])) for source in sources_gathered)
+
+
+def measure_loop_gain(
+    loop: int,
+    sources_gathered: list,
+    summaries: list,
+    queries: list,
+    previous: dict | None,
+) -> dict:
+    """Measure what the research loop that just finished added to the earlier ones.
+
+    Args:
+        loop: Number of the loop being measured.
+        sources_gathered: The merged sources, one entry per URL.
+        summaries, queries: The accumulated summaries and search queries.
+        previous: The record returned for the previous loop, `None` for the first.
+
+    Returns:
+        A record with the list sizes (the boundaries for the next loop), the
+        individual signals and their weighted `gain`. The first loop has nothing
+        to compare against, so its gain is 1.
+    """
+    record = {
+        "loop": loop,
+        "sources": len(sources_gathered),
+        "sightings": url_sightings(sources_gathered),
+        "summaries": len(summaries),
+        "queries": len(queries),
+    }
+    if previous is None:
+        return {**record, "new_urls": len(sources_gathered), "gain": 1.0}
+
+    # Sources are merged by URL, so entries past the previous count are new URLs and
+    # the growth in sightings is everything this loop's searches cited
+    new_urls = len(sources_gathered) - previous["sources"]
+    loop_sightings = record["sightings"] - previous.get(
+        "sightings", previous["sources"]
+    )
+    signals = {
+        "new_url_ratio": new_urls / loop_sightings if loop_sightings > 0 else 0.0,
+        "summary_novelty": summary_novelty(
+            summaries[previous["summaries"] :], summaries[: previous["summaries"]]
+        ),
+        "query_novelty": query_novelty(
+            queries[previous["queries"] :], queries[: previous["queries"]]
+        ),
+    }
+    gain = sum(GAIN_WEIGHTS[name] * value for name, value in signals.items())
+    return {
+        **record,
+        "new_urls": new_urls,
+        **{name: round(value, 3) for name, value in signals.items()},
+        "gain": round(gain, 3),
+    }
+
+
+def decide_stop_reason(
+    is_sufficient: bool,
+    loop: int,
+    max_loops: int,
+    follow_up_queries: list,
+    loop_gain: dict | None,
+    policy: str,
+    min_gain: float,
+) -> str:
+    """Return why research should stop after this loop, or "" to continue.
+
+    The reason is one of `STOP_REASONS`. `loop_gain` is only consulted with the
+    'gain' policy.
+    """
+    if is_sufficient:
+        return "sufficient"
+    if loop >= max_loops:
+        return "max_loops"
+    if policy == "gain" and loop_gain is not None and loop_gain["gain"] < min_gain:
+        return "low_gain"
+    if not follow_up_queries:
+        return "no_new_queries"
+    return ""
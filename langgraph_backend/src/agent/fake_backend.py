@@ -0,0 +1,331 @@
+"""Offline chat model backend that imitates Gemini for tests and benchmarks."""
+
+import asyncio
+import hashlib
+import itertools
+import json
+import random
+import re
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, List, Sequence
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForLLMRun,
+    CallbackManagerForLLMRun,
+)
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import BaseModel, PrivateAttr
+
+from agent.utils import find_short_urls
+
+# Streamed responses are split into chunks of this many characters
+STREAM_CHUNK_CHARS = 24
+
+# Synthetic sources are drawn from a fixed pool so queries partly share URLs,
+# like real searches on related topics do
+SOURCE_POOL_SIZE = 200
+
+# Threads whose draw counters are kept; older ones start over if they come back
+MAX_DRAW_THREADS = 1000
+
+WORDS = (
+    "analysis framework regulation market evidence court decision policy data "
+    "report trend impact benchmark adoption risk standard case review practice"
+).split()
+
+
+def _digest(text: str) -> int:
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+
+
+def _prompt_text(messages: Sequence[BaseMessage]) -> str:
+    return "\n".join(
+        m.content if isinstance(m.content, str) else str(m.content) for m in messages
+    )
+
+
+def _topic(prompt: str) -> str:
+    """Pull the research topic out of one of the agent prompts."""
+    for pattern in (
+        r'information on "(.*?)"',
+        r'(?:summaries|research) about "(.*?)"',
+        r"Context: (.*)",
+        r"User Context:\s*- (.*)",
+    ):
+        if match := re.search(pattern, prompt, re.DOTALL):
+            return " ".join(match.group(1).split())[:60]
+    return " ".join(prompt.split())[:60]
+
+
+def _sentences(seed: int, count: int, topic: str) -> List[str]:
+    rng = random.Random(seed)
+    return [
+        f"{topic.capitalize()} {' '.join(rng.choice(WORDS) for _ in range(8))}."
+        for _ in range(count)
+    ]
+
+
+class FakeChatModel(BaseChatModel):
+    """Deterministic offline stand-in for ChatVertexAI.
+
+    Needs no network or credentials. Bound to a pydantic schema it returns a
+    schema-valid tool call (so `with_structured_output` works unchanged), bound
+    to the google_search tool it returns text with synthetic `grounding_chunks`
+    and `grounding_supports`, and otherwise plain text. Responses depend only on
+    the prompt, so repeated runs are reproducible; latency and 429 injection
+    are configurable to exercise the orchestration code, and so is malformed
+    structured output to exercise the repair path.
+    """
+
+    model_name: str = "fake-model"
+    temperature: float = 0.0
+    latency: float = 0.0
+    rate_limit_probability: float = 0.0
+    sufficient_after: int = 1_000_000
+    malformed_output_probability: float = 0.0
+    sources_per_response: int = 4
+    seed: int = 0
+    _draw_counters: OrderedDict = PrivateAttr(default_factory=OrderedDict)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-vertexai"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"model_name": self.model_name, "seed": self.seed}
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        """Bind tools the way ChatVertexAI does, so structured output works on the fake."""
+        return self.bind(tools=list(tools), **kwargs)
+
+    def _draw(self, kind: str, prompt: str, thread_id: str | None) -> random.Random:
+        """RNG for the next `kind` draw on `prompt` in a thread.
+
+        Seeded from the seed, the prompt and how often it was drawn for before
+        in the thread, so retries of a prompt get new draws while every run on
+        a new thread sees the same ones, even in a long-lived process whose
+        model clients are pooled.
+        """
+        counters = self._draw_counters.setdefault(thread_id, {})
+        self._draw_counters.move_to_end(thread_id)
+        if len(self._draw_counters) > MAX_DRAW_THREADS:
+            self._draw_counters.popitem(last=False)
+        counter = counters.setdefault((kind, prompt), itertools.count())
+        return random.Random(f"{self.seed}-{kind}-{prompt}-{next(counter)}")
+
+    def _maybe_rate_limit(self, prompt: str, thread_id: str | None) -> None:
+        if self.rate_limit_probability <= 0:
+            return
+        rng = self._draw("rate-limit", prompt, thread_id)
+        if rng.random() < self.rate_limit_probability:
+            raise Exception("429 ResourceExhausted: injected by the fake model backend")
+
+    def _structured_message(
+        self, schema: type[BaseModel], prompt: str, thread_id: str | None
+    ) -> AIMessage:
+        args = self._structured_args(schema, prompt)
+        call_id = f"call_{_digest(prompt) % 10**8}"
+        if self.malformed_output_probability <= 0:
+            return AIMessage(
+                content="",
+                tool_calls=[{"name": schema.__name__, "args": args, "id": call_id}],
+            )
+        rng = self._draw("malformed", prompt, thread_id)
+        if rng.random() >= self.malformed_output_probability:
+            return AIMessage(
+                content="",
+                tool_calls=[{"name": schema.__name__, "args": args, "id": call_id}],
+            )
+        if rng.random() < 0.5 or len(args) < 2:
+            # JSON in the text, written like the prompt examples: comments and trailing commas
+            lines = [
+                f"    {json.dumps(name)}: {json.dumps(value)}, // {name}"
+                for name, value in args.items()
+            ]
+            return AIMessage(content="```json\n{\n" + "\n".join(lines) + "\n}\n```")
+        # A tool call with its last field left out
+        partial = dict(list(args.items())[:-1])
+        return AIMessage(
+            content="",
+            tool_calls=[{"name": schema.__name__, "args": partial, "id": call_id}],
+        )
+
+    def _grounded_message(self, prompt: str) -> AIMessage:
+        topic = _topic(prompt)
+        seed = _digest(f"{self.seed}-{prompt}")
+        sentences = _sentences(seed, self.sources_per_response + 1, topic)
+        content = " ".join(sentences)
+
+        rng = random.Random(seed)
+        chunks, supports, offset = [], [], 0
+        for idx, sentence in enumerate(sentences[: self.sources_per_response]):
+            source = rng.randrange(SOURCE_POOL_SIZE)
+            chunks.append(
+                {
+                    "web": {
+                        "uri": f"https://source-{source}.example.com/article/{source}",
+                        "title": f"source-{source}.example.com",
+                    }
+                }
+            )
+            supports.append(
+                {
+                    "segment": {
+                        "start_index": offset,
+                        "end_index": offset + len(sentence),
+                        "text": sentence,
+                    },
+                    "grounding_chunk_indices": [idx],
+                    "confidence_scores": [round(0.5 + rng.random() / 2, 3)],
+                }
+            )
+            offset += len(sentence) + 1
+        return AIMessage(
+            content=content,
+            response_metadata={
+                "grounding_metadata": {
+                    "grounding_chunks": chunks,
+                    "grounding_supports": supports,
+                    "web_search_queries": [topic],
+                }
+            },
+        )
+
+    def _structured_args(self, schema: type[BaseModel], prompt: str) -> dict:
+        topic = _topic(prompt)
+        seed = _digest(f"{self.seed}-{prompt}")
+        rng = random.Random(seed)
+        num_summaries = prompt.count("\n\n---\n\n") + 1
+        is_sufficient = num_summaries >= self.sufficient_after
+
+        args = {}
+        for name, field in schema.model_fields.items():
+            if name == "query":
+                match = re.search(r"more than (\d+) queries", prompt)
+                count = int(match.group(1)) if match else 3
+                args[name] = [
+                    f"{topic} {' '.join(rng.sample(WORDS, 3))} {i}"
+                    for i in range(count)
+                ]
+            elif name == "follow_up_queries":
+                args[name] = (
+                    []
+                    if is_sufficient
+                    else [f"{topic} {' '.join(rng.sample(WORDS, 4))}" for _ in range(2)]
+                )
+            elif name == "is_sufficient":
+                args[name] = is_sufficient
+            elif name == "knowledge_gap":
+                args[name] = (
+                    "" if is_sufficient else f"More detail on {rng.choice(WORDS)}."
+                )
+            elif field.annotation is bool:
+                args[name] = False
+            else:
+                args[name] = " ".join(_sentences(seed, 2, topic))
+        return args
+
+    def _respond(
+        self,
+        messages: Sequence[BaseMessage],
+        run_manager: CallbackManagerForLLMRun
+        | AsyncCallbackManagerForLLMRun
+        | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        prompt = _prompt_text(messages)
+        # LangGraph puts the run's configurable, and with it thread_id, in the metadata
+        thread_id = run_manager.metadata.get("thread_id") if run_manager else None
+        self._maybe_rate_limit(prompt, thread_id)
+        tools = kwargs.get("tools") or []
+        schemas = [t for t in tools if isinstance(t, type) and issubclass(t, BaseModel)]
+
+        if schemas:
+            message = self._structured_message(schemas[0], prompt, thread_id)
+        elif any(isinstance(t, dict) and "google_search" in t for t in tools):
+            message = self._grounded_message(prompt)
+        else:
+            topic = _topic(prompt)
+            # Cite every short url of the prompt, like a well-behaved answer would
+            links = " ".join(
+                f"[{url.rsplit('/', 1)[-1]}]({url})"
+                for url in dict.fromkeys(find_short_urls(prompt))
+            )
+            message = AIMessage(
+                content=" ".join(_sentences(_digest(prompt), 6, topic))
+                + (f" {links}" if links else "")
+            )
+
+        input_tokens = (len(prompt) + 3) // 4
+        output_tokens = (
+            len(str(message.content)) + len(str(message.tool_calls)) + 3
+        ) // 4
+        message.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+        message.response_metadata["model_name"] = self.model_name
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: List[str] | None = None,
+        run_manager: CallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latency:
+            time.sleep(self.latency)
+        return self._respond(messages, run_manager, **kwargs)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: List[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._respond(messages, run_manager, **kwargs)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: List[str] | None = None,
+        run_manager: AsyncCallbackManagerForLLMRun | None = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        message = self._respond(messages, run_manager, **kwargs).generations[0].message
+        # Small fixed-size chunks also split short urls, like real token streams do
+        text = message.content
+        for start in range(0, len(text), STREAM_CHUNK_CHARS):
+            chunk = ChatGenerationChunk(
+                message=AIMessageChunk(content=text[start : start + STREAM_CHUNK_CHARS])
+            )
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(
+            message=AIMessageChunk(
+                content="",
+                tool_call_chunks=[
+                    {
+                        "name": call["name"],
+                        "args": json.dumps(call["args"]),
+                        "id": call["id"],
+                        "index": index,
+                    }
+                    for index, call in enumerate(message.tool_calls)
+                ],
+                usage_metadata=message.usage_metadata,
+                response_metadata=message.response_metadata,
+            )
+        )
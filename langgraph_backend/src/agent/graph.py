@@ -1,157 +1,506 @@
-import os
-import logging
 import asyncio
-from pprint import pformat
-from functools import wraps
+import logging
 import random
 import time
+import uuid
+import weakref
+from contextlib import asynccontextmanager
+from dataclasses import replace
+from functools import wraps
+from pprint import pformat
 
-from agent.tools_and_schemas import SearchQueryList, Reflection
 from dotenv import load_dotenv
-from langchain_core.messages import AIMessage
-from langgraph.types import Send
-from langgraph.graph import StateGraph
-from langgraph.graph import START, END
-from langchain_core.runnables import RunnableConfig
-from google.genai import Client
-from langchain_google_vertexai import ChatVertexAI
 from langchain_community.tools.tavily_search import TavilySearchResults
+from langchain_core.messages import AIMessage
 from langchain_core.prompts import PromptTemplate
-from langchain_core.runnables import ConfigurableField
+from langchain_core.runnables import ConfigurableField, RunnableConfig
+from langgraph.config import get_stream_writer
+from langgraph.constants import CONFIG_KEY_CHECKPOINTER
+from langgraph.graph import END, START, StateGraph
+from langgraph.types import Send
 
+from agent.checkpoint_store import BlobCheckpointSaver
+from agent.concurrency import get_adaptive_limiter, is_rate_limit_error, remember_limit
+from agent.configuration import Configuration
+from agent.convergence import decide_stop_reason, measure_loop_gain
+from agent.model_registry import ModelSpec, model_registry
+from agent.model_routing import FAST, STRONG, node_model, tier_model
+from agent.prompts import (
+    answer_instructions,
+    get_current_date,
+    incremental_reflection_instructions,
+    query_writer_instructions,
+    reflection_instructions,
+    summary_reduce_instructions,
+    web_searcher_instructions,
+)
+from agent.query_dedup import dedupe_queries
+from agent.rate_limit import cached_rate_limiter, get_rate_limiter
+from agent.run_logging import close_server_log, get_server_logger, set_max_open_run_logs
+from agent.search_cache import get_search_cache
 from agent.state import (
     OverallState,
     QueryGenerationState,
     ReflectionState,
     WebSearchState,
 )
-from agent.configuration import Configuration
-from agent.prompts import (
-    get_current_date,
-    query_writer_instructions,
-    web_searcher_instructions,
-    reflection_instructions,
-    answer_instructions,
+from agent.structured_output import (
+    StructuredOutputError,
+    missing_fields_schema,
+    reask_prompt,
+    recover_structured_output,
+    structured_output_stats,
+    validate_partial,
+)
+from agent.summary_store import get_summary_store, is_summary_ref
+from agent.tools_and_schemas import IncrementalReflection, Reflection, SearchQueryList
+from agent.tracing import (
+    current_span,
+    enter_run,
+    exit_run,
+    get_span_exporter,
+    start_span,
 )
+from agent.usage import UsageMeter, format_usage_summary, summarize_usage
 from agent.utils import (
+    StreamingUrlResolver,
+    estimate_tokens,
+    find_short_urls,
     get_citations,
     get_research_topic,
     insert_citation_markers,
     resolve_urls,
 )
 
+
 # Retry decorator with exponential backoff
 def retry_with_exponential_backoff(max_retries=5, multiplier=1, max_wait=120):
     """Decorator for retrying async functions with exponential backoff.
-    
+
     Args:
         max_retries: Maximum number of retry attempts
         multiplier: Base multiplier for wait time
         max_wait: Maximum wait time in seconds
     """
+
     def decorator(func):
         @wraps(func)
         async def wrapper(*args, **kwargs):
             for attempt in range(max_retries):
                 try:
-                    return await func(*args, **kwargs)
+                    with start_span(f"{func.__name__}.attempt", attempt=attempt + 1):
+                        return await func(*args, **kwargs)
                 except Exception as e:
-                    if "429" in str(e) or "ResourceExhausted" in str(e):
+                    if is_rate_limit_error(e):
                         if attempt == max_retries - 1:
                             raise
-                        
+
                         # Calculate wait time with exponential backoff and jitter
                         wait_time = min(
-                            multiplier * (2 ** attempt) + random.uniform(0, 1),
-                            max_wait
+                            multiplier * (2**attempt) + random.uniform(0, 1), max_wait
                         )
-                        
+
                         # Log the retry attempt
                         logger = logging.getLogger(__name__)
                         logger.warning(
                             f"Rate limit hit (429). Retrying {func.__name__} in {wait_time:.2f} seconds. "
                             f"Attempt {attempt + 1}/{max_retries}"
                         )
-                        
-                        await asyncio.sleep(wait_time)
+
+                        with start_span(
+                            "backoff",
+                            attempt=attempt + 1,
+                            wait_seconds=round(wait_time, 3),
+                        ):
+                            await asyncio.sleep(wait_time)
                     else:
                         raise
             return None
+
         return wrapper
+
     return decorator
 
-# --- Dynamic Server-Side Debug Logging ---
-def get_server_logger(config: RunnableConfig):
-    # Default path in case something goes wrong, though it shouldn't be used
-    default_log_path = os.path.join(os.path.dirname(__file__), '..', 'default_server_debug.log')
-    log_full_path = config.get("configurable", {}).get("server_log_path", default_log_path)
-    
-    # Use the log path as a unique logger name to avoid handler conflicts
-    logger_name = log_full_path
-    logger = logging.getLogger(logger_name)
-    
-    # Avoid adding handlers if they already exist for this logger instance
-    if not logger.handlers:
-        # Ensure the directory exists
-        os.makedirs(os.path.dirname(log_full_path), exist_ok=True)
-        file_handler = logging.FileHandler(log_full_path)
-        file_handler.setLevel(logging.INFO)
-        formatter = logging.Formatter('%(asctime)s - SERVER - %(levelname)s - %(message)s')
-        file_handler.setFormatter(formatter)
-        logger.addHandler(file_handler)
-        logger.setLevel(logging.INFO)
-        logger.propagate = False # Prevent logs from propagating to the root logger
-
-    return logger
-# --- End Logging Setup ---
+
+# --- Tracing ---
+def get_run_key(config: RunnableConfig) -> str | None:
+    """Identify the run a node belongs to, so its span can be parented to the run span.
+
+    Returns `None` when the config carries neither a run nor a thread id.
+    """
+    configurable = config.get("configurable", {})
+    metadata = config.get("metadata", {})
+    run_key = (
+        configurable.get("run_id")
+        or metadata.get("run_id")
+        or configurable.get("thread_id")
+        or metadata.get("thread_id")
+    )
+    return str(run_key) if run_key else None
+
+
+def traced_node(name: str, index_key: str = None, ends_run: bool = False):
+    """Run a graph node inside a span parented to the span of its run.
+
+    The run span and the server log of the run are closed when the terminal node
+    finishes, or after a node failed once the run's last active node exited.
+
+    Args:
+        name: Node name used for the span.
+        index_key: State key appended to the span name, e.g. `web_research[3]`.
+        ends_run: Close the run span once this node finishes.
+    """
+
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(state, config: RunnableConfig):
+            configurable = Configuration.from_runnable_config(config)
+            set_max_open_run_logs(configurable.server_log_max_open_files)
+            exporter = (
+                get_span_exporter(configurable.trace_export_path)
+                if configurable.trace_export_path
+                else None
+            )
+            run_key = get_run_key(config)
+            # Without an id the nodes of one run cannot be told apart from those of
+            # concurrent runs, so every node gets a run span of its own
+            node_ends_run = ends_run or run_key is None
+            run_key = run_key or f"local-{uuid.uuid4().hex}"
+            run = enter_run(
+                run_key,
+                exporter,
+                thread_id=config.get("configurable", {}).get("thread_id"),
+            )
+            span_name = f"{name}[{state[index_key]}]" if index_key else name
+            error = None
+            try:
+                with start_span(
+                    span_name,
+                    exporter=exporter,
+                    trace_id=run.trace_id,
+                    parent_id=run.span_id,
+                    node=name,
+                ):
+                    return await func(state, config)
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                if exit_run(run_key, error=error, ends_run=node_ends_run):
+                    close_server_log(config)
+
+        return wrapper
+
+    return decorator
+
+
+# --- End Tracing ---
 
 
 load_dotenv()
 
-# Used for Google Search API
-genai_client = Client()
+# Semaphores are created dynamically based on configuration. They are bound to
+# the event loop that uses them, so keep one set per loop (BG_JOB_ISOLATED_LOOPS
+# runs every background job on its own loop).
+_semaphore_cache: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = (
+    weakref.WeakKeyDictionary()
+)
 
-# Semaphore will be created dynamically based on configuration
-_semaphore_cache = {}
 
 def get_semaphore(num_parallel_tasks: int) -> asyncio.Semaphore:
     """Get or create a semaphore with the specified number of parallel tasks."""
-    if num_parallel_tasks not in _semaphore_cache:
-        _semaphore_cache[num_parallel_tasks] = asyncio.Semaphore(num_parallel_tasks)
-    return _semaphore_cache[num_parallel_tasks]
+    loop_semaphores = _semaphore_cache.setdefault(asyncio.get_running_loop(), {})
+    if num_parallel_tasks not in loop_semaphores:
+        loop_semaphores[num_parallel_tasks] = asyncio.Semaphore(num_parallel_tasks)
+    return loop_semaphores[num_parallel_tasks]
+
+
+@asynccontextmanager
+async def web_research_slot(configurable: Configuration, config: RunnableConfig):
+    """Hold one web research slot from the adaptive (or fixed) concurrency limiter."""
+    span = current_span()
+    if configurable.concurrency_mode == "fixed":
+        start = time.monotonic()
+        async with get_semaphore(configurable.num_parallel_tasks):
+            if span is not None:
+                span.set(queue_wait_seconds=round(time.monotonic() - start, 6))
+            yield
+        return
+
+    limiter = get_adaptive_limiter(
+        configurable.num_parallel_tasks,
+        configurable.min_parallel_tasks,
+        configurable.max_parallel_tasks,
+        configurable.latency_target_seconds,
+    )
+    try:
+        async with limiter.slot() as queue_wait:
+            if span is not None:
+                span.set(
+                    queue_wait_seconds=round(queue_wait, 6),
+                    concurrency_window=limiter.window,
+                )
+            get_server_logger(config).info(
+                f"Web research slot acquired after {queue_wait:.2f}s: {limiter.snapshot()}"
+            )
+            yield
+    finally:
+        remember_limit(limiter)
+
+
+async def acquire_model_quota(
+    model_name: str, prompt: str, configurable: Configuration, config: RunnableConfig
+) -> None:
+    """Wait for the shared per-model request and token budget before a model call."""
+    if configurable.rate_limit_rpm <= 0 or configurable.rate_limit_tpm <= 0:
+        return
+    # Only the first call for a store opens it; later ones are a dict lookup
+    rate_limiter = cached_rate_limiter(
+        configurable.rate_limit_db_path
+    ) or await asyncio.to_thread(get_rate_limiter, configurable.rate_limit_db_path)
+    waited = await rate_limiter.acquire(
+        model_name,
+        estimate_tokens(prompt),
+        configurable.rate_limit_rpm,
+        configurable.rate_limit_tpm,
+    )
+    if (span := current_span()) is not None:
+        span.add("quota_wait_seconds", waited)
+    if waited >= 1:
+        get_server_logger(config).info(
+            f"Waited {waited:.2f}s for {model_name} quota "
+            f"(queue depth {rate_limiter.queue_depth(model_name)})"
+        )
+
+
+GOOGLE_SEARCH_TOOL = {"google_search": {}}
+
+
+async def store_summary(summary: str, configurable: Configuration) -> str:
+    """Put a summary in the side store and return the reference kept in the state."""
+    if configurable.summary_store_mode != "sqlite":
+        return summary
+    summary_store = await asyncio.to_thread(
+        get_summary_store, configurable.summary_store_path
+    )
+    return await summary_store.aput(summary)
+
+
+async def load_summaries(items: list, configurable: Configuration) -> list[str]:
+    """Resolve the summary references of `web_research_result` to their text."""
+    if not any(is_summary_ref(item) for item in items):
+        return list(items)
+    summary_store = await asyncio.to_thread(
+        get_summary_store, configurable.summary_store_path
+    )
+    return await summary_store.aload(items)
+
+
+async def expire_summaries(configurable: Configuration, config: RunnableConfig) -> None:
+    """Delete side store summaries unused for `summary_store_ttl_seconds`, at most hourly.
+
+    Summaries that retained checkpoints reference are kept. Those can only be
+    listed for a `BlobCheckpointSaver`; with any other checkpointer nothing is
+    deleted.
+    """
+    if (
+        configurable.summary_store_mode != "sqlite"
+        or configurable.summary_store_ttl_seconds <= 0
+    ):
+        return
+    summary_store = await asyncio.to_thread(
+        get_summary_store, configurable.summary_store_path
+    )
+    if not summary_store.expire_due(configurable.summary_store_ttl_seconds):
+        return
+    checkpointer = config.get("configurable", {}).get(CONFIG_KEY_CHECKPOINTER)
+    if not isinstance(checkpointer, BlobCheckpointSaver):
+        get_server_logger(config).warning(
+            "Not expiring side store summaries: the checkpointer cannot list the "
+            "summaries its checkpoints reference"
+        )
+        return
+    keep = await asyncio.to_thread(checkpointer.summary_refs)
+    if expired := await summary_store.aexpire(
+        configurable.summary_store_ttl_seconds, keep
+    ):
+        get_server_logger(config).info(
+            f"Expired summaries from the side store: {expired}"
+        )
+
+
+async def invoke_structured(
+    meter: UsageMeter,
+    model_spec: ModelSpec,
+    prompt: str,
+    configurable: Configuration,
+    config: RunnableConfig,
+):
+    """Call a structured-output model and return the parsed object.
+
+    A response the output parser rejects is repaired locally first. If fields
+    are still missing or invalid, only those are asked for again, once, with a
+    schema holding just them, instead of repeating the whole call. A fast-tier
+    call that still fails is repeated on the strong tier when `model_escalation`
+    is on.
+    """
+    schema = model_spec.schema
+    structured_llm = await model_registry.aget(model_spec)
+    await acquire_model_quota(model_spec.model_id, prompt, configurable, config)
+    result = await meter.ainvoke(
+        structured_llm, prompt, model_spec.model_id, model_spec.tier
+    )
+    parsed, valid, missing, outcome = recover_structured_output(result, schema)
+
+    if parsed is None and configurable.structured_output_reask:
+        get_server_logger(config).info(
+            f"{schema.__name__}: re-asking {model_spec.model_name} for {missing} "
+            f"(parse error: {result.get('parsing_error')!r})"
+        )
+        reask_spec = replace(model_spec, schema=missing_fields_schema(schema, missing))
+        reask_llm = await model_registry.aget(reask_spec)
+        followup_prompt = reask_prompt(prompt, valid, missing)
+        await acquire_model_quota(
+            reask_spec.model_id, followup_prompt, configurable, config
+        )
+        reask = await meter.ainvoke(
+            reask_llm, followup_prompt, reask_spec.model_id, reask_spec.tier
+        )
+        filled, filled_valid, _, _ = recover_structured_output(reask, reask_spec.schema)
+        filled_fields = filled.model_dump() if filled is not None else filled_valid
+        parsed, _, missing = validate_partial(schema, {**valid, **filled_fields})
+        outcome = "reasked"
+
+    strong_model = tier_model(configurable, STRONG)
+    if (
+        parsed is None
+        and configurable.model_escalation
+        and model_spec.tier == FAST
+        and model_spec.model_name != strong_model
+    ):
+        get_server_logger(config).info(
+            f"{schema.__name__}: escalating from {model_spec.model_name} to {strong_model}"
+        )
+        strong_spec = replace(model_spec, model_name=strong_model, tier=STRONG)
+        strong_llm = await model_registry.aget(strong_spec)
+        await acquire_model_quota(strong_spec.model_id, prompt, configurable, config)
+        result = await meter.ainvoke(
+            strong_llm, prompt, strong_spec.model_id, strong_spec.tier
+        )
+        parsed, strong_valid, _, _ = recover_structured_output(result, schema)
+        if parsed is None:
+            parsed, _, missing = validate_partial(schema, {**valid, **strong_valid})
+        outcome = "escalated"
+
+    if parsed is None:
+        outcome = "failed"
+    structured_output_stats.record(schema.__name__, outcome)
+    if (span := current_span()) is not None:
+        span.set(structured_output=outcome)
+    if outcome != "parsed":
+        get_server_logger(config).info(
+            f"{schema.__name__} structured output: {outcome}"
+        )
+    if parsed is None:
+        raise StructuredOutputError(
+            f"Model response did not contain a valid {schema.__name__}; missing or invalid: {missing}"
+        )
+    return parsed
+
+
+def get_model_specs(configurable: Configuration) -> dict[str, ModelSpec]:
+    """Return the model client used by each node for the given configuration."""
+    backend_options = ()
+    if configurable.model_backend == "fake":
+        backend_options = (
+            ("latency", configurable.fake_model_latency_seconds),
+            ("rate_limit_probability", configurable.fake_model_rate_limit_probability),
+            ("sufficient_after", configurable.fake_model_sufficient_after),
+            (
+                "malformed_output_probability",
+                configurable.fake_model_malformed_output_probability,
+            ),
+        )
+    query_model, query_tier = node_model(configurable, "generate_query")
+    search_model, search_tier = node_model(configurable, "web_research")
+    reflection_model, reflection_tier = node_model(configurable, "reflection")
+    answer_model, answer_tier = node_model(configurable, "finalize_answer")
+    specs = {
+        "generate_query": ModelSpec(
+            query_model,
+            temperature=0.6,
+            schema=SearchQueryList,
+            tier=query_tier,
+        ),
+        "web_research": ModelSpec(
+            search_model,
+            temperature=0.6,
+            tools=(GOOGLE_SEARCH_TOOL,),
+            tier=search_tier,
+        ),
+        "reflection": ModelSpec(
+            reflection_model,
+            temperature=0.6,
+            max_retries=2,
+            schema=Reflection,
+            tier=reflection_tier,
+        ),
+        "reflection_incremental": ModelSpec(
+            reflection_model,
+            temperature=0.6,
+            max_retries=2,
+            schema=IncrementalReflection,
+            tier=reflection_tier,
+        ),
+        "finalize_answer": ModelSpec(
+            answer_model,
+            temperature=0,
+            max_retries=2,
+            tier=answer_tier,
+        ),
+    }
+    return {
+        node: replace(
+            spec, backend=configurable.model_backend, backend_options=backend_options
+        )
+        for node, spec in specs.items()
+    }
+
 
 # Nodes
+@traced_node("generate_query")
 @retry_with_exponential_backoff()
-async def generate_query(state: OverallState, config: RunnableConfig) -> QueryGenerationState:
+async def generate_query(
+    state: OverallState, config: RunnableConfig
+) -> QueryGenerationState:
     """Generate search queries based on the question."""
     configurable = Configuration.from_runnable_config(config)
-    
+
     # Get the user's question from the state messages
     question = get_research_topic(state["messages"])
-    
+
     # Get number of queries from state or use default
     num_queries = state.get("initial_search_query_count", 5)
 
-    # Create LLM instance in a thread to avoid blocking I/O
-    llm = await asyncio.to_thread(
-        ChatVertexAI,
-        model_name=configurable.query_generator_model,
-        temperature=0.6,
-    )
-    
-    # Create structured LLM
-    structured_llm = llm.with_structured_output(SearchQueryList)
-    
+    model_spec = get_model_specs(configurable)["generate_query"]
+
     # Format the prompt with all required parameters
     formatted_prompt = query_writer_instructions.format(
         research_topic=question,
         number_queries=num_queries,
-        current_date=get_current_date()
+        current_date=get_current_date(),
     )
-    
+
     # Generate the search queries
-    result = await structured_llm.ainvoke(formatted_prompt)
-    return {"search_query": result.query}
+    meter = UsageMeter("generate_query")
+    result = await invoke_structured(
+        meter, model_spec, formatted_prompt, configurable, config
+    )
+    return {
+        "search_query": result.query,
+        "queries_sent": len(result.query),
+        "token_usage": meter.records,
+    }
 
 
 def continue_to_web_research(state: QueryGenerationState):
@@ -160,95 +509,198 @@ def continue_to_web_research(state: QueryGenerationState):
     This is used to spawn n number of web research nodes, one for each search query.
     """
     return [
-        Send("web_research", {"search_query": search_query, "id": int(idx)})
+        Send(
+            "web_research",
+            {"search_query": search_query, "id": int(idx), "research_loop": 0},
+        )
         for idx, search_query in enumerate(state["search_query"])
     ]
 
 
+@traced_node("web_research", index_key="id")
 @retry_with_exponential_backoff()
 async def web_research(state: WebSearchState, config: RunnableConfig) -> OverallState:
     """Perform web research based on the generated queries."""
     configurable = Configuration.from_runnable_config(config)
-    num_parallel_tasks = configurable.num_parallel_tasks
-    
-    async with get_semaphore(num_parallel_tasks):  # Limit parallel tasks
-        search_query = state["search_query"]
-        
-        # Create LLM instance in a thread to avoid blocking I/O
-        llm = await asyncio.to_thread(
-            ChatVertexAI,
-            model_name=configurable.query_generator_model,
-            temperature=0.6
+    search_query = state["search_query"]
+    model_spec = get_model_specs(configurable)["web_research"]
+    current_date = get_current_date()
+    meter = UsageMeter("web_research", state.get("research_loop", 0))
+
+    # Look the query up in the search cache before spending a model call
+    search_cache = None
+    response_message = None
+    if configurable.search_cache_mode != "off":
+        search_cache = await asyncio.to_thread(
+            get_search_cache,
+            configurable.search_cache_path,
+            configurable.search_cache_ttl_seconds,
+            configurable.search_cache_max_entries,
         )
-        
-        # 1. Format prompt
-        formatted_prompt = web_searcher_instructions.format(
-            current_date=get_current_date(), research_topic=search_query
+    if search_cache and configurable.search_cache_mode == "read_write":
+        response_message = await search_cache.aget(
+            search_query, model_spec.model_id, current_date
         )
-        
-        # 2. Bind tools to LLM
-        google_search_tool = {"google_search": {}}
-        llm_with_tool = llm.bind_tools([google_search_tool])
-
-        # 3. Invoke model to get text and grounding metadata
-        response_message = await llm_with_tool.ainvoke(formatted_prompt)
-        
-        # 4. Process citations using the two-step principle
-        metadata = response_message.response_metadata.get("grounding_metadata", {})
-        grounding_chunks = metadata.get("grounding_chunks", [])
-        
-        # Create temporary markers for citation
-        resolved_urls = resolve_urls(grounding_chunks, state["id"])
-        citations = get_citations(response_message, resolved_urls)
-        
-        # Insert temporary markers into the text
-        modified_text = insert_citation_markers(response_message.content, citations)
-        
-        # Prepare sources for the final replacement step
-        sources_gathered = [item for citation in citations for item in citation["segments"]]
-
-        return {
-            "sources_gathered": sources_gathered,
-            "search_query": [search_query],
-            "web_research_result": [modified_text],
-        }
+        if response_message is not None:
+            get_server_logger(config).info(
+                f"Search cache hit for query: {search_query}"
+            )
+            meter.record(model_spec.model_id, cache_hit=True, tier=model_spec.tier)
 
+    if response_message is None:
+        async with web_research_slot(configurable, config):  # Limit parallel tasks
+            # 1. Format prompt
+            formatted_prompt = web_searcher_instructions.format(
+                current_date=current_date, research_topic=search_query
+            )
+
+            # 2. Get the pooled LLM with the search tool already bound
+            llm_with_tool = await model_registry.aget(model_spec)
+
+            # 3. Invoke model to get text and grounding metadata
+            await acquire_model_quota(
+                model_spec.model_id, formatted_prompt, configurable, config
+            )
+            response_message = await meter.ainvoke(
+                llm_with_tool, formatted_prompt, model_spec.model_id, model_spec.tier
+            )
+
+        if search_cache:
+            await search_cache.aput(
+                search_query, model_spec.model_id, current_date, response_message
+            )
+
+    # 4. Process citations using the two-step principle
+    metadata = response_message.response_metadata.get("grounding_metadata", {})
+    grounding_chunks = metadata.get("grounding_chunks", [])
+
+    # Create temporary markers for citation
+    resolved_urls = resolve_urls(grounding_chunks, state["id"])
+    citations = get_citations(response_message, resolved_urls)
 
+    # Insert temporary markers into the text
+    modified_text = insert_citation_markers(response_message.content, citations)
+
+    # Prepare sources for the final replacement step
+    sources_gathered = [item for citation in citations for item in citation["segments"]]
+
+    return {
+        "sources_gathered": sources_gathered,
+        "search_query": [search_query],
+        "web_research_result": [await store_summary(modified_text, configurable)],
+        "token_usage": meter.records,
+    }
+
+
+@traced_node("reflection")
 @retry_with_exponential_backoff()
 async def reflection(state: OverallState, config: RunnableConfig) -> ReflectionState:
     """Reflect on the gathered information and decide next steps."""
     configurable = Configuration.from_runnable_config(config)
     state["research_loop_count"] = state.get("research_loop_count", 0) + 1
-    reasoning_model = state.get("reasoning_model", configurable.reflection_model)
-    
+
     # Get the user's question from the state messages
     question = get_research_topic(state["messages"])
 
-    # Create LLM instance in a thread to avoid blocking I/O
-    llm = await asyncio.to_thread(
-        ChatVertexAI,
-        model_name=reasoning_model,
-        temperature=0.6,
-        max_retries=2,
+    summaries = await load_summaries(state["web_research_result"], configurable)
+    loop = state["research_loop_count"]
+    max_research_loops = get_max_research_loops(state, configurable)
+
+    # Measure what the loop that just finished added; decide_stop_reason weighs it
+    previous_gains = state.get("loop_gains") or []
+    loop_gain = measure_loop_gain(
+        loop,
+        state.get("sources_gathered", []),
+        summaries,
+        state["search_query"],
+        previous_gains[-1] if previous_gains else None,
     )
-    
-    # Format the prompt
-    formatted_prompt = reflection_instructions.format(
-        research_topic=question,
-        summaries="\n\n---\n\n".join(state["web_research_result"]),
+    get_server_logger(config).info(f"Loop {loop} information gain: {loop_gain}")
+
+    incremental = configurable.reflection_mode == "incremental"
+    if incremental:
+        # Only send the digest plus the summaries added since the last reflection
+        new_summaries = summaries[state.get("reflected_summary_count", 0) :]
+        model_spec = get_model_specs(configurable)["reflection_incremental"]
+        formatted_prompt = incremental_reflection_instructions.format(
+            research_topic=question,
+            knowledge_digest=state.get("knowledge_digest") or "(empty)",
+            new_summaries="\n\n---\n\n".join(new_summaries),
+            digest_max_words=configurable.knowledge_digest_max_words,
+        )
+    else:
+        new_summaries = summaries
+        model_spec = get_model_specs(configurable)["reflection"]
+        formatted_prompt = reflection_instructions.format(
+            research_topic=question,
+            summaries="\n\n---\n\n".join(summaries),
+        )
+    get_server_logger(config).info(
+        f"Reflection loop {state['research_loop_count']} ({configurable.reflection_mode}): "
+        f"~{estimate_tokens(formatted_prompt)} prompt tokens, "
+        f"{len(new_summaries)} of {len(summaries)} summaries sent"
     )
-    
-    # Create structured LLM
-    structured_llm = llm.with_structured_output(Reflection)
-    result = await structured_llm.ainvoke(formatted_prompt)
 
-    return {
+    # Loop control runs on the fast tier; the frontend's reasoning model only picks the answer model
+    meter = UsageMeter("reflection", state["research_loop_count"])
+    result = await invoke_structured(
+        meter, model_spec, formatted_prompt, configurable, config
+    )
+
+    # Drop follow-up queries that repeat searches we already ran
+    follow_up_queries, skipped_queries = dedupe_queries(
+        result.follow_up_queries,
+        state["search_query"],
+        configurable.query_dedup_threshold,
+    )
+    if skipped_queries:
+        get_server_logger(config).info(
+            f"Loop {state['research_loop_count']}: skipped {len(skipped_queries)} "
+            f"near-duplicate follow-up queries: {skipped_queries}"
+        )
+
+    stop_reason = decide_stop_reason(
+        result.is_sufficient,
+        loop,
+        max_research_loops,
+        follow_up_queries,
+        loop_gain,
+        configurable.convergence_policy,
+        configurable.min_information_gain,
+    )
+    if stop_reason:
+        get_server_logger(config).info(f"Stopping after loop {loop}: {stop_reason}")
+
+    update = {
         "is_sufficient": result.is_sufficient,
         "knowledge_gap": result.knowledge_gap,
-        "follow_up_queries": result.follow_up_queries,
+        "follow_up_queries": follow_up_queries,
+        "skipped_queries": [
+            {**skipped, "loop": state["research_loop_count"]}
+            for skipped in skipped_queries
+        ],
         "research_loop_count": state["research_loop_count"],
-        "number_of_ran_queries": len(state["search_query"]),
+        # Ids of this loop's web_research Sends start after every id handed out so far;
+        # search_query cannot tell, it drops repeated queries
+        "number_of_ran_queries": state.get("queries_sent", 0),
+        "queries_sent": 0 if stop_reason else len(follow_up_queries),
+        "token_usage": meter.records,
+        "loop_gains": [loop_gain],
+        "stop_reason": stop_reason,
     }
+    if incremental:
+        update["knowledge_digest"] = result.knowledge_digest
+        update["reflected_summary_count"] = len(summaries)
+    return update
+
+
+def get_max_research_loops(state: OverallState, configurable: Configuration) -> int:
+    """Loop limit of the run: the state value when the client set one, else the configuration."""
+    return (
+        state.get("max_research_loops")
+        if state.get("max_research_loops") is not None
+        else configurable.max_research_loops
+    )
 
 
 def evaluate_research(
@@ -256,15 +708,11 @@ def evaluate_research(
     config: RunnableConfig,
 ) -> OverallState:
     """LangGraph routing function that determines the next step in the research flow.
+
+    Reflection records why research should stop in `stop_reason` (sufficient
+    information, loop limit, low information gain or no new queries).
     """
-    configurable = Configuration.from_runnable_config(config)
-    max_research_loops = (
-        state.get("max_research_loops")
-        if state.get("max_research_loops") is not None
-        else configurable.max_research_loops
-    )
-    # Use 'research_loop_count' as defined in the state
-    if state["is_sufficient"] or state.get("research_loop_count", 0) >= max_research_loops:
+    if state.get("stop_reason"):
         return "finalize_answer"
     else:
         return [
@@ -273,62 +721,221 @@ def evaluate_research(
                 {
                     "search_query": follow_up_query,
                     "id": state["number_of_ran_queries"] + int(idx),
+                    "research_loop": state["research_loop_count"],
                 },
             )
             for idx, follow_up_query in enumerate(state["follow_up_queries"])
         ]
 
 
+def exceeds_answer_budget(summaries: list[str], configurable: Configuration) -> bool:
+    """Whether the summaries are too many or too large for a single answer prompt."""
+    return (
+        len(summaries) > configurable.map_reduce_summary_threshold
+        or sum(estimate_tokens(summary) for summary in summaries)
+        > configurable.map_reduce_token_threshold
+    )
+
+
+def needs_map_reduce(summaries: list[str], configurable: Configuration) -> bool:
+    """Whether finalize_answer should condense the summaries before answering."""
+    if len(summaries) < 2 or configurable.answer_mode == "stuff":
+        return False
+    if configurable.answer_mode == "map_reduce":
+        return True
+    return exceeds_answer_budget(summaries, configurable)
+
+
+@retry_with_exponential_backoff()
+async def condense_summaries(
+    batch: list[str],
+    question: str,
+    llm,
+    model_spec: ModelSpec,
+    meter: UsageMeter,
+    configurable: Configuration,
+    config: RunnableConfig,
+) -> str:
+    """Condense a batch of summaries into one while keeping its citation markers."""
+    formatted_prompt = summary_reduce_instructions.format(
+        research_topic=question,
+        summaries="\n\n---\n\n".join(batch),
+    )
+    async with get_semaphore(configurable.num_parallel_tasks):
+        await acquire_model_quota(
+            model_spec.model_id, formatted_prompt, configurable, config
+        )
+        result = await meter.ainvoke(
+            llm, formatted_prompt, model_spec.model_id, model_spec.tier
+        )
+    condensed = result.content
+
+    # Put back any short citation urls the model dropped so the final answer can still cite them
+    kept_urls = set(find_short_urls(condensed))
+    missing_urls = list(
+        dict.fromkeys(
+            url
+            for summary in batch
+            for url in find_short_urls(summary)
+            if url not in kept_urls
+        )
+    )
+    if missing_urls:
+        condensed += "\n\nAdditional sources: " + " ".join(
+            f"[{url.rsplit('/', 1)[-1]}]({url})" for url in missing_urls
+        )
+    return condensed
+
+
+async def map_reduce_summaries(
+    summaries: list[str],
+    question: str,
+    llm,
+    model_spec: ModelSpec,
+    meter: UsageMeter,
+    configurable: Configuration,
+    config: RunnableConfig,
+) -> list[str]:
+    """Hierarchically condense summaries in parallel batches until they fit one prompt."""
+    batch_size = max(configurable.map_reduce_batch_size, 2)
+    level = 0
+    while len(summaries) > 1 and (
+        level == 0 or exceeds_answer_budget(summaries, configurable)
+    ):
+        level += 1
+        batches = [
+            summaries[i : i + batch_size] for i in range(0, len(summaries), batch_size)
+        ]
+        get_server_logger(config).info(
+            f"Map-reduce level {level}: condensing {len(summaries)} summaries in {len(batches)} batches"
+        )
+        summaries = list(
+            await asyncio.gather(
+                *(
+                    condense_summaries(
+                        batch, question, llm, model_spec, meter, configurable, config
+                    )
+                    for batch in batches
+                )
+            )
+        )
+    return summaries
+
+
+@traced_node("finalize_answer", ends_run=True)
 @retry_with_exponential_backoff()
 async def finalize_answer(state: OverallState, config: RunnableConfig):
     """Generate the final answer based on all gathered information."""
     configurable = Configuration.from_runnable_config(config)
-    reasoning_model = state.get("reasoning_model") or configurable.answer_model
-    
+
     # Get the user's question from the state messages
     question = get_research_topic(state["messages"])
 
-    # Create LLM instance in a thread to avoid blocking I/O
-    llm = await asyncio.to_thread(
-        ChatVertexAI,
-        model_name=reasoning_model,
-        temperature=0,
-        max_retries=2,
-    )
-    
+    # Get the pooled LLM for the answer model; the frontend's reasoning model overrides the strong tier
+    model_spec = get_model_specs(configurable)["finalize_answer"]
+    if reasoning_model := state.get("reasoning_model"):
+        model_spec = replace(model_spec, model_name=reasoning_model)
+    llm = await model_registry.aget(model_spec)
+
+    # Condense large result sets hierarchically before the final synthesis
+    loop = state.get("research_loop_count", 0)
+    map_reduce_meter = UsageMeter("map_reduce", loop)
+    summaries = await load_summaries(state["web_research_result"], configurable)
+    # This run's summaries were just marked as used, so they survive the expiry
+    await expire_summaries(configurable, config)
+    if needs_map_reduce(summaries, configurable):
+        summaries = await map_reduce_summaries(
+            summaries,
+            question,
+            llm,
+            model_spec,
+            map_reduce_meter,
+            configurable,
+            config,
+        )
+
     # Format the prompt with all required parameters
     formatted_prompt = answer_instructions.format(
         research_topic=question,
-        summaries="\n\n---\n\n".join(state["web_research_result"]),
-        current_date=get_current_date()
+        summaries="\n\n---\n\n".join(summaries),
+        current_date=get_current_date(),
+    )
+
+    # Stream the answer to `custom` stream mode consumers, resolving each short
+    # citation url to its original url as soon as the url is complete. The
+    # summaries cite sources as [label](short_url), so the short urls the model
+    # writes come from its input and sources_gathered knows all of them
+    writer = get_stream_writer()
+    resolver = StreamingUrlResolver(
+        {
+            short_url: source["value"]
+            for source in state.get("sources_gathered", [])
+            for short_url in (source.get("short_url"), *source.get("aliases", []))
+            if short_url
+        }
     )
+    answer_parts = []
 
-    result = await llm.ainvoke(formatted_prompt)
+    def emit(text: str) -> None:
+        if text:
+            answer_parts.append(text)
+            writer({"answer_delta": text})
+
+    meter = UsageMeter("finalize_answer", loop)
+    await acquire_model_quota(
+        model_spec.model_id, formatted_prompt, configurable, config
+    )
+    # A retried attempt starts the answer over, so tell clients to discard what they got
+    writer({"answer_start": True})
+    await meter.astream(
+        llm,
+        formatted_prompt,
+        model_spec.model_id,
+        model_spec.tier,
+        on_text=lambda chunk: emit(resolver.feed(chunk)),
+    )
+    emit(resolver.flush())
+    if resolver.unresolved:
+        get_server_logger(config).warning(
+            f"Answer cites short urls that no summary contained: {sorted(set(resolver.unresolved))}"
+        )
+    get_server_logger(config).info(f"Model client pool: {model_registry.snapshot()}")
+    token_usage = map_reduce_meter.records + meter.records
+    usage_summary = summarize_usage(
+        state.get("token_usage", []) + token_usage,
+        config.get("configurable", {}).get("thread_id"),
+    )
+    get_server_logger(config).info(
+        f"Token usage:\n{format_usage_summary(usage_summary)}\n{pformat(usage_summary)}"
+    )
+    if rate_limiter := cached_rate_limiter(configurable.rate_limit_db_path):
+        get_server_logger(config).info(f"Rate limiter: {rate_limiter.snapshot()}")
+    get_server_logger(config).info(
+        f"Structured output: {structured_output_stats.snapshot()}"
+    )
 
     # The model provides the main text. Now, we append the sources list.
-    final_text = result.content
-    
-    # De-duplicate the sources and format them for the final output
-    unique_sources = []
-    if sources := state.get("sources_gathered"):
-        seen_urls = set()
-        for source in sources:
-            # Check for URL and that we haven't seen it before
-            if source.get("url") and source["url"] not in seen_urls:
-                unique_sources.append(source)
-                seen_urls.add(source["url"])
+    final_text = "".join(answer_parts)
+
+    # Sources are de-duplicated by URL when they are merged into the state
+    unique_sources = [
+        source for source in state.get("sources_gathered", []) if source.get("value")
+    ]
 
     # Create the final list of sources in the format "number - url"
     if unique_sources:
         # Re-number sources to ensure a clean 1, 2, 3... list
         sources_list = "\n\n**Источники:**\n" + "\n".join(
-            f'{i+1} - {source["url"]}' for i, source in enumerate(unique_sources)
+            f"{i + 1} - {source['value']}" for i, source in enumerate(unique_sources)
         )
         final_text += sources_list
+        writer({"answer_delta": sources_list})
 
     return {
         "messages": [AIMessage(content=final_text)],
         "sources_gathered": unique_sources,
+        "token_usage": token_usage,
+        "usage_summary": usage_summary,
     }
 
 
@@ -357,3 +964,11 @@ builder.add_conditional_edges(
 builder.add_edge("finalize_answer", END)
 
 graph = builder.compile(name="pro-search-agent")
+
+# Opt-in: warm the model client pool for the default configuration so the first run
+# does not pay for client construction and credential lookups
+_startup_configuration = Configuration.from_runnable_config()
+if _startup_configuration.warm_model_clients:
+    model_registry.warm_up_in_background(
+        get_model_specs(_startup_configuration).values()
+    )
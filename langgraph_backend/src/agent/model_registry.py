@@ -0,0 +1,225 @@
+"""Pooled chat model clients shared by every run in the process."""
+
+import asyncio
+import atexit
+import json
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Iterable, Type
+
+from langchain_google_vertexai import ChatVertexAI
+from pydantic import BaseModel
+
+from agent.fake_backend import FakeChatModel
+
+
+@dataclass
+class RegistryStats:
+    """Counters describing how well the client pool is being reused."""
+
+    hits: int = 0
+    misses: int = 0
+    builds: int = 0
+    build_time: float = 0.0
+
+    def as_dict(self) -> dict:
+        """Return the counters as a plain dict."""
+        return asdict(self)
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    """Everything that makes two model clients interchangeable.
+
+    Attributes:
+        model_name: Name of the Vertex AI model.
+        temperature: Sampling temperature.
+        max_retries: LLM-level retry count, `None` keeps the library default.
+        tools: Tools bound to the client, e.g. `[{"google_search": {}}]`.
+        schema: Pydantic model used for structured output. The runnable returns
+            `{"raw", "parsed", "parsing_error"}` so token usage stays readable.
+        backend: 'vertexai' or 'fake' (the offline stand-in in `agent.fake_backend`).
+        backend_options: Extra constructor arguments for the backend, as sorted items.
+        tier: Routing tier ('fast' or 'strong') usage is reported under; not part
+            of the client key, so tiers using the same model share its client.
+    """
+
+    model_name: str
+    temperature: float = 0.6
+    max_retries: int | None = None
+    tools: tuple | None = None
+    schema: Type[BaseModel] | None = None
+    backend: str = "vertexai"
+    backend_options: tuple = ()
+    tier: str | None = None
+
+    @property
+    def model_id(self) -> str:
+        """Name used for caches and rate limits, so fake models never share them with real ones."""
+        if self.backend == "vertexai":
+            return self.model_name
+        return f"{self.backend}:{self.model_name}"
+
+    @property
+    def base_key(self) -> tuple:
+        """Return the key of the base client, shared by every binding of the model."""
+        return (
+            self.backend,
+            self.backend_options,
+            self.model_name,
+            self.temperature,
+            self.max_retries,
+        )
+
+    @property
+    def key(self) -> tuple:
+        """Return the key of the bound runnable: the base key plus tools and schema."""
+        tools_key = json.dumps(list(self.tools), sort_keys=True) if self.tools else None
+        return (*self.base_key, tools_key, self.schema)
+
+
+class ModelClientRegistry:
+    """Process-wide pool of chat model clients.
+
+    Base clients are keyed by (model, temperature, max_retries) so every tool or
+    structured-output binding of the same model shares one underlying client and
+    its HTTP/gRPC connections. Bound runnables are cached on top of that.
+    """
+
+    def __init__(self):
+        """Create an empty pool."""
+        self._base_clients: dict[tuple, Any] = {}
+        self._runnables: dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+        self._build_locks: dict[tuple, threading.Lock] = {}
+        self.stats = RegistryStats()
+
+    def _build_lock(self, key: tuple) -> threading.Lock:
+        with self._lock:
+            return self._build_locks.setdefault(key, threading.Lock())
+
+    def _create_base_client(self, spec: ModelSpec) -> Any:
+        kwargs = {"model_name": spec.model_name, "temperature": spec.temperature}
+        if spec.backend == "fake":
+            return FakeChatModel(**kwargs, **dict(spec.backend_options))
+        if spec.backend != "vertexai":
+            raise ValueError(f"Unknown model backend: {spec.backend}")
+        if spec.max_retries is not None:
+            kwargs["max_retries"] = spec.max_retries
+        return ChatVertexAI(**kwargs)
+
+    def _get_base_client(self, spec: ModelSpec) -> Any:
+        client = self._base_clients.get(spec.base_key)
+        if client is not None:
+            return client
+        with self._build_lock(spec.base_key):
+            client = self._base_clients.get(spec.base_key)
+            if client is None:
+                start = time.perf_counter()
+                client = self._create_base_client(spec)
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self._base_clients[spec.base_key] = client
+                    self.stats.builds += 1
+                    self.stats.build_time += elapsed
+        return client
+
+    def _build(self, spec: ModelSpec) -> Any:
+        with self._build_lock(spec.key):
+            runnable = self._runnables.get(spec.key)
+            if runnable is not None:
+                return runnable
+            runnable = self._get_base_client(spec)
+            if spec.tools:
+                runnable = runnable.bind_tools(list(spec.tools))
+            if spec.schema is not None:
+                runnable = runnable.with_structured_output(
+                    spec.schema, include_raw=True
+                )
+            with self._lock:
+                self._runnables[spec.key] = runnable
+            return runnable
+
+    def get(self, spec: ModelSpec) -> Any:
+        """Return the pooled runnable for `spec`, building it on first use.
+
+        Building may read credentials from disk, so call this from a worker
+        thread (or use `aget`) when inside the event loop.
+        """
+        runnable = self._runnables.get(spec.key)
+        if runnable is not None:
+            with self._lock:
+                self.stats.hits += 1
+            return runnable
+        with self._lock:
+            self.stats.misses += 1
+        return self._build(spec)
+
+    async def aget(self, spec: ModelSpec) -> Any:
+        """Async variant of `get` that only leaves the event loop on a miss."""
+        runnable = self._runnables.get(spec.key)
+        if runnable is not None:
+            with self._lock:
+                self.stats.hits += 1
+            return runnable
+        with self._lock:
+            self.stats.misses += 1
+        # Create the client in a thread to avoid blocking I/O on the event loop
+        return await asyncio.to_thread(self._build, spec)
+
+    def warm_up(
+        self, specs: Iterable[ModelSpec], stop: threading.Event | None = None
+    ) -> None:
+        """Build the given clients ahead of the first request.
+
+        Args:
+            specs: Clients to build.
+            stop: When set, no further clients are built.
+        """
+        for spec in specs:
+            if stop is not None and stop.is_set():
+                return
+            try:
+                self._build(spec)
+            except Exception as e:
+                logging.getLogger(__name__).warning(
+                    f"Could not warm model client {spec.model_name}: {e}"
+                )
+
+    def warm_up_in_background(self, specs: Iterable[ModelSpec]) -> threading.Thread:
+        """Warm clients on a daemon thread so module import is not delayed.
+
+        At interpreter exit the thread is told to stop and joined, so a client that
+        is still being built finishes before the runtime is torn down instead of
+        aborting the process.
+        """
+        stop = threading.Event()
+        thread = threading.Thread(
+            target=self.warm_up,
+            args=(list(specs), stop),
+            name="model-client-warmup",
+            daemon=True,
+        )
+        thread.start()
+
+        def _stop_warm_up() -> None:
+            stop.set()
+            thread.join()
+
+        atexit.register(_stop_warm_up)
+        return thread
+
+    def snapshot(self) -> dict:
+        """Return the current counters together with the pool size."""
+        with self._lock:
+            return {
+                **self.stats.as_dict(),
+                "base_clients": len(self._base_clients),
+                "runnables": len(self._runnables),
+            }
+
+
+# Shared by every node of every run in this process
+model_registry = ModelClientRegistry()
@@ -0,0 +1,35 @@
+"""Routing of graph nodes to the fast and strong model tiers."""
+
+from agent.configuration import Configuration
+
+FAST = "fast"
+STRONG = "strong"
+
+# Query generation, search summarization and loop control run on the fast tier;
+# only the final synthesis needs the strong model
+NODE_TIERS = {
+    "generate_query": FAST,
+    "web_research": FAST,
+    "reflection": FAST,
+    "finalize_answer": STRONG,
+}
+
+# Per-node settings that override the tier model when set
+NODE_MODEL_OVERRIDES = {
+    "generate_query": "query_generator_model",
+    "web_research": "search_model",
+    "reflection": "reflection_model",
+    "finalize_answer": "answer_model",
+}
+
+
+def tier_model(configurable: Configuration, tier: str) -> str:
+    """Model name of a routing tier."""
+    return configurable.strong_model if tier == STRONG else configurable.fast_model
+
+
+def node_model(configurable: Configuration, node: str) -> tuple[str, str]:
+    """Return the model name and tier a node's calls are routed to."""
+    tier = NODE_TIERS[node]
+    override = getattr(configurable, NODE_MODEL_OVERRIDES[node])
+    return override or tier_model(configurable, tier), tier
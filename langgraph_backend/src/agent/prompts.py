@@ -79,6 +79,45 @@ Summaries:
 {summaries}
 """
 
+incremental_reflection_instructions = """You are an expert research assistant analyzing research about "{research_topic}".
+
+You receive a compressed knowledge digest of everything learned so far and the summaries added since the digest was last updated.
+
+Instructions:
+- Merge the new summaries into the knowledge digest. Keep every fact, figure, date and name that matters for the research topic, drop repetition, and keep the citation markers (e.g. [3](https://vertexaisearch.cloud.google.com/id/7-2)) exactly as written and attached to the facts they support.
+- Keep the updated digest under {digest_max_words} words.
+- Identify knowledge gaps or areas that need deeper exploration and generate a follow-up query. (1 or multiple).
+- If the digest is sufficient to answer the user's question, don't generate a follow-up query.
+- Focus on technical details, implementation specifics, or emerging trends that weren't fully covered.
+
+Requirements:
+- Ensure the follow-up query is self-contained and includes necessary context for web search.
+
+Output Format:
+- Format your response as a JSON object with these exact keys:
+   - "knowledge_digest": The updated knowledge digest
+   - "is_sufficient": true or false
+   - "knowledge_gap": Describe what information is missing or needs clarification
+   - "follow_up_queries": Write a specific question to address this gap
+
+Knowledge Digest:
+{knowledge_digest}
+
+New Summaries:
+{new_summaries}
+"""
+
+summary_reduce_instructions = """Condense the following research summaries about "{research_topic}" into a single consolidated summary.
+
+Instructions:
+- Keep every fact, figure, date and name that is relevant to the research topic. Merge repeated information instead of listing it twice.
+- Keep every citation marker exactly as written (e.g. [3](https://vertexaisearch.cloud.google.com/id/1-0)) and attached to the facts it supports. Never invent, renumber or shorten a citation marker.
+- Only use the information in the summaries, don't add anything new.
+- Write the consolidated summary directly, without an introduction.
+
+Summaries:
+{summaries}"""
+
 answer_instructions = """Generate a high-quality answer to the user's question based on the provided summaries.
 
 Instructions:
@@ -0,0 +1,96 @@
+"""Detection of near-duplicate search queries."""
+
+import math
+from collections import Counter
+from typing import Iterable, List, Tuple
+
+from agent.search_cache import normalize_query
+
+
+def char_ngrams(text: str, n: int = 3) -> Counter:
+    """Return the character n-gram counts of a normalized query."""
+    text = f" {normalize_query(text)} "
+    if len(text) <= n:
+        return Counter([text])
+    return Counter(text[i : i + n] for i in range(len(text) - n + 1))
+
+
+def cosine_similarity(a: Counter, b: Counter) -> float:
+    """Cosine similarity of two sparse n-gram vectors."""
+    if not a or not b:
+        return 0.0
+    if len(a) > len(b):
+        a, b = b, a
+    dot = sum(count * b[gram] for gram, count in a.items() if gram in b)
+    norm = math.sqrt(sum(c * c for c in a.values())) * math.sqrt(
+        sum(c * c for c in b.values())
+    )
+    return dot / norm if norm else 0.0
+
+
+class QueryIndex:
+    """Small in-memory similarity index over character n-gram vectors.
+
+    Runs locally with no network access. Queries are compared by cosine
+    similarity, which catches reordered words, punctuation changes and small
+    rephrasings of the same search.
+    """
+
+    def __init__(self, queries: Iterable[str] = (), ngram_size: int = 3):
+        """Index `queries`, comparing n-grams of `ngram_size` characters."""
+        self.ngram_size = ngram_size
+        self._entries: List[Tuple[str, Counter]] = []
+        for query in queries:
+            self.add(query)
+
+    def add(self, query: str) -> None:
+        """Add a query to the index."""
+        self._entries.append((query, char_ngrams(query, self.ngram_size)))
+
+    def most_similar(self, query: str) -> Tuple[str | None, float]:
+        """Return the closest indexed query and its similarity score."""
+        vector = char_ngrams(query, self.ngram_size)
+        best_query, best_score = None, 0.0
+        for candidate, candidate_vector in self._entries:
+            score = cosine_similarity(vector, candidate_vector)
+            if score > best_score:
+                best_query, best_score = candidate, score
+        return best_query, best_score
+
+
+def dedupe_queries(
+    candidates: Iterable[str],
+    history: Iterable[str],
+    threshold: float,
+    ngram_size: int = 3,
+) -> Tuple[List[str], List[dict]]:
+    """Drop candidate queries that are near-duplicates of earlier ones.
+
+    Each candidate is compared against the queries already run and against the
+    candidates kept before it.
+
+    Args:
+        candidates: Newly proposed queries, in order.
+        history: Queries that have already been searched.
+        threshold: Similarity at or above which a candidate is skipped.
+        ngram_size: Character n-gram length used for the vectors.
+
+    Returns:
+        The kept queries and one record per skipped query with the query it
+        matched and the similarity score.
+    """
+    index = QueryIndex(history, ngram_size=ngram_size)
+    kept, skipped = [], []
+    for query in candidates:
+        if not normalize_query(query):
+            continue
+        match, score = index.most_similar(query)
+        # Identical queries can score a rounding error below 1.0
+        if match is not None and score >= threshold - 1e-9:
+            skipped.append(
+                {"query": query, "matched": match, "similarity": round(score, 3)}
+            )
+            continue
+        kept.append(query)
+        index.add(query)
+    return kept, skipped
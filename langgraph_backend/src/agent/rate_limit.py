@@ -0,0 +1,163 @@
+"""Shared per-model request and token rate limits for model calls."""
+
+import asyncio
+import os
+import random
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+DEFAULT_RATE_LIMIT_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "..", ".cache", "rate_limits.sqlite3"
+)
+
+# Upper bound for one sleep so waiters re-check the shared buckets regularly
+MAX_POLL_INTERVAL = 5.0
+
+
+class TokenBucketRateLimiter:
+    """Per-model request-per-minute and token-per-minute buckets.
+
+    Bucket levels live in a SQLite file and are updated inside `BEGIN IMMEDIATE`
+    transactions, so the limit holds across event loops, threads and worker
+    processes that point at the same file. Waiting happens with
+    `asyncio.sleep`, never on the event loop thread.
+    """
+
+    def __init__(self, path: str):
+        """Open the bucket store at `path` and create its table if needed."""
+        self.path = os.path.abspath(path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            self.path, check_same_thread=False, timeout=30, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS buckets (
+                model TEXT PRIMARY KEY,
+                requests REAL NOT NULL,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._queue_depth: dict[str, int] = defaultdict(int)
+        self._stats: dict[str, dict] = defaultdict(
+            lambda: {"acquired": 0, "waited": 0, "total_wait": 0.0, "max_wait": 0.0}
+        )
+
+    def try_acquire(self, model: str, tokens: int, rpm: int, tpm: int) -> float:
+        """Take one request and `tokens` tokens from the model's buckets.
+
+        Returns:
+            0 if the quota was taken, otherwise the number of seconds until
+            enough quota should be available.
+        """
+        # A single prompt larger than the whole minute budget can never fit, so cap it
+        tokens = min(tokens, tpm)
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT requests, tokens, updated_at FROM buckets WHERE model = ?",
+                    (model,),
+                ).fetchone()
+                if row is None:
+                    requests_left, tokens_left = float(rpm), float(tpm)
+                else:
+                    elapsed = max(now - row[2], 0.0)
+                    requests_left = min(rpm, row[0] + elapsed * rpm / 60)
+                    tokens_left = min(tpm, row[1] + elapsed * tpm / 60)
+
+                if requests_left >= 1 and tokens_left >= tokens:
+                    requests_left -= 1
+                    tokens_left -= tokens
+                    wait = 0.0
+                else:
+                    wait = max(
+                        (1 - requests_left) * 60 / rpm,
+                        (tokens - tokens_left) * 60 / tpm,
+                    )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO buckets (model, requests, tokens, updated_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (model, requests_left, tokens_left, now),
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return wait
+
+    async def acquire(self, model: str, tokens: int, rpm: int, tpm: int) -> float:
+        """Wait until the model has quota for one request of `tokens` tokens.
+
+        Returns:
+            The number of seconds spent waiting.
+        """
+        if rpm <= 0 or tpm <= 0:
+            return 0.0
+        start = time.monotonic()
+        self._queue_depth[model] += 1
+        try:
+            while True:
+                wait = await asyncio.to_thread(
+                    self.try_acquire, model, tokens, rpm, tpm
+                )
+                if wait <= 0:
+                    break
+                # Jitter keeps waiters from waking up in lockstep
+                await asyncio.sleep(
+                    min(wait, MAX_POLL_INTERVAL) + random.uniform(0, 0.1)
+                )
+        finally:
+            self._queue_depth[model] -= 1
+        waited = time.monotonic() - start
+        stats = self._stats[model]
+        stats["acquired"] += 1
+        if waited > 0.01:
+            stats["waited"] += 1
+        stats["total_wait"] += waited
+        stats["max_wait"] = max(stats["max_wait"], waited)
+        return waited
+
+    def queue_depth(self, model: str | None = None) -> int:
+        """Return the number of calls in this process currently waiting for quota."""
+        if model is not None:
+            return self._queue_depth[model]
+        return sum(self._queue_depth.values())
+
+    def snapshot(self) -> dict:
+        """Per-model queue depth and wait statistics for this process."""
+        return {
+            model: {**stats, "queue_depth": self._queue_depth[model]}
+            for model, stats in self._stats.items()
+        }
+
+
+_rate_limiters: dict[str, TokenBucketRateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def cached_rate_limiter(path: str) -> TokenBucketRateLimiter | None:
+    """Return the rate limiter already created for `path`, without touching the file system."""
+    return _rate_limiters.get(path)
+
+
+def get_rate_limiter(path: str) -> TokenBucketRateLimiter:
+    """Get or create the process-wide rate limiter backed by `path`.
+
+    The limiter is registered under `path` as given as well as its absolute
+    form, so later calls resolve it with `cached_rate_limiter`.
+    """
+    with _rate_limiters_lock:
+        if path not in _rate_limiters:
+            abs_path = os.path.abspath(path)
+            if abs_path not in _rate_limiters:
+                _rate_limiters[abs_path] = TokenBucketRateLimiter(abs_path)
+            _rate_limiters[path] = _rate_limiters[abs_path]
+        return _rate_limiters[path]
@@ -0,0 +1,138 @@
+"""Per-run server debug logs written from a background thread."""
+
+import atexit
+import logging
+import os
+import queue
+import threading
+from collections import OrderedDict
+from logging.handlers import QueueHandler, QueueListener
+
+from langchain_core.runnables import RunnableConfig
+
+# Default path in case something goes wrong, though it shouldn't be used
+DEFAULT_SERVER_LOG_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "default_server_debug.log"
+)
+
+SERVER_LOG_FORMAT = "%(asctime)s - SERVER - %(levelname)s - %(message)s"
+
+DEFAULT_MAX_OPEN_FILES = 32
+
+
+class RunLogRouter(logging.Handler):
+    """Writes every record to the file of its run, keeping a bounded set of files open.
+
+    Runs only on the queue listener's thread. The least recently used file is
+    closed when the cap is reached; a run that logs again reopens it in append
+    mode. A record with `run_log_close` set closes the file of its run.
+    """
+
+    def __init__(self, max_open: int = DEFAULT_MAX_OPEN_FILES):
+        """Create a router keeping at most `max_open` files open."""
+        super().__init__()
+        self.max_open = max_open
+        self._handlers: OrderedDict[str, logging.FileHandler] = OrderedDict()
+        self._formatter = logging.Formatter(SERVER_LOG_FORMAT)
+
+    def _handler_for(self, path: str) -> logging.FileHandler:
+        if path in self._handlers:
+            self._handlers.move_to_end(path)
+            return self._handlers[path]
+        while len(self._handlers) >= max(self.max_open, 1):
+            _, evicted = self._handlers.popitem(last=False)
+            evicted.close()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handler = logging.FileHandler(path, encoding="utf-8")
+        handler.setFormatter(self._formatter)
+        self._handlers[path] = handler
+        return handler
+
+    def emit(self, record: logging.LogRecord) -> None:
+        """Write the record to its run's file, or close that file for a close record."""
+        path = getattr(record, "run_log_path", None)
+        if path is None:
+            return
+        if getattr(record, "run_log_close", False):
+            if (handler := self._handlers.pop(path, None)) is not None:
+                handler.close()
+            return
+        self._handler_for(path).handle(record)
+
+    @property
+    def open_files(self) -> int:
+        """Return the number of run log files currently open."""
+        return len(self._handlers)
+
+    def close(self) -> None:
+        """Close every open run log file."""
+        while self._handlers:
+            self._handlers.popitem()[1].close()
+        super().close()
+
+
+# All run logs share one logger and one queue; the file is chosen per record, so
+# no logger or handler object is created per run
+_logger = logging.getLogger("agent.run_log")
+_logger.setLevel(logging.INFO)
+_logger.propagate = False
+_router: RunLogRouter | None = None
+_listener: QueueListener | None = None
+_start_lock = threading.Lock()
+_max_open = DEFAULT_MAX_OPEN_FILES
+
+
+def _ensure_started() -> RunLogRouter:
+    global _router, _listener
+    with _start_lock:
+        if _listener is None:
+            log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+            _router = RunLogRouter(_max_open)
+            _listener = QueueListener(log_queue, _router)
+            _listener.start()
+            _logger.addHandler(QueueHandler(log_queue))
+            atexit.register(stop_run_logging)
+        return _router
+
+
+def set_max_open_run_logs(max_open: int) -> None:
+    """Cap the number of run log files kept open at the same time."""
+    global _max_open
+    _max_open = max_open
+    if _router is not None:
+        _router.max_open = max_open
+
+
+def stop_run_logging() -> None:
+    """Write out the queued records and close every run log."""
+    global _router, _listener
+    with _start_lock:
+        if _listener is not None:
+            _listener.stop()
+            _router.close()
+            _logger.handlers.clear()
+            _router, _listener = None, None
+
+
+def server_log_path(config: RunnableConfig) -> str:
+    """Return the absolute path of the run's server debug log."""
+    return os.path.abspath(
+        config.get("configurable", {}).get("server_log_path", DEFAULT_SERVER_LOG_PATH)
+    )
+
+
+def get_server_logger(config: RunnableConfig) -> logging.LoggerAdapter:
+    """Logger writing to the run's `server_log_path` without blocking the event loop.
+
+    Records are put on a queue and written by a background thread.
+    """
+    _ensure_started()
+    return logging.LoggerAdapter(_logger, {"run_log_path": server_log_path(config)})
+
+
+def close_server_log(config: RunnableConfig) -> None:
+    """Close the run's log file once the records logged before have been written."""
+    if _listener is not None:
+        _logger.info(
+            "", extra={"run_log_path": server_log_path(config), "run_log_close": True}
+        )
@@ -0,0 +1,181 @@
+"""On-disk cache of grounded web search responses."""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from dataclasses import asdict, dataclass
+
+from langchain_core.messages import AIMessage
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "..", ".cache", "search_cache.sqlite3"
+)
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a search query so trivially different spellings share a cache key."""
+    query = unicodedata.normalize("NFKC", query).casefold()
+    query = re.sub(r"\s+", " ", query)
+    return query.strip(" \t\n\"'.,;:!?")
+
+
+def make_cache_key(query: str, model: str, date_bucket: str) -> str:
+    """Build the cache key from the normalized query, the model and the date bucket."""
+    raw = "\x1f".join([normalize_query(query), model, date_bucket])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class SearchCacheStats:
+    """Counters of the search cache in this process."""
+
+    hits: int = 0
+    misses: int = 0
+    expired: int = 0
+    writes: int = 0
+    evictions: int = 0
+
+    def as_dict(self) -> dict:
+        """Return the counters as a plain dict."""
+        return asdict(self)
+
+
+class SearchCache:
+    """On-disk cache of grounded search responses with a TTL and LRU eviction.
+
+    Entries hold the raw model text together with its grounding metadata, so a
+    hit can be pushed through the regular citation pipeline and gets citation
+    markers and `sources_gathered` segments for the id of the current query.
+    The store is a SQLite file in WAL mode and can be shared by several
+    server processes.
+    """
+
+    def __init__(self, path: str, ttl_seconds: int, max_entries: int):
+        """Open the cache at `path` and create its table if needed."""
+        self.path = os.path.abspath(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.stats = SearchCacheStats()
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS search_results (
+                key TEXT PRIMARY KEY,
+                query TEXT NOT NULL,
+                model TEXT NOT NULL,
+                date_bucket TEXT NOT NULL,
+                content TEXT NOT NULL,
+                grounding_metadata TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_search_results_last_access "
+            "ON search_results (last_access)"
+        )
+        self._conn.commit()
+
+    def get(self, query: str, model: str, date_bucket: str) -> AIMessage | None:
+        """Return the cached response for the query, or `None` on a miss."""
+        key = make_cache_key(query, model, date_bucket)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, grounding_metadata, created_at "
+                "FROM search_results WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                self.stats.misses += 1
+                return None
+            content, grounding_metadata, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM search_results WHERE key = ?", (key,))
+                self._conn.commit()
+                self.stats.expired += 1
+                self.stats.misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE search_results SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.stats.hits += 1
+        return AIMessage(
+            content=content,
+            response_metadata={"grounding_metadata": json.loads(grounding_metadata)},
+        )
+
+    def put(self, query: str, model: str, date_bucket: str, message: AIMessage) -> None:
+        """Store a grounded response and evict the least recently used overflow."""
+        if not isinstance(message.content, str):
+            return
+        grounding_metadata = message.response_metadata.get("grounding_metadata", {})
+        key = make_cache_key(query, model, date_bucket)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_results "
+                "(key, query, model, date_bucket, content, grounding_metadata, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    query,
+                    model,
+                    date_bucket,
+                    message.content,
+                    json.dumps(grounding_metadata, default=str),
+                    now,
+                    now,
+                ),
+            )
+            self._conn.execute(
+                "DELETE FROM search_results WHERE created_at < ?",
+                (now - self.ttl_seconds,),
+            )
+            overflow = (
+                self._conn.execute("SELECT COUNT(*) FROM search_results").fetchone()[0]
+                - self.max_entries
+            )
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM search_results WHERE key IN ("
+                    "SELECT key FROM search_results ORDER BY last_access ASC LIMIT ?)",
+                    (overflow,),
+                )
+                self.stats.evictions += overflow
+            self._conn.commit()
+            self.stats.writes += 1
+
+    async def aget(self, query: str, model: str, date_bucket: str) -> AIMessage | None:
+        """Async version of `get`, run in a worker thread."""
+        return await asyncio.to_thread(self.get, query, model, date_bucket)
+
+    async def aput(
+        self, query: str, model: str, date_bucket: str, message: AIMessage
+    ) -> None:
+        """Async version of `put`, run in a worker thread."""
+        await asyncio.to_thread(self.put, query, model, date_bucket, message)
+
+
+_search_caches: dict[tuple, SearchCache] = {}
+_search_caches_lock = threading.Lock()
+
+
+def get_search_cache(path: str, ttl_seconds: int, max_entries: int) -> SearchCache:
+    """Get or create the process-wide cache for the given settings."""
+    key = (os.path.abspath(path), ttl_seconds, max_entries)
+    with _search_caches_lock:
+        if key not in _search_caches:
+            _search_caches[key] = SearchCache(path, ttl_seconds, max_entries)
+        return _search_caches[key]
@@ -1,31 +1,73 @@
 from __future__ import annotations
 
+import operator
 from dataclasses import dataclass, field
 from typing import TypedDict
 
 from langgraph.graph import add_messages
 from typing_extensions import Annotated
 
-import operator
+
+def add_unique(left: list, right: list) -> list:
+    """Append the items of `right` that `left` does not contain yet, keeping order."""
+    seen = set(left)
+    merged = list(left)
+    for item in right:
+        if item not in seen:
+            seen.add(item)
+            merged.append(item)
+    return merged
+
+
+def merge_sources(left: list, right: list) -> list:
+    """Keep one source segment per URL; later short urls of a URL become its `aliases`."""
+    merged = list(left)
+    index = {source.get("value"): i for i, source in enumerate(merged)}
+    for source in right:
+        url = source.get("value")
+        if url not in index:
+            index[url] = len(merged)
+            merged.append(source)
+            continue
+        kept = merged[index[url]]
+        aliases = kept.get("aliases", [])
+        if source.get("short_url") not in (kept.get("short_url"), *aliases):
+            merged[index[url]] = {
+                **kept,
+                "aliases": [*aliases, source.get("short_url")],
+            }
+    return merged
 
 
 class OverallState(TypedDict):
     messages: Annotated[list, add_messages]
-    search_query: Annotated[list, operator.add]
-    web_research_result: Annotated[list, operator.add]
-    sources_gathered: Annotated[list, operator.add]
+    search_query: Annotated[list, add_unique]
+    # Number of web_research Sends issued so far, the source of their unique ids
+    queries_sent: Annotated[int, operator.add]
+    # Summary references into agent.summary_store (or the summaries themselves in inline mode)
+    web_research_result: Annotated[list, add_unique]
+    sources_gathered: Annotated[list, merge_sources]
+    skipped_queries: Annotated[list, operator.add]
+    token_usage: Annotated[list, operator.add]
+    usage_summary: dict
+    loop_gains: Annotated[list, operator.add]
+    stop_reason: str
     initial_search_query_count: int
     max_research_loops: int
     research_loop_count: int
     reasoning_model: str
+    knowledge_digest: str
+    reflected_summary_count: int
 
 
 class ReflectionState(TypedDict):
     is_sufficient: bool
     knowledge_gap: str
-    follow_up_queries: Annotated[list, operator.add]
+    follow_up_queries: list
     research_loop_count: int
     number_of_ran_queries: int
+    queries_sent: int
+    stop_reason: str
 
 
 class Query(TypedDict):
@@ -40,6 +82,7 @@ class QueryGenerationState(TypedDict):
 class WebSearchState(TypedDict):
     search_query: str
     id: str
+    research_loop: int
 
 
 @dataclass(kw_only=True)
@@ -0,0 +1,255 @@
+"""Lenient parsing, local repair and re-asking of structured model output."""
+
+import json
+import re
+import threading
+from dataclasses import asdict, dataclass
+from typing import Any, Type
+
+from pydantic import BaseModel, ValidationError, create_model
+
+_FENCED_BLOCK = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+_PYTHON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+class StructuredOutputError(ValueError):
+    """The model response could not be turned into the requested schema."""
+
+
+@dataclass
+class StructuredOutputStats:
+    """Outcome counters of the structured-output calls of one schema."""
+
+    calls: int = 0
+    parsed: int = 0
+    repaired: int = 0
+    reasked: int = 0
+    escalated: int = 0
+    failed: int = 0
+
+    def as_dict(self) -> dict:
+        """Return the counters as a plain dict, plus the failure, re-ask and escalation rates."""
+        stats = asdict(self)
+        stats["failure_rate"] = (
+            round(self.failed / self.calls, 4) if self.calls else 0.0
+        )
+        stats["reask_rate"] = round(self.reasked / self.calls, 4) if self.calls else 0.0
+        stats["escalation_rate"] = (
+            round(self.escalated / self.calls, 4) if self.calls else 0.0
+        )
+        return stats
+
+
+class StructuredOutputTracker:
+    """Process-wide counters of how structured-output calls ended, per schema.
+
+    'parsed': the library parsed the response; 'repaired': it did not, but the
+    local repair did; 'reasked': fields were missing and a follow-up call filled
+    them; 'escalated': the strong tier had to repeat the call; 'failed': nothing
+    worked and the node raised.
+    """
+
+    def __init__(self):
+        """Create a tracker with no recorded calls."""
+        self._stats: dict[str, StructuredOutputStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, schema_name: str, outcome: str) -> None:
+        """Count one call of `schema_name` that ended with `outcome`."""
+        with self._lock:
+            stats = self._stats.setdefault(schema_name, StructuredOutputStats())
+            stats.calls += 1
+            setattr(stats, outcome, getattr(stats, outcome) + 1)
+
+    def snapshot(self) -> dict:
+        """Return the counters and rates of every schema."""
+        with self._lock:
+            return {name: stats.as_dict() for name, stats in self._stats.items()}
+
+
+structured_output_stats = StructuredOutputTracker()
+
+
+def _clean_json(text: str) -> str:
+    """Drop comments, trailing commas and Python literals outside of JSON strings.
+
+    Also closes brackets left open by a truncated response.
+    """
+    out, stack = [], []
+    i, in_string = 0, False
+    while i < len(text):
+        char = text[i]
+        if in_string:
+            out.append(char)
+            if char == "\\" and i + 1 < len(text):
+                out.append(text[i + 1])
+                i += 1
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+            out.append(char)
+        elif text.startswith("//", i):
+            i = text.find("\n", i)
+            if i == -1:
+                break
+            continue
+        elif text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = len(text) if end == -1 else end + 2
+            continue
+        elif char == ",":
+            rest = text[i + 1 :].lstrip()
+            # A comment may sit between the comma and the closing bracket
+            while rest.startswith("//"):
+                rest = rest[rest.find("\n") + 1 :].lstrip() if "\n" in rest else ""
+            if not rest or rest[0] not in "}]":
+                out.append(char)
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+            out.append(char)
+        elif char in "}]":
+            if stack:
+                stack.pop()
+            out.append(char)
+        elif char.isalpha():
+            word = re.match(r"[A-Za-z]+", text[i:]).group(0)
+            out.append(_PYTHON_LITERALS.get(word, word))
+            i += len(word)
+            continue
+        else:
+            out.append(char)
+        i += 1
+    if in_string:
+        out.append('"')
+    return "".join(out).rstrip().rstrip(",") + "".join(reversed(stack))
+
+
+def loads_lenient(text: str) -> Any:
+    """Parse JSON the way models tend to write it, or return None.
+
+    Accepts markdown fences, prose around the object, `//` and `/* */` comments,
+    trailing commas, Python `True`/`False`/`None` and a truncated tail.
+    """
+    if not text or not text.strip():
+        return None
+    candidates = [block for block in _FENCED_BLOCK.findall(text)] + [text]
+    for candidate in candidates:
+        try:
+            return json.loads(candidate)
+        except ValueError:
+            pass
+        start = candidate.find("{")
+        if start == -1:
+            continue
+        try:
+            return json.loads(_clean_json(candidate[start:]))
+        except ValueError:
+            # Prose after the object: cut at the last closing brace and retry
+            end = candidate.rfind("}")
+            if end > start:
+                try:
+                    return json.loads(_clean_json(candidate[start : end + 1]))
+                except ValueError:
+                    pass
+    return None
+
+
+def _message_text(message: Any) -> str:
+    content = getattr(message, "content", "")
+    if isinstance(content, list):
+        return "".join(
+            part.get("text", "") if isinstance(part, dict) else str(part)
+            for part in content
+        )
+    return content or ""
+
+
+def raw_arguments(message: Any) -> dict | None:
+    """Return the structured answer a model gave, wherever it put it, as a dict."""
+    for call in getattr(message, "tool_calls", None) or []:
+        if isinstance(call.get("args"), dict):
+            return call["args"]
+    for call in getattr(message, "invalid_tool_calls", None) or []:
+        if isinstance(parsed := loads_lenient(call.get("args") or ""), dict):
+            return parsed
+    parsed = loads_lenient(_message_text(message))
+    return parsed if isinstance(parsed, dict) else None
+
+
+def validate_partial(
+    schema: Type[BaseModel], data: dict
+) -> tuple[BaseModel | None, dict, list]:
+    """Validate `data` field by field.
+
+    Returns:
+        The validated object (or None), the fields that are valid on their own
+        and the names of the fields that are missing or invalid.
+    """
+    fields = {name: data[name] for name in schema.model_fields if name in data}
+    for name, value in fields.items():
+        # A single query where a list of queries is expected
+        if (
+            isinstance(value, str)
+            and getattr(schema.model_fields[name].annotation, "__origin__", None)
+            is list
+        ):
+            fields[name] = [value]
+    try:
+        return schema.model_validate(fields), fields, []
+    except ValidationError as e:
+        invalid = {error["loc"][0] for error in e.errors() if error["loc"]}
+    valid = {name: value for name, value in fields.items() if name not in invalid}
+    return None, valid, [name for name in schema.model_fields if name not in valid]
+
+
+def recover_structured_output(
+    result: dict, schema: Type[BaseModel]
+) -> tuple[BaseModel | None, dict, list, str]:
+    """Get the parsed object out of an `include_raw=True` result, repairing it if needed.
+
+    Returns:
+        The object (or None), the valid fields, the missing field names and
+        the outcome: 'parsed' or 'repaired' when an object was recovered.
+    """
+    if result.get("parsing_error") is None and result.get("parsed") is not None:
+        return result["parsed"], {}, [], "parsed"
+    data = raw_arguments(result.get("raw")) or {}
+    parsed, valid, missing = validate_partial(schema, data)
+    return parsed, valid, missing, "repaired"
+
+
+_missing_field_schemas: dict[tuple, Type[BaseModel]] = {}
+_missing_field_schemas_lock = threading.Lock()
+
+
+def missing_fields_schema(schema: Type[BaseModel], fields: list) -> Type[BaseModel]:
+    """Return a schema with only `fields` of `schema`, cached so model clients can be pooled per schema."""
+    key = (schema, tuple(fields))
+    with _missing_field_schemas_lock:
+        if key not in _missing_field_schemas:
+            _missing_field_schemas[key] = create_model(
+                f"{schema.__name__}MissingFields",
+                __doc__=schema.__doc__,
+                **{
+                    name: (
+                        schema.model_fields[name].annotation,
+                        schema.model_fields[name],
+                    )
+                    for name in fields
+                },
+            )
+        return _missing_field_schemas[key]
+
+
+def reask_prompt(prompt: str, valid: dict, missing: list) -> str:
+    """Follow-up prompt asking only for the missing fields.
+
+    It starts with the original prompt so the provider's prefix cache can
+    serve that part, and only the missing fields have to be generated.
+    """
+    return (
+        f"{prompt}\n\n"
+        f"Part of your answer is already known:\n{json.dumps(valid, ensure_ascii=False, indent=2)}\n\n"
+        f"Return only the missing fields: {', '.join(missing)}."
+    )
@@ -0,0 +1,282 @@
+"""Side store that keeps research summaries out of the graph state."""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Iterable
+
+DEFAULT_SUMMARY_STORE_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "..", ".cache", "summaries.sqlite3"
+)
+
+SUMMARY_REF_PREFIX = "summary:sha256:"
+SUMMARY_REF_PATTERN = re.compile(rb"summary:sha256:[0-9a-f]{64}")
+
+# Automatic expiry runs at most this often per store and process
+EXPIRE_INTERVAL_SECONDS = 3600
+
+
+def summary_ref(text: str) -> str:
+    """Content address of a summary, as stored in `web_research_result`."""
+    return SUMMARY_REF_PREFIX + hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def is_summary_ref(item) -> bool:
+    """Return whether a `web_research_result` item is a reference into the store."""
+    return isinstance(item, str) and item.startswith(SUMMARY_REF_PREFIX)
+
+
+def find_summary_refs(data: bytes) -> set[str]:
+    """Return the references that occur anywhere in serialized data, e.g. a checkpoint blob."""
+    return {match.decode("ascii") for match in SUMMARY_REF_PATTERN.findall(data)}
+
+
+class SummaryStore:
+    """Content-addressed side store for web research summaries.
+
+    The graph state only keeps the short reference returned by `put`, so the
+    checkpoint written after every super-step stays small no matter how long
+    the summaries are. Identical summaries share one row. The store is a SQLite
+    file in WAL mode and can be shared by several server processes.
+
+    Storing or loading a summary marks it as used; `gc` deletes the summaries
+    that have not been used for a given time, except the ones retained
+    checkpoints still reference.
+    """
+
+    def __init__(self, path: str):
+        """Open the store at `path` and create its table if needed."""
+        self.path = os.path.abspath(path)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS summaries (
+                ref TEXT PRIMARY KEY,
+                content TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                used_at REAL NOT NULL DEFAULT 0
+            )
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(summaries)")}
+        if "used_at" not in columns:
+            self._conn.execute(
+                "ALTER TABLE summaries ADD COLUMN used_at REAL NOT NULL DEFAULT 0"
+            )
+            self._conn.execute("UPDATE summaries SET used_at = created_at")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS summaries_used_at ON summaries (used_at)"
+        )
+        self._conn.commit()
+        self._last_expired_at = 0.0
+
+    def put(self, text: str) -> str:
+        """Store a summary and return its reference."""
+        ref = summary_ref(text)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO summaries (ref, content, created_at, used_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (ref) DO UPDATE SET used_at = excluded.used_at",
+                (ref, text, now, now),
+            )
+            self._conn.commit()
+        return ref
+
+    def load(self, items: Iterable[str]) -> list[str]:
+        """Resolve references to their summaries; plain text items are returned unchanged.
+
+        Raises:
+            KeyError: A reference is missing from the store.
+        """
+        items = list(items)
+        refs = list({item for item in items if is_summary_ref(item)})
+        contents = {}
+        now = time.time()
+        with self._lock:
+            # Stay well below SQLite's limit on bound parameters
+            for start in range(0, len(refs), 500):
+                batch = refs[start : start + 500]
+                placeholders = ",".join("?" * len(batch))
+                contents.update(
+                    self._conn.execute(
+                        f"SELECT ref, content FROM summaries WHERE ref IN ({placeholders})",
+                        batch,
+                    ).fetchall()
+                )
+                self._conn.execute(
+                    f"UPDATE summaries SET used_at = ? WHERE ref IN ({placeholders})",
+                    [now, *batch],
+                )
+            self._conn.commit()
+        missing = [ref for ref in refs if ref not in contents]
+        if missing:
+            raise KeyError(f"Summaries missing from {self.path}: {missing}")
+        return [contents[item] if is_summary_ref(item) else item for item in items]
+
+    def gc(
+        self, max_age_seconds: float, vacuum: bool = False, keep: Iterable[str] = ()
+    ) -> dict:
+        """Delete the summaries not stored or loaded within the last `max_age_seconds`.
+
+        Args:
+            max_age_seconds: Keep summaries used more recently than this.
+            vacuum: Shrink the database file afterwards.
+            keep: References that must survive regardless of their age, i.e.
+                every reference a retained checkpoint holds
+                (`BlobCheckpointSaver.summary_refs`). A thread resumed after its
+                summaries were deleted cannot load them any more.
+        """
+        with self._lock:
+            self._conn.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS kept_refs (ref TEXT PRIMARY KEY)"
+            )
+            self._conn.execute("DELETE FROM kept_refs")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO kept_refs VALUES (?)", [(ref,) for ref in keep]
+            )
+            deleted = self._conn.execute(
+                "DELETE FROM summaries WHERE used_at < ? "
+                "AND ref NOT IN (SELECT ref FROM kept_refs)",
+                (time.time() - max_age_seconds,),
+            ).rowcount
+            self._conn.execute("DELETE FROM kept_refs")
+            self._conn.commit()
+            if vacuum:
+                self._conn.execute("VACUUM")
+        return {"summaries": deleted}
+
+    def expire_due(self, max_age_seconds: float) -> bool:
+        """Return whether `expire` would run `gc` now."""
+        return (
+            max_age_seconds > 0
+            and time.time() - self._last_expired_at >= EXPIRE_INTERVAL_SECONDS
+        )
+
+    def expire(self, max_age_seconds: float, keep: Iterable[str] = ()) -> dict:
+        """Run `gc` if it did not run in this process within `EXPIRE_INTERVAL_SECONDS`."""
+        if not self.expire_due(max_age_seconds):
+            return {}
+        self._last_expired_at = time.time()
+        return self.gc(max_age_seconds, keep=keep)
+
+    def stats(self) -> dict:
+        """Return the number of summaries, their size and the age of the least recently used one."""
+        with self._lock:
+            count, content_bytes, oldest = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(content)), 0), MIN(used_at) FROM summaries"
+            ).fetchone()
+        return {
+            "path": self.path,
+            "file_bytes": sum(
+                os.path.getsize(file)
+                for file in (self.path, self.path + "-wal")
+                if os.path.exists(file)
+            ),
+            "summaries": count,
+            "content_bytes": content_bytes,
+            "oldest_use_age_seconds": round(time.time() - oldest, 1)
+            if oldest
+            else None,
+        }
+
+    async def aput(self, text: str) -> str:
+        """Async version of `put`, run in a worker thread."""
+        return await asyncio.to_thread(self.put, text)
+
+    async def aload(self, items: Iterable[str]) -> list[str]:
+        """Async version of `load`, run in a worker thread."""
+        return await asyncio.to_thread(self.load, list(items))
+
+    async def aexpire(self, max_age_seconds: float, keep: Iterable[str] = ()) -> dict:
+        """Async version of `expire`, run in a worker thread."""
+        return await asyncio.to_thread(self.expire, max_age_seconds, keep)
+
+
+_summary_stores: dict[str, SummaryStore] = {}
+_summary_stores_lock = threading.Lock()
+
+
+def get_summary_store(path: str) -> SummaryStore:
+    """Get or create the process-wide summary store backed by `path`."""
+    path = os.path.abspath(path)
+    with _summary_stores_lock:
+        if path not in _summary_stores:
+            _summary_stores[path] = SummaryStore(path)
+        return _summary_stores[path]
+
+
+def main():
+    """Inspect or clean up the summary store from the command line."""
+    parser = argparse.ArgumentParser(
+        description="Inspect and clean up the summary side store"
+    )
+    parser.add_argument(
+        "--path",
+        default=os.getenv("SUMMARY_STORE_PATH", DEFAULT_SUMMARY_STORE_PATH),
+        help="SQLite file of the store",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats", help="Show the size of the store")
+    gc_parser = commands.add_parser(
+        "gc", help="Delete summaries that were not used recently"
+    )
+    gc_parser.add_argument(
+        "--max-age-hours",
+        type=float,
+        default=24 * 7,
+        help="Keep summaries used within this many hours",
+    )
+    gc_parser.add_argument(
+        "--vacuum", action="store_true", help="Shrink the file afterwards"
+    )
+    gc_parser.add_argument(
+        "--checkpoint-store",
+        default=os.getenv("CHECKPOINT_STORE_PATH"),
+        help="Checkpoint store whose references are kept (default: the checkpoint store's default path)",
+    )
+    gc_parser.add_argument(
+        "--no-checkpoints",
+        action="store_true",
+        help="No retained checkpoint references the store, so delete by age alone",
+    )
+    args = parser.parse_args()
+
+    store = SummaryStore(args.path)
+    if args.command == "stats":
+        print(json.dumps(store.stats(), indent=2))  # noqa: T201
+        return
+    # Imported here because the checkpoint store imports this module
+    from agent.checkpoint_store import (
+        DEFAULT_CHECKPOINT_STORE_PATH,
+        BlobCheckpointSaver,
+    )
+
+    keep = set()
+    if not args.no_checkpoints:
+        checkpoint_store = args.checkpoint_store or DEFAULT_CHECKPOINT_STORE_PATH
+        if not os.path.exists(checkpoint_store):
+            parser.error(
+                f"No checkpoint store at {checkpoint_store}: pass the one that "
+                "references the summaries (--checkpoint-store), or --no-checkpoints"
+            )
+        keep = BlobCheckpointSaver(checkpoint_store).summary_refs()
+    print(  # noqa: T201
+        json.dumps(
+            store.gc(args.max_age_hours * 3600, vacuum=args.vacuum, keep=keep),
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
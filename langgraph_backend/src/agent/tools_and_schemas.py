@@ -1,4 +1,5 @@
 from typing import List
+
 from pydantic import BaseModel, Field
 
 
@@ -21,3 +22,9 @@ class Reflection(BaseModel):
     follow_up_queries: List[str] = Field(
         description="A list of follow-up queries to address the knowledge gap."
     )
+
+
+class IncrementalReflection(Reflection):
+    knowledge_digest: str = Field(
+        description="The rolling knowledge digest updated with the new summaries."
+    )
@@ -0,0 +1,280 @@
+"""Lightweight tracing of graph runs, nodes and model calls as OTLP-shaped JSON spans."""
+
+import hashlib
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+
+@dataclass
+class Span:
+    """One timed operation of a run: the run itself, a node, a retry attempt or a model call."""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None = None
+    exporter: Optional["JsonlSpanExporter"] = field(default=None, repr=False)
+    start_time: float = field(default_factory=time.time)
+    end_time: float | None = None
+    attributes: dict = field(default_factory=dict)
+    events: list = field(default_factory=list)
+    status: str = "OK"
+    error: str | None = None
+
+    def set(self, **attributes) -> None:
+        """Set or overwrite attributes of the span."""
+        self.attributes.update(attributes)
+
+    def add(self, key: str, value: float) -> None:
+        """Accumulate a numeric attribute, e.g. the total wait over several calls."""
+        self.attributes[key] = round(self.attributes.get(key, 0) + value, 6)
+
+    def add_event(self, name: str, **attributes) -> None:
+        """Record a timestamped event, e.g. a retry, on the span."""
+        self.events.append(
+            {"name": name, "time": time.time(), "attributes": attributes}
+        )
+
+    def to_dict(self) -> dict:
+        """Serialize with OTLP/JSON field names so the file can be converted or replayed."""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_id or "",
+            "name": self.name,
+            "startTimeUnixNano": int(self.start_time * 1e9),
+            "endTimeUnixNano": int((self.end_time or time.time()) * 1e9),
+            "durationMs": round(
+                ((self.end_time or time.time()) - self.start_time) * 1000, 3
+            ),
+            "attributes": self.attributes,
+            "events": [
+                {
+                    "name": event["name"],
+                    "timeUnixNano": int(event["time"] * 1e9),
+                    "attributes": event["attributes"],
+                }
+                for event in self.events
+            ],
+            "status": {"code": self.status, "message": self.error or ""},
+        }
+
+
+class JsonlSpanExporter:
+    """Appends finished spans to a JSON-lines file from a background thread.
+
+    Exporting only puts the span on a queue, so nodes never wait for disk I/O.
+    """
+
+    def __init__(self, path: str):
+        """Start the writer thread appending to `path`."""
+        self.path = os.path.abspath(path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._queue: queue.Queue[dict] = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._write_loop, name="span-exporter", daemon=True
+        )
+        self._thread.start()
+
+    def export(self, span: Span) -> None:
+        """Queue a finished span for writing."""
+        self._queue.put(span.to_dict())
+
+    def _write_loop(self) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                item = self._queue.get()
+                try:
+                    f.write(json.dumps(item, ensure_ascii=False, default=str) + "\n")
+                    if self._queue.empty():
+                        f.flush()
+                finally:
+                    self._queue.task_done()
+
+    def flush(self) -> None:
+        """Block until every exported span has been written."""
+        self._queue.join()
+
+
+_exporters: dict[str, JsonlSpanExporter] = {}
+_exporters_lock = threading.Lock()
+
+
+def get_span_exporter(path: str) -> JsonlSpanExporter:
+    """Get or create the process-wide span exporter writing to `path`."""
+    path = os.path.abspath(path)
+    with _exporters_lock:
+        if path not in _exporters:
+            _exporters[path] = JsonlSpanExporter(path)
+        return _exporters[path]
+
+
+# Spans nest through the context, which asyncio copies into every task it creates
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Span | None:
+    """Return the span of the running node or model call, if any."""
+    return _current_span.get()
+
+
+@contextmanager
+def start_span(
+    name: str,
+    exporter: JsonlSpanExporter | None = None,
+    trace_id: str | None = None,
+    parent_id: str | None = None,
+    **attributes,
+) -> Iterator[Span]:
+    """Open a span as a child of the current one (or of `parent_id`) and export it on exit."""
+    parent = _current_span.get()
+    if parent is not None:
+        trace_id = trace_id or parent.trace_id
+        parent_id = parent_id or parent.span_id
+        exporter = exporter or parent.exporter
+    span = Span(
+        name=name,
+        trace_id=trace_id or secrets.token_hex(16),
+        span_id=secrets.token_hex(8),
+        parent_id=parent_id,
+        exporter=exporter,
+        attributes=attributes,
+    )
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        span.status = "ERROR"
+        span.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        span.end_time = time.time()
+        if exporter is not None:
+            exporter.export(span)
+
+
+# The run span is opened by the first node of a run and closed by the last one.
+# Nodes of one run execute as separate tasks, so it is tracked by run key instead
+# of through the context.
+@dataclass
+class _Run:
+    span: Span
+    active_nodes: int = 0
+    error: BaseException | None = None
+
+
+# Runs that never reach their terminal node (interrupted, or failed outside of a
+# node) are closed once this many newer runs are open
+MAX_OPEN_RUNS = 1000
+
+_runs: "OrderedDict[str, _Run]" = OrderedDict()
+_runs_lock = threading.Lock()
+
+
+def _get_run(
+    run_key: str, exporter: JsonlSpanExporter | None, attributes: dict
+) -> tuple[_Run, list[_Run]]:
+    """Get or open a run; the caller holds `_runs_lock` and exports the evicted runs."""
+    evicted = []
+    if run_key not in _runs:
+        while len(_runs) >= MAX_OPEN_RUNS:
+            evicted.append(_runs.popitem(last=False)[1])
+        digest = hashlib.sha256(f"{run_key}-{time.time_ns()}".encode()).hexdigest()
+        _runs[run_key] = _Run(
+            Span(
+                name="run",
+                trace_id=digest[:32],
+                span_id=digest[32:48],
+                exporter=exporter,
+                attributes={"run_key": run_key, **attributes},
+            )
+        )
+    return _runs[run_key], evicted
+
+
+def _finish(span: Span, error: BaseException | None = None, **attributes) -> Span:
+    span.set(**attributes)
+    if error is not None:
+        span.status = "ERROR"
+        span.error = f"{type(error).__name__}: {error}"
+    span.end_time = time.time()
+    if span.exporter is not None:
+        span.exporter.export(span)
+    return span
+
+
+def _export_evicted(evicted: list[_Run]) -> None:
+    for run in evicted:
+        _finish(
+            run.span,
+            run.error or RuntimeError("run did not finish"),
+            evicted=True,
+        )
+
+
+def run_span(
+    run_key: str, exporter: JsonlSpanExporter | None = None, **attributes
+) -> Span:
+    """Get or open the span of the run identified by `run_key`."""
+    with _runs_lock:
+        run, evicted = _get_run(run_key, exporter, attributes)
+    _export_evicted(evicted)
+    return run.span
+
+
+def enter_run(
+    run_key: str, exporter: JsonlSpanExporter | None = None, **attributes
+) -> Span:
+    """Open (or join) the span of a run for a node that starts; pair with `exit_run`."""
+    with _runs_lock:
+        run, evicted = _get_run(run_key, exporter, attributes)
+        run.active_nodes += 1
+    _export_evicted(evicted)
+    return run.span
+
+
+def exit_run(
+    run_key: str, error: BaseException | None = None, ends_run: bool = False
+) -> Span | None:
+    """Record that a node of the run finished and close the run span once the run is over.
+
+    The run is over when its terminal node (`ends_run`) finished, or when a node
+    failed and no other node of the run is still active. A failing node fails
+    the whole graph run, which cancels the other nodes; they exit through here
+    too, so the run span outlives every one of them.
+
+    Returns:
+        The closed run span, or `None` while the run goes on.
+    """
+    with _runs_lock:
+        run = _runs.get(run_key)
+        if run is None:
+            return None
+        run.active_nodes -= 1
+        if error is not None and run.error is None:
+            run.error = error
+        if not ends_run and (run.error is None or run.active_nodes > 0):
+            return None
+        del _runs[run_key]
+    return _finish(run.span, run.error)
+
+
+def end_run_span(
+    run_key: str, error: BaseException | None = None, **attributes
+) -> Span | None:
+    """Close and export the span of a finished (or failed) run."""
+    with _runs_lock:
+        run = _runs.pop(run_key, None)
+    if run is None:
+        return None
+    return _finish(run.span, error or run.error, **attributes)
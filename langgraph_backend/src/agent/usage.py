@@ -0,0 +1,218 @@
+"""Token usage, latency and cost accounting of model calls."""
+
+import time
+from typing import Any, Callable, Iterable
+
+from agent.tracing import current_span, start_span
+
+USAGE_FIELDS = (
+    "input_tokens",
+    "output_tokens",
+    "reasoning_tokens",
+    "cached_tokens",
+    "total_tokens",
+)
+
+# List prices in USD per million tokens as (input, cached input, output); only
+# used to estimate the cost of a run, models not listed count as free.
+# Keep in sync with MODEL_PRICES in app/usage.py; the unit tests of both
+# stacks fail when the two tables differ.
+MODEL_PRICES = {
+    "gemini-2.5-pro": (1.25, 0.31, 10.0),
+    "gemini-2.5-flash": (0.30, 0.075, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.025, 0.40),
+}
+
+
+def estimate_cost(model_id: str, usage: dict) -> float:
+    """Estimated USD cost of one call; fake models are priced like the model they stand in for.
+
+    Cached prompt tokens are billed at the cached price, the rest of the prompt
+    at the input price, and thinking tokens like output tokens (Vertex AI counts
+    them apart from `output_tokens`). The ADK stack prices its calls the same way.
+    """
+    prices = MODEL_PRICES.get(model_id.rsplit(":", 1)[-1])
+    if prices is None:
+        return 0.0
+    input_price, cached_price, output_price = prices
+    cached = usage.get("cached_tokens", 0)
+    return (
+        (usage.get("input_tokens", 0) - cached) * input_price
+        + cached * cached_price
+        + (usage.get("output_tokens", 0) + usage.get("reasoning_tokens", 0))
+        * output_price
+    ) / 1_000_000
+
+
+def usage_from_message(message: Any) -> dict:
+    """Read the token counts of a model response, zero where the backend reports nothing."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    input_details = usage.get("input_token_details") or {}
+    output_details = usage.get("output_token_details") or {}
+    # Older langchain-google-vertexai releases only keep the thinking and cache
+    # counts in the raw Vertex AI usage metadata
+    response_metadata = getattr(message, "response_metadata", None) or {}
+    vertex_usage = response_metadata.get("usage_metadata") or {}
+    input_tokens = usage.get("input_tokens", 0)
+    output_tokens = usage.get("output_tokens", 0)
+    return {
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "reasoning_tokens": output_details.get("reasoning")
+        or vertex_usage.get("thoughts_token_count", 0),
+        "cached_tokens": input_details.get("cache_read")
+        or vertex_usage.get("cached_content_token_count", 0),
+        "total_tokens": usage.get("total_tokens", input_tokens + output_tokens),
+    }
+
+
+class UsageMeter:
+    """Records token usage and latency of the model calls made by one node execution.
+
+    Structured-output runnables must be built with `include_raw=True` so the raw
+    message, and with it `usage_metadata`, is still available.
+    """
+
+    def __init__(self, node: str, loop: int = 0):
+        """Start an empty meter for `node` in research loop `loop`."""
+        self.node = node
+        self.loop = loop
+        self.records: list[dict] = []
+
+    def record(
+        self,
+        model_id: str,
+        message: Any = None,
+        latency: float = 0.0,
+        cache_hit: bool = False,
+        tier: str | None = None,
+    ) -> dict:
+        """Record the usage of one model response and return the record."""
+        usage = usage_from_message(message)
+        record = {
+            "node": self.node,
+            "loop": self.loop,
+            "model": model_id,
+            "tier": tier,
+            "latency": round(latency, 3),
+            "cache_hit": cache_hit,
+            "cost_usd": estimate_cost(model_id, usage),
+            **usage,
+        }
+        self.records.append(record)
+        # Annotate the enclosing model call (or, for cache hits, node attempt) span
+        if (span := current_span()) is not None:
+            span.set(
+                cache_hit=cache_hit,
+                **{field: record[field] for field in USAGE_FIELDS},
+            )
+        return record
+
+    async def ainvoke(
+        self, runnable: Any, prompt: Any, model_id: str, tier: str | None = None
+    ) -> Any:
+        """Invoke `runnable` and record the usage of its response."""
+        with start_span("model_call", model=model_id, node=self.node, tier=tier):
+            start = time.perf_counter()
+            result = await runnable.ainvoke(prompt)
+            message = (
+                result["raw"]
+                if isinstance(result, dict) and "raw" in result
+                else result
+            )
+            self.record(model_id, message, time.perf_counter() - start, tier=tier)
+        return result
+
+    async def astream(
+        self,
+        runnable: Any,
+        prompt: Any,
+        model_id: str,
+        tier: str | None = None,
+        on_text: Callable[[str], None] | None = None,
+    ) -> Any:
+        """Stream `runnable`, pass every text chunk to `on_text` and record the whole response.
+
+        Returns:
+            The aggregated message chunk.
+        """
+        with start_span(
+            "model_call", model=model_id, node=self.node, tier=tier, streaming=True
+        ) as span:
+            start = time.perf_counter()
+            message = None
+            async for chunk in runnable.astream(prompt):
+                if message is None:
+                    span.set(time_to_first_token=round(time.perf_counter() - start, 3))
+                    message = chunk
+                else:
+                    message = message + chunk
+                if (
+                    on_text is not None
+                    and isinstance(chunk.content, str)
+                    and chunk.content
+                ):
+                    on_text(chunk.content)
+            self.record(model_id, message, time.perf_counter() - start, tier=tier)
+        return message
+
+
+def _empty_totals() -> dict:
+    return {
+        "calls": 0,
+        "cache_hits": 0,
+        "latency": 0.0,
+        "cost_usd": 0.0,
+        **dict.fromkeys(USAGE_FIELDS, 0),
+    }
+
+
+def _add(totals: dict, record: dict) -> None:
+    totals["calls"] += 1
+    totals["cache_hits"] += int(record.get("cache_hit", False))
+    totals["latency"] = round(totals["latency"] + record.get("latency", 0.0), 3)
+    totals["cost_usd"] = round(totals["cost_usd"] + record.get("cost_usd", 0.0), 6)
+    for field in USAGE_FIELDS:
+        totals[field] += record.get(field, 0)
+
+
+def summarize_usage(records: Iterable[dict], thread_id: str | None = None) -> dict:
+    """Aggregate usage records in total and per node, research loop, model and routing tier."""
+    summary = {
+        "thread_id": thread_id,
+        "total": _empty_totals(),
+        "by_node": {},
+        "by_loop": {},
+        "by_model": {},
+        "by_tier": {},
+    }
+    for record in records:
+        _add(summary["total"], record)
+        for group, key in (
+            ("by_node", record["node"]),
+            ("by_loop", str(record["loop"])),
+            ("by_model", record["model"]),
+            ("by_tier", record.get("tier") or "untiered"),
+        ):
+            _add(summary[group].setdefault(key, _empty_totals()), record)
+    return summary
+
+
+def format_usage_summary(summary: dict) -> str:
+    """Render a usage summary as a short plain-text table, one line per node and tier."""
+    lines = []
+    for name, totals in [
+        ("total", summary["total"]),
+        *sorted(summary["by_node"].items()),
+        *(
+            (f"tier:{tier}", totals)
+            for tier, totals in sorted(summary.get("by_tier", {}).items())
+        ),
+    ]:
+        lines.append(
+            f"{name:<16} calls={totals['calls']:<4} in={totals['input_tokens']:<8} "
+            f"out={totals['output_tokens']:<7} thinking={totals['reasoning_tokens']:<7} "
+            f"cached={totals['cached_tokens']:<7} latency={totals['latency']:.1f}s "
+            f"cost=${totals.get('cost_usd', 0.0):.4f}"
+        )
+    return "\n".join(lines)
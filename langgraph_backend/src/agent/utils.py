@@ -1,5 +1,7 @@
+import re
 from typing import Any, Dict, List
-from langchain_core.messages import AnyMessage, AIMessage, HumanMessage
+
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage
 
 
 def get_research_topic(messages: List[AnyMessage]) -> str:
@@ -19,12 +21,86 @@ def get_research_topic(messages: List[AnyMessage]) -> str:
     return research_topic
 
 
+def estimate_tokens(text: str) -> int:
+    """
+    Roughly estimate the number of tokens in a text (about 4 characters per token).
+    """
+    return (len(text) + 3) // 4
+
+
+SHORT_URL_PREFIX = "https://vertexaisearch.cloud.google.com/id/"
+_SHORT_URL_RE = re.compile(re.escape(SHORT_URL_PREFIX) + r"[\w-]+")
+
+
+def find_short_urls(text: str) -> List[str]:
+    """Return the short citation urls created by `resolve_urls` that appear in a text, in order."""
+    return _SHORT_URL_RE.findall(text)
+
+
+class StreamingUrlResolver:
+    """Replace short citation urls with their original urls in a stream of text chunks.
+
+    Text that may be the start of a short url is held back until a later chunk (or
+    `flush`) shows where the url ends, so every piece returned by `feed` is final.
+    Short urls missing from `urls` were not in the model's input; they are left
+    as they are and collected in `unresolved`.
+    """
+
+    def __init__(self, urls: Dict[str, str]):
+        """Resolve with `urls`, a map of short urls to original urls."""
+        self.urls = urls
+        self.resolved: List[str] = []
+        self.unresolved: List[str] = []
+        self._buffer = ""
+
+    def _hold_index(self) -> int:
+        buffer = self._buffer
+        start = buffer.rfind(SHORT_URL_PREFIX)
+        if start != -1:
+            # A complete prefix whose id runs to the end of the buffer may still grow
+            match = _SHORT_URL_RE.match(buffer, start)
+            if match is None or match.end() == len(buffer):
+                return start
+        # A suffix that may still grow into the prefix
+        index = buffer.find(
+            SHORT_URL_PREFIX[0], max(0, len(buffer) - len(SHORT_URL_PREFIX) + 1)
+        )
+        while index != -1:
+            if SHORT_URL_PREFIX.startswith(buffer[index:]):
+                return index
+            index = buffer.find(SHORT_URL_PREFIX[0], index + 1)
+        return len(buffer)
+
+    def _resolve(self, text: str) -> str:
+        def replace(match: re.Match) -> str:
+            short_url = match.group(0)
+            if short_url not in self.urls:
+                self.unresolved.append(short_url)
+                return short_url
+            self.resolved.append(short_url)
+            return self.urls[short_url]
+
+        return _SHORT_URL_RE.sub(replace, text)
+
+    def feed(self, chunk: str) -> str:
+        """Add a chunk and return the text that is now safe to emit."""
+        self._buffer += chunk
+        hold = self._hold_index()
+        ready, self._buffer = self._buffer[:hold], self._buffer[hold:]
+        return self._resolve(ready)
+
+    def flush(self) -> str:
+        """Return whatever is still held back at the end of the stream."""
+        ready, self._buffer = self._buffer, ""
+        return self._resolve(ready)
+
+
 def resolve_urls(urls_to_resolve: List[Any], id: int) -> Dict[str, str]:
     """
     Create a map of the vertex ai search urls (very long) to a short url with a unique id for each url.
     Ensures each original URL gets a consistent shortened form while maintaining uniqueness.
     """
-    prefix = f"https://vertexaisearch.cloud.google.com/id/"
+    prefix = SHORT_URL_PREFIX
     urls = [site.get("web", {}).get("uri") for site in urls_to_resolve]
 
     # Create a dictionary that maps each unique URL to its first occurrence index
@@ -37,25 +113,40 @@ def resolve_urls(urls_to_resolve: List[Any], id: int) -> Dict[str, str]:
 
 
 def insert_citation_markers(text, citations_list):
+    """Insert citation markers into a text string based on start and end indices.
+
+    Each marker is a markdown link from the label to the segment's short url, e.g.
+    `[3](https://vertexaisearch.cloud.google.com/id/7-2)`. Labels are only numbered
+    within one search, so the short url is what identifies the source downstream.
+
+    The text is built in a single pass from a list of pieces. Markers that share an
+    end index are ordered by start index, and for identical positions the later
+    citation comes first. End indices past the end of the text are clamped to it.
     """
-    Inserts citation markers into a text string based on start and end indices.
-    """
-    sorted_citations = sorted(
-        citations_list, key=lambda c: (c["end_index"], c["start_index"]), reverse=True
+    ordered_citations = sorted(
+        enumerate(citations_list),
+        key=lambda item: (item[1]["end_index"], item[1]["start_index"], -item[0]),
     )
 
-    modified_text = text
-    for citation_info in sorted_citations:
-        end_idx = citation_info["end_index"]
-        marker_to_insert = ""
+    pieces = []
+    cursor = 0
+    text_length = len(text)
+    for _, citation_info in ordered_citations:
+        end_idx = min(max(citation_info["end_index"], 0), text_length)
+        if end_idx > cursor:
+            pieces.append(text[cursor:end_idx])
+            cursor = end_idx
         for segment in citation_info["segments"]:
-            marker_to_insert += f" [{segment['label']}]"
-        # Insert the citation marker at the original end_idx position
-        modified_text = (
-            modified_text[:end_idx] + marker_to_insert + modified_text[end_idx:]
-        )
+            pieces.append(f" [{segment['label']}]({segment['short_url']})")
+    pieces.append(text[cursor:])
+
+    return "".join(pieces)
+
 
-    return modified_text
+def get_citation_labels(resolved_urls_map: Dict[str, str]) -> Dict[str, str]:
+    """Map every resolved url to its citation label, numbered from the end of the map."""
+    total = len(resolved_urls_map)
+    return {uri: str(total - idx) for idx, uri in enumerate(resolved_urls_map)}
 
 
 def get_citations(response_message: AIMessage, resolved_urls_map: Dict[str, str]):
@@ -66,10 +157,13 @@ def get_citations(response_message: AIMessage, resolved_urls_map: Dict[str, str]
     metadata = response_message.response_metadata.get("grounding_metadata", {})
     grounding_chunks = metadata.get("grounding_chunks", [])
     grounding_supports = metadata.get("grounding_supports", [])
-    
+
     if not grounding_supports:
         return citations
 
+    # Look labels up in a precomputed index instead of searching the url list per segment
+    labels = get_citation_labels(resolved_urls_map)
+
     for support in grounding_supports:
         citation = {}
         segment = support.get("segment", {})
@@ -93,10 +187,10 @@ def get_citations(response_message: AIMessage, resolved_urls_map: Dict[str, str]
                 if resolved_url:
                     citation["segments"].append(
                         {
-                            "label": str(len(resolved_urls_map) - list(resolved_urls_map.keys()).index(uri)),
+                            "label": labels[uri],
                             "short_url": resolved_url,
                             "value": uri,
-                            "title": title
+                            "title": title,
                         }
                     )
             except (IndexError, AttributeError, KeyError):
@@ -0,0 +1,19 @@
+import pytest
+
+
+@pytest.fixture
+def offline_config(tmp_path):
+    """Run configuration for the graph on the fake model backend, with every file under `tmp_path`."""
+    return {
+        "recursion_limit": 200,
+        "configurable": {
+            "thread_id": "test",
+            "model_backend": "fake",
+            "fake_model_latency_seconds": 0,
+            "fake_model_sufficient_after": 100,
+            "search_cache_mode": "off",
+            "server_log_path": str(tmp_path / "server.log"),
+            "summary_store_path": str(tmp_path / "summaries.sqlite3"),
+            "rate_limit_db_path": str(tmp_path / "rate_limits.sqlite3"),
+        },
+    }
@@ -0,0 +1,217 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parents[2] / "examples"))
+
+from batch_research import (  # noqa: E402
+    BatchManifest,
+    build_report,
+    load_topics,
+    run_topic,
+)
+from cli_research import EventLogOptions  # noqa: E402
+
+
+class StubClient:
+    """A `langgraph_sdk` client that answers every run at once, failing the queries in `failures`."""
+
+    def __init__(self, failures=()):
+        self.failures = list(failures)
+        self.queries = []
+        self.threads = SimpleNamespace(create=self.create, get_state=self.get_state)
+        self.runs = SimpleNamespace(stream=self.stream)
+
+    async def create(self):
+        return {"thread_id": f"thread-{len(self.queries)}"}
+
+    async def stream(self, thread_id, assistant_id, input, stream_mode, config):
+        query = input["messages"][0][1]
+        self.queries.append(query)
+        if query in self.failures:
+            self.failures.remove(query)
+            raise ConnectionError("server went away")
+        yield SimpleNamespace(event="custom", data={"answer_start": True})
+        yield SimpleNamespace(event="custom", data={"answer_delta": f"About {query}"})
+
+    async def get_state(self, thread_id):
+        return {
+            "values": {
+                "messages": [{"type": "ai", "content": "answer"}],
+                "research_loop_count": 1,
+                "stop_reason": "sufficient",
+            }
+        }
+
+
+def topic(query, initial_queries=3, max_loops=2):
+    return {"query": query, "initial_queries": initial_queries, "max_loops": max_loops}
+
+
+def run(client, manifest, topics, output_path, retries=0):
+    async def run_batch():
+        semaphore = asyncio.Semaphore(2)
+        await asyncio.gather(
+            *(
+                run_topic(
+                    client,
+                    key,
+                    topics[key],
+                    manifest,
+                    str(output_path),
+                    semaphore,
+                    retries,
+                    EventLogOptions(),
+                )
+                for key in manifest.pending(topics)
+            )
+        )
+
+    asyncio.run(run_batch())
+
+
+def test_load_topics_from_a_directory(tmp_path):
+    (tmp_path / "b topic.md").write_text("Second", encoding="utf-8")
+    (tmp_path / "a.txt").write_text("First", encoding="utf-8")
+    (tmp_path / "notes.json").write_text("{}", encoding="utf-8")
+
+    assert load_topics(str(tmp_path), 3, 2) == {
+        "a": topic("First"),
+        "b_topic": topic("Second"),
+    }
+
+
+def test_load_topics_from_a_manifest(tmp_path):
+    (tmp_path / "queries").mkdir()
+    (tmp_path / "queries" / "fines.txt").write_text("EU AI act", encoding="utf-8")
+    manifest = tmp_path / "topics.jsonl"
+    manifest.write_text(
+        "\n".join(
+            [
+                json.dumps({"query": "Inline", "max_loops": 5}),
+                "",
+                json.dumps({"file": "queries/fines.txt"}),
+                json.dumps({"id": "named/one", "query": "Named"}),
+            ]
+        ),
+        encoding="utf-8",
+    )
+
+    assert load_topics(str(manifest), 3, 2) == {
+        "topic_1": topic("Inline", max_loops=5),
+        "fines": topic("EU AI act"),
+        "named_one": topic("Named"),
+    }
+
+
+def test_load_topics_rejects_duplicate_ids(tmp_path):
+    manifest = tmp_path / "topics.jsonl"
+    manifest.write_text(
+        json.dumps({"id": "same", "query": "a"})
+        + "\n"
+        + json.dumps({"id": "same", "query": "b"}),
+        encoding="utf-8",
+    )
+
+    with pytest.raises(ValueError, match="Duplicate topic id: same"):
+        load_topics(str(manifest), 3, 2)
+
+
+def test_manifest_survives_a_restart(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    manifest = BatchManifest(path)
+    manifest.add("a", topic("A"))
+    manifest.update("a", status="done")
+    manifest.add("a", topic("A", max_loops=9))
+
+    reloaded = BatchManifest(path)
+
+    assert reloaded.topics == {
+        "a": {"status": "done", "attempts": 0, "initial_queries": 3, "max_loops": 2}
+    }
+    assert not (tmp_path / "manifest.json.tmp").exists()
+
+
+def test_resume_skips_done_topics_and_reruns_the_others(tmp_path):
+    topics = {key: topic(key) for key in ("done", "running", "failed", "pending")}
+    manifest = BatchManifest(str(tmp_path / "manifest.json"))
+    for key, value in topics.items():
+        manifest.add(key, value)
+    manifest.update("done", status="done")
+    manifest.update("running", status="running", attempts=1)
+    manifest.update("failed", status="failed", attempts=1, error="Boom")
+    client = StubClient()
+
+    run(client, BatchManifest(manifest.path), topics, tmp_path)
+
+    assert sorted(client.queries) == ["failed", "pending", "running"]
+    resumed = BatchManifest(manifest.path).topics
+    assert {key: value["status"] for key, value in resumed.items()} == dict.fromkeys(
+        topics, "done"
+    )
+    assert resumed["failed"]["attempts"] == 2
+    assert resumed["failed"]["error"] is None
+    assert resumed["pending"]["stop_reason"] == "sufficient"
+    assert (tmp_path / "pending.txt").exists()
+
+
+def test_failed_topic_is_retried_then_recorded(tmp_path):
+    topics = {"flaky": topic("flaky"), "broken": topic("broken")}
+    manifest = BatchManifest(str(tmp_path / "manifest.json"))
+    for key, value in topics.items():
+        manifest.add(key, value)
+    client = StubClient(failures=["flaky", "broken", "broken"])
+
+    run(client, manifest, topics, tmp_path, retries=1)
+
+    assert manifest.topics["flaky"]["status"] == "done"
+    assert manifest.topics["flaky"]["attempts"] == 2
+    assert manifest.topics["broken"]["status"] == "failed"
+    assert manifest.topics["broken"]["attempts"] == 2
+    assert manifest.topics["broken"]["error"] == "ConnectionError: server went away"
+    assert manifest.pending(topics) == ["broken"]
+
+
+def test_build_report(tmp_path):
+    manifest = BatchManifest(str(tmp_path / "manifest.json"))
+    for key, total, answer in [("a", 10.0, 2.0), ("b", 20.0, None), ("c", 30.0, 4.0)]:
+        manifest.add(key, topic(key))
+        timings = {"total_s": total}
+        if answer is not None:
+            timings["time_to_answer_s"] = answer
+        manifest.update(
+            key,
+            status="done",
+            attempts=1,
+            timings=timings,
+            token_usage={"total_tokens": 100},
+        )
+    manifest.add("d", topic("d"))
+    manifest.update("d", status="failed", attempts=2)
+
+    report = build_report(manifest, ["b", "c", "d"], wall_time=25.0, concurrency=2)
+
+    assert report["topics"] == 4
+    assert report["done"] == 3
+    assert report["failed"] == ["d"]
+    assert report["total_tokens"] == 300
+    assert report["topic_time_s"] == {
+        "sum": 60.0,
+        "mean": 20.0,
+        "p50": 20.0,
+        "p95": 30.0,
+        "max": 30.0,
+    }
+    # Only the topics this process ran count towards the speedup
+    assert report["speedup"] == 2.0
+    assert report["time_to_answer_s"] == {"mean": 3.0, "p95": 4.0}
+    assert report["per_topic"]["d"] == {
+        "status": "failed",
+        "attempts": 2,
+        "research_loops": None,
+        "stop_reason": None,
+    }
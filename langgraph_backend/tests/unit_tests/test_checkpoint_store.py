@@ -0,0 +1,128 @@
+import asyncio
+import importlib
+
+import pytest
+
+from agent import checkpoint_store
+from agent.checkpoint_store import BlobCheckpointSaver, compress, decompress
+
+graph_module = importlib.import_module("agent.graph")
+
+INPUT = {
+    "messages": [("user", "EU AI act fines")],
+    "initial_search_query_count": 2,
+    "max_research_loops": 2,
+}
+
+
+@pytest.fixture(params=["zlib", "raw"])
+def saver(request, tmp_path):
+    return BlobCheckpointSaver(
+        str(tmp_path / "checkpoints.sqlite3"), compression=request.param
+    )
+
+
+def run(saver, offline_config, thread_id="thread"):
+    graph = graph_module.builder.compile(checkpointer=saver)
+    config = {
+        **offline_config,
+        "configurable": {**offline_config["configurable"], "thread_id": thread_id},
+    }
+    values = asyncio.run(graph.ainvoke(INPUT, config))
+    return graph, config, values
+
+
+@pytest.mark.parametrize("codec", ["zlib", "zstd", "raw"])
+def test_compress_round_trip(codec):
+    if codec == "zstd":
+        pytest.importorskip("zstandard")
+    data = b"research summary " * 100
+
+    used, compressed = compress(data, codec)
+
+    assert used == codec
+    assert decompress(used, compressed) == data
+    assert compress(b"short", codec) == ("raw", b"short")
+
+
+def test_graph_state_round_trips(saver, offline_config):
+    graph, config, values = run(saver, offline_config)
+
+    state = graph.get_state(config)
+
+    assert {key: state.values[key] for key in values} == values
+    assert state.next == ()
+    history = list(graph.get_state_history(config))
+    assert len(history) > 5
+    assert history[0].values == state.values
+    assert not history[-1].values.get("messages")
+
+
+def test_threads_share_blobs(saver, offline_config):
+    run(saver, offline_config, "first")
+    one_thread = saver.stats()
+    run(saver, offline_config, "second")
+    two_threads = saver.stats()
+
+    assert two_threads["logical_bytes"] > 1.9 * one_thread["logical_bytes"]
+    assert two_threads["blobs"] < 2 * one_thread["blobs"]
+    assert two_threads["stored_bytes"] < 2 * one_thread["stored_bytes"]
+    assert two_threads["stored_bytes"] < two_threads["logical_bytes"]
+
+
+def test_gc_keeps_the_latest_checkpoints_loadable(saver, offline_config):
+    graph, config, values = run(saver, offline_config)
+    checkpoints = saver.stats()["threads"]["thread"]["checkpoints"]
+
+    deleted = saver.gc(keep_last=1, vacuum=True)
+
+    assert deleted["checkpoints"] == checkpoints - 1
+    assert deleted["blobs"] > 0
+    assert saver.stats()["threads"]["thread"]["checkpoints"] == 1
+    assert BlobCheckpointSaver(saver.path).get_tuple(config) is not None
+    state = graph.get_state(config)
+    assert {key: state.values[key] for key in values} == values
+    assert saver.gc() == {
+        "checkpoints": 0,
+        "writes": 0,
+        "channel_versions": 0,
+        "blobs": 0,
+    }
+
+
+def test_delete_thread(saver, offline_config):
+    graph, config, _ = run(saver, offline_config)
+
+    saver.delete_thread("thread")
+
+    assert saver.get_tuple(config) is None
+    assert saver.gc()["blobs"] > 0
+    assert saver.stats()["blobs"] == 0
+
+
+def test_list_limits_in_sql_without_a_filter(saver, offline_config):
+    _, config, _ = run(saver, offline_config)
+    everything = list(saver.list(config))
+    statements = []
+    saver._conn.set_trace_callback(statements.append)
+
+    latest = list(saver.list(config, limit=2))
+
+    assert [t.config for t in latest] == [t.config for t in everything[:2]]
+    assert any("LIMIT" in statement for statement in statements)
+
+
+def test_list_filters_page_by_page(saver, offline_config, monkeypatch):
+    monkeypatch.setattr(checkpoint_store, "LIST_PAGE_SIZE", 2)
+    _, config, _ = run(saver, offline_config)
+    loops = [t for t in saver.list(config) if t.metadata["source"] == "loop"]
+
+    filtered = list(saver.list(config, filter={"source": "loop"}, limit=3))
+    statements = []
+    saver._conn.set_trace_callback(statements.append)
+    unlimited = list(saver.list(config, filter={"source": "loop"}))
+
+    assert len(loops) > 3
+    assert [t.config for t in filtered] == [t.config for t in loops[:3]]
+    assert [t.config for t in unlimited] == [t.config for t in loops]
+    assert not any("LIMIT" in statement for statement in statements)
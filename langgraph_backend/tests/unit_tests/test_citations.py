@@ -0,0 +1,166 @@
+"""The linear-time citation helpers must match the original implementations."""
+
+import random
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from agent.utils import get_citations, insert_citation_markers, resolve_urls
+
+
+def legacy_insert_citation_markers(text, citations_list):
+    # The original slice-per-citation algorithm, with markers in the `[label](short_url)` format
+    sorted_citations = sorted(
+        citations_list, key=lambda c: (c["end_index"], c["start_index"]), reverse=True
+    )
+    modified_text = text
+    for citation_info in sorted_citations:
+        end_idx = citation_info["end_index"]
+        marker_to_insert = ""
+        for segment in citation_info["segments"]:
+            marker_to_insert += f" [{segment['label']}]({segment['short_url']})"
+        modified_text = (
+            modified_text[:end_idx] + marker_to_insert + modified_text[end_idx:]
+        )
+    return modified_text
+
+
+def legacy_get_citations(response_message, resolved_urls_map):
+    # The original list-index label lookup
+    citations = []
+    metadata = response_message.response_metadata.get("grounding_metadata", {})
+    grounding_chunks = metadata.get("grounding_chunks", [])
+    for support in metadata.get("grounding_supports", []):
+        segment = support.get("segment", {})
+        end_index = segment.get("end_index")
+        if end_index is None:
+            continue
+        citation = {
+            "start_index": segment.get("start_index", 0),
+            "end_index": end_index,
+            "segments": [],
+        }
+        for ind in support.get("grounding_chunk_indices", []):
+            try:
+                chunk = grounding_chunks[ind]
+                uri = chunk.get("web", {}).get("uri")
+                resolved_url = resolved_urls_map.get(uri, None)
+                if resolved_url:
+                    citation["segments"].append(
+                        {
+                            "label": str(
+                                len(resolved_urls_map)
+                                - list(resolved_urls_map.keys()).index(uri)
+                            ),
+                            "short_url": resolved_url,
+                            "value": uri,
+                            "title": chunk.get("web", {}).get("title"),
+                        }
+                    )
+            except (IndexError, AttributeError, KeyError):
+                pass
+        citations.append(citation)
+    return citations
+
+
+def make_response(num_supports: int, seed: int) -> AIMessage:
+    """A grounded response with `num_supports` supports over ~num_supports/2 sources."""
+    rng = random.Random(seed)
+    num_chunks = max(1, num_supports // 2)
+    text = " ".join(
+        f"Sentence {i} about the topic with some detail."
+        for i in range(num_supports * 2)
+    )
+    chunks = [
+        {
+            "web": {
+                "uri": f"https://example.com/{rng.randrange(num_chunks * 2)}",
+                "title": f"t{i}",
+            }
+        }
+        for i in range(num_chunks)
+    ]
+    supports = []
+    for _ in range(num_supports):
+        end = rng.randrange(1, len(text) + 1)
+        supports.append(
+            {
+                "segment": {"start_index": rng.randrange(end), "end_index": end},
+                "grounding_chunk_indices": rng.sample(
+                    range(num_chunks), min(3, num_chunks)
+                ),
+            }
+        )
+    # Repeat a few positions exactly to exercise tie ordering
+    supports.extend(supports[: num_supports // 10])
+    return AIMessage(
+        content=text,
+        response_metadata={
+            "grounding_metadata": {
+                "grounding_chunks": chunks,
+                "grounding_supports": supports,
+            }
+        },
+    )
+
+
+@pytest.mark.parametrize("num_supports", [1, 10, 50, 200])
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_legacy_implementations(num_supports, seed):
+    response = make_response(num_supports, seed)
+    resolved = resolve_urls(
+        response.response_metadata["grounding_metadata"]["grounding_chunks"], seed
+    )
+
+    citations = get_citations(response, resolved)
+
+    assert citations == legacy_get_citations(response, resolved)
+    assert insert_citation_markers(
+        response.content, citations
+    ) == legacy_insert_citation_markers(response.content, citations)
+
+
+def test_markers_link_labels_to_short_urls():
+    response = AIMessage(
+        content="Alpha. Beta.",
+        response_metadata={
+            "grounding_metadata": {
+                "grounding_chunks": [
+                    {"web": {"uri": "https://a.example", "title": "a"}},
+                    {"web": {"uri": "https://b.example", "title": "b"}},
+                ],
+                "grounding_supports": [
+                    {
+                        "segment": {"start_index": 0, "end_index": 6},
+                        "grounding_chunk_indices": [0],
+                    },
+                    {
+                        "segment": {"start_index": 7, "end_index": 12},
+                        "grounding_chunk_indices": [0, 1],
+                    },
+                ],
+            }
+        },
+    )
+    resolved = resolve_urls(
+        response.response_metadata["grounding_metadata"]["grounding_chunks"], 3
+    )
+
+    marked = insert_citation_markers(
+        response.content, get_citations(response, resolved)
+    )
+
+    short = "https://vertexaisearch.cloud.google.com/id/3-"
+    assert marked == f"Alpha. [2]({short}0) Beta. [2]({short}0) [1]({short}1)"
+
+
+def test_end_index_past_the_text_is_clamped():
+    citations = [
+        {
+            "start_index": 0,
+            "end_index": 99,
+            "segments": [{"label": "1", "short_url": "u"}],
+        }
+    ]
+
+    assert insert_citation_markers("short", citations) == "short [1](u)"
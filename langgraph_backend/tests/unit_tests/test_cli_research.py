@@ -0,0 +1,101 @@
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parents[2] / "examples"))
+
+from cli_research import EventLogOptions, merge_logs, truncate_payload  # noqa: E402
+
+OPTIONS = EventLogOptions(max_chars=5, max_items=2, max_depth=2)
+
+
+def test_short_payload_is_kept():
+    payload = {"name": "node", "items": [1, 2], "ok": True}
+
+    assert truncate_payload(payload, OPTIONS) == payload
+
+
+def test_long_strings_and_lists_are_cut():
+    assert truncate_payload("abcdefgh", OPTIONS) == "abcde...[+3 chars]"
+    assert truncate_payload(["a", "b", "c", "d"], OPTIONS) == [
+        "a",
+        "b",
+        "...[+2 items]",
+    ]
+    assert truncate_payload(("abcdefgh",), OPTIONS) == ["abcde...[+3 chars]"]
+
+
+def test_deep_nesting_is_summarised():
+    payload = {"a": {"b": {"c": 1}, "list": [[1, 2, 3]]}}
+
+    assert truncate_payload(payload, OPTIONS) == {
+        "a": {"b": "<dict with 1 keys>", "list": "<list with 1 items>"}
+    }
+
+
+def write_lines(path, lines):
+    path.write_text("".join(line + "\n" for line in lines), encoding="utf-8")
+
+
+def client_record(time, message):
+    return json.dumps({"time": time, "source": "client", "message": message})
+
+
+def test_merge_logs_interleaves_by_time(tmp_path):
+    # A rotated client log: the backup holds the older records
+    write_lines(
+        tmp_path / "client.tmp.1",
+        [client_record("2025-01-01 10:00:00,000", "c1")],
+    )
+    write_lines(
+        tmp_path / "client.tmp",
+        [
+            client_record("2025-01-01 10:00:02,000", "c2"),
+            "",
+            client_record("2025-01-01 10:00:04,000", "c3"),
+        ],
+    )
+    write_lines(
+        tmp_path / "server.tmp",
+        [
+            "2025-01-01 10:00:01,000 - SERVER - INFO - s1",
+            "2025-01-01 10:00:03,000 - SERVER - ERROR - s2",
+            "Traceback (most recent call last):",
+            "  ValueError: boom",
+            "2025-01-01 10:00:05,000 - SERVER - INFO - s3",
+        ],
+    )
+    output = tmp_path / "merged.log"
+
+    merge_logs(
+        [str(tmp_path / "client.tmp.1"), str(tmp_path / "client.tmp")],
+        str(tmp_path / "server.tmp"),
+        str(output),
+    )
+
+    records = [
+        json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()
+    ]
+    assert [record["message"] for record in records] == [
+        "c1",
+        "s1",
+        "c2",
+        "s2\nTraceback (most recent call last):\n  ValueError: boom",
+        "c3",
+        "s3",
+    ]
+    assert records[3]["level"] == "ERROR"
+    assert {record["source"] for record in records} == {"client", "server"}
+
+
+def test_merge_logs_without_a_server_log(tmp_path):
+    write_lines(
+        tmp_path / "client.tmp", [client_record("2025-01-01 10:00:00,000", "c")]
+    )
+    output = tmp_path / "merged.log"
+
+    merge_logs([str(tmp_path / "client.tmp")], str(tmp_path / "missing"), str(output))
+
+    assert output.read_text(encoding="utf-8") == (
+        client_record("2025-01-01 10:00:00,000", "c") + "\n"
+    )
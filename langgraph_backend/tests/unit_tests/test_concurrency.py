@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest
+
+from agent import concurrency
+from agent.concurrency import (
+    AdaptiveConcurrencyLimiter,
+    get_adaptive_limiter,
+    is_rate_limit_error,
+    remember_limit,
+)
+
+
+def make_limiter(**kwargs):
+    arguments = {
+        "initial_limit": 4,
+        "min_limit": 1,
+        "max_limit": 8,
+        "latency_target": 1.0,
+        "cooldown": 0.0,
+    }
+    return AdaptiveConcurrencyLimiter(**{**arguments, **kwargs})
+
+
+def test_is_rate_limit_error():
+    assert is_rate_limit_error(Exception("429 Too Many Requests"))
+    assert is_rate_limit_error(
+        Exception("google.api_core.exceptions.ResourceExhausted: quota")
+    )
+    assert not is_rate_limit_error(Exception("500 Internal"))
+
+
+def test_window_grows_by_about_one_per_window_of_fast_calls():
+    limiter = make_limiter()
+
+    for _ in range(4):
+        limiter.on_success(0.5)
+
+    assert limiter.window == 4
+    limiter.on_success(0.5)
+    assert limiter.window == 5
+
+
+def test_slow_calls_do_not_grow_the_window():
+    limiter = make_limiter()
+
+    for _ in range(20):
+        limiter.on_success(2.0)
+
+    assert limiter.window == 4
+
+
+def test_rate_limit_halves_the_window_down_to_the_minimum():
+    limiter = make_limiter()
+
+    limiter.on_error(Exception("429"))
+    assert limiter.window == 2
+    limiter.on_error(Exception("429"))
+    limiter.on_error(Exception("429"))
+    assert limiter.window == 1
+
+
+def test_window_stays_within_its_bounds():
+    limiter = make_limiter(initial_limit=100, max_limit=8)
+
+    assert limiter.window == 8
+    for _ in range(100):
+        limiter.on_success(0.1)
+    assert limiter.window == 8
+
+
+def test_cooldown_spaces_decreases(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(concurrency.time, "monotonic", lambda: now[0])
+    limiter = make_limiter(initial_limit=8, cooldown=5.0)
+
+    limiter.on_error(Exception("429"))
+    limiter.on_error(Exception("429"))
+    assert limiter.window == 4
+
+    now[0] += 5
+    limiter.on_error(Exception("429"))
+    assert limiter.window == 2
+
+
+def test_high_error_rate_decreases_the_window():
+    limiter = make_limiter(initial_limit=8, window_size=4)
+
+    limiter.on_error(ValueError("boom"))
+    assert limiter.window == 8
+    limiter.on_error(ValueError("boom"))
+    assert limiter.window == 4
+
+
+def test_slot_limits_calls_in_flight():
+    limiter = make_limiter(initial_limit=2, max_limit=2)
+    peak = 0
+
+    async def call():
+        nonlocal peak
+        async with limiter.slot():
+            peak = max(peak, limiter.in_flight)
+            await asyncio.sleep(0.01)
+
+    async def main():
+        await asyncio.gather(*(call() for _ in range(6)))
+
+    asyncio.run(main())
+
+    assert peak == 2
+    assert limiter.snapshot()["in_flight"] == 0
+
+
+def test_slot_records_errors_and_reraises():
+    limiter = make_limiter()
+
+    async def main():
+        async with limiter.slot():
+            raise RuntimeError("429 quota")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(main())
+
+    assert limiter.window == 2
+    assert limiter.snapshot()["recent_error_rate"] == 1.0
+
+
+def test_limiter_is_per_loop_and_starts_from_the_learned_limit():
+    async def limiter_of_this_loop():
+        return get_adaptive_limiter(4, 1, 8, 123.0)
+
+    first = asyncio.run(limiter_of_this_loop())
+    first.limit = 6.5
+    remember_limit(first)
+    second = asyncio.run(limiter_of_this_loop())
+
+    assert second is not first
+    assert second.limit == 6.5
@@ -0,0 +1,50 @@
+import asyncio
+import copy
+
+from agent.fake_backend import FakeChatModel
+from agent.graph import graph
+
+
+def outcomes(model, prompts):
+    results = []
+    for prompt in prompts:
+        try:
+            results.append(model.invoke(prompt).content)
+        except Exception as e:
+            results.append(str(e))
+    return results
+
+
+def test_injected_errors_repeat_across_instances():
+    prompts = ["alpha", "beta", "alpha", "gamma", "alpha", "beta"] * 3
+
+    first = outcomes(FakeChatModel(rate_limit_probability=0.5), prompts)
+    second = outcomes(FakeChatModel(rate_limit_probability=0.5), prompts)
+    other_seed = outcomes(FakeChatModel(rate_limit_probability=0.5, seed=1), prompts)
+
+    assert first == second
+    assert other_seed != first
+    assert any("429" in result for result in first)
+
+
+def test_retries_of_a_prompt_get_new_draws():
+    results = outcomes(FakeChatModel(rate_limit_probability=0.5), ["alpha"] * 20)
+
+    assert len(set(results)) == 2
+
+
+def test_graph_runs_with_malformed_output_are_reproducible(offline_config):
+    config = copy.deepcopy(offline_config)
+    config["configurable"]["fake_model_malformed_output_probability"] = 0.5
+
+    def answer(thread_id):
+        config["configurable"]["thread_id"] = thread_id
+        values = asyncio.run(
+            graph.ainvoke(
+                {"messages": [("user", "EU AI act fines")], "max_research_loops": 2},
+                config,
+            )
+        )
+        return values["messages"][-1].content
+
+    assert answer("first") == answer("second")
@@ -0,0 +1,125 @@
+import asyncio
+import importlib
+
+from langchain_core.messages import AIMessage
+
+from agent.configuration import Configuration
+from agent.model_registry import ModelSpec
+from agent.usage import UsageMeter
+from agent.utils import SHORT_URL_PREFIX, find_short_urls
+
+graph_module = importlib.import_module("agent.graph")
+
+SPEC = ModelSpec("gemini-2.5-pro", backend="fake")
+
+
+class DroppingModel:
+    """Condenses a batch into one line, keeping only the citations in `keep`."""
+
+    def __init__(self, keep=()):
+        self.keep = set(keep)
+        self.calls = 0
+
+    async def ainvoke(self, prompt):
+        self.calls += 1
+        kept = [url for url in find_short_urls(prompt) if url in self.keep]
+        return AIMessage(
+            content="Condensed. " + " ".join(f"[x]({url})" for url in kept)
+        )
+
+
+def summary(search_id, sources):
+    return f"Finding {search_id}." + "".join(
+        f" [{label}]({SHORT_URL_PREFIX}{search_id}-{label})" for label in sources
+    )
+
+
+def condense(batch, llm, offline_config):
+    return asyncio.run(
+        graph_module.condense_summaries(
+            batch,
+            "question",
+            llm,
+            SPEC,
+            UsageMeter("map_reduce"),
+            Configuration(),
+            offline_config,
+        )
+    )
+
+
+def test_dropped_citations_are_appended(offline_config):
+    batch = [summary(1, [0, 1]), summary(2, [0]), summary(1, [1])]
+
+    condensed = condense(batch, DroppingModel(), offline_config)
+
+    assert find_short_urls(condensed) == [
+        f"{SHORT_URL_PREFIX}1-0",
+        f"{SHORT_URL_PREFIX}1-1",
+        f"{SHORT_URL_PREFIX}2-0",
+    ]
+    assert f"[1-0]({SHORT_URL_PREFIX}1-0)" in condensed
+
+
+def test_kept_citations_are_not_repeated(offline_config):
+    kept = f"{SHORT_URL_PREFIX}5-0"
+
+    condensed = condense(
+        [summary(5, [0, 1])], DroppingModel(keep=[kept]), offline_config
+    )
+
+    assert find_short_urls(condensed) == [kept, f"{SHORT_URL_PREFIX}5-1"]
+
+
+def test_every_citation_survives_each_reduce_level(offline_config):
+    summaries = [summary(search_id, [0, 1, 2]) for search_id in range(9)]
+    cited = {url for text in summaries for url in find_short_urls(text)}
+    llm = DroppingModel()
+
+    reduced = asyncio.run(
+        graph_module.map_reduce_summaries(
+            summaries,
+            "question",
+            llm,
+            SPEC,
+            UsageMeter("map_reduce"),
+            # One summary per prompt forces levels of 9 -> 5 -> 3 -> 2 -> 1
+            Configuration(map_reduce_batch_size=2, map_reduce_summary_threshold=1),
+            offline_config,
+        )
+    )
+
+    assert len(reduced) == 1
+    assert llm.calls == 5 + 3 + 2 + 1
+    assert set(find_short_urls(reduced[0])) == cited
+
+
+def test_graph_answer_keeps_every_searched_citation(offline_config, monkeypatch):
+    reductions = []
+    map_reduce_summaries = graph_module.map_reduce_summaries
+
+    async def recording_map_reduce(summaries, *args):
+        reduced = await map_reduce_summaries(summaries, *args)
+        reductions.append((summaries, reduced))
+        return reduced
+
+    monkeypatch.setattr(graph_module, "map_reduce_summaries", recording_map_reduce)
+    offline_config["configurable"].update(
+        answer_mode="map_reduce", map_reduce_batch_size=2
+    )
+
+    asyncio.run(
+        graph_module.graph.ainvoke(
+            {
+                "messages": [("user", "EU AI act fines")],
+                "initial_search_query_count": 3,
+                "max_research_loops": 2,
+            },
+            offline_config,
+        )
+    )
+
+    ((summaries, reduced),) = reductions
+    cited = {url for text in summaries for url in find_short_urls(text)}
+    assert cited
+    assert cited <= {url for text in reduced for url in find_short_urls(text)}
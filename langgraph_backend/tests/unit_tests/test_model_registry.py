@@ -0,0 +1,49 @@
+import threading
+
+from agent.configuration import Configuration
+from agent.model_registry import ModelClientRegistry, ModelSpec
+
+
+def fake_spec(model_name="gemini-2.5-flash", **kwargs):
+    return ModelSpec(model_name=model_name, backend="fake", **kwargs)
+
+
+def test_warm_up_is_off_by_default():
+    assert Configuration().warm_model_clients is False
+
+
+def test_warm_up_builds_each_client_once():
+    registry = ModelClientRegistry()
+    registry.warm_up([fake_spec(), fake_spec("gemini-2.5-pro")])
+    registry.get(fake_spec())
+
+    assert registry.snapshot()["builds"] == 2
+    assert registry.snapshot()["hits"] == 1
+
+
+def test_warm_up_stops_when_asked():
+    registry = ModelClientRegistry()
+    stop = threading.Event()
+    stop.set()
+    registry.warm_up([fake_spec()], stop)
+
+    assert registry.snapshot()["builds"] == 0
+
+
+def test_warm_up_in_background_finishes():
+    registry = ModelClientRegistry()
+    thread = registry.warm_up_in_background([fake_spec()])
+    thread.join(timeout=10)
+
+    assert not thread.is_alive()
+    assert registry.snapshot()["builds"] == 1
+
+
+def test_tiers_on_the_same_model_share_a_client():
+    registry = ModelClientRegistry()
+
+    registry.get(fake_spec(tier="fast"))
+    registry.get(fake_spec(tier="strong"))
+
+    assert registry.snapshot()["builds"] == 1
+    assert registry.snapshot()["hits"] == 1
@@ -0,0 +1,135 @@
+import asyncio
+import importlib
+import random
+from dataclasses import replace
+
+import pytest
+
+from agent.configuration import Configuration
+from agent.model_registry import ModelClientRegistry, ModelSpec
+from agent.model_routing import FAST, NODE_TIERS, STRONG, node_model, tier_model
+from agent.structured_output import StructuredOutputError, structured_output_stats
+from agent.tools_and_schemas import SearchQueryList
+from agent.usage import UsageMeter
+
+graph_module = importlib.import_module("agent.graph")
+
+
+def test_nodes_route_to_their_tier():
+    configurable = Configuration(fast_model="flash", strong_model="pro")
+
+    assert {node: node_model(configurable, node) for node in NODE_TIERS} == {
+        "generate_query": ("flash", FAST),
+        "web_research": ("flash", FAST),
+        "reflection": ("flash", FAST),
+        "finalize_answer": ("pro", STRONG),
+    }
+    assert tier_model(configurable, STRONG) == "pro"
+
+
+def test_node_override_keeps_the_tier():
+    configurable = Configuration(fast_model="flash", reflection_model="custom")
+
+    assert node_model(configurable, "reflection") == ("custom", FAST)
+
+
+def test_model_specs_carry_tier_and_backend():
+    configurable = Configuration(model_backend="fake")
+
+    specs = graph_module.get_model_specs(configurable)
+
+    assert specs["finalize_answer"].model_name == configurable.strong_model
+    assert specs["finalize_answer"].tier == STRONG
+    assert specs["generate_query"].tier == FAST
+    assert {spec.backend for spec in specs.values()} == {"fake"}
+
+
+def test_run_reports_usage_per_tier(offline_config):
+    values = asyncio.run(
+        graph_module.graph.ainvoke(
+            {"messages": [("user", "EU AI act fines")], "max_research_loops": 1},
+            offline_config,
+        )
+    )
+
+    by_tier = values["usage_summary"]["by_tier"]
+    assert set(by_tier) == {FAST, STRONG}
+    assert by_tier[STRONG]["calls"] >= 1
+
+
+def partial_prompt() -> str:
+    """A prompt the fake model answers with a tool call missing a field on its first draw."""
+    for i in range(100):
+        prompt = f"Plan searches {i}"
+        rng = random.Random(f"0-malformed-{prompt}-0")
+        rng.random()
+        if rng.random() >= 0.5:
+            return prompt
+    raise AssertionError("no prompt draws a partial tool call")
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """A fresh client pool whose strong tier always answers well-formed."""
+    registry = ModelClientRegistry()
+    aget = registry.aget
+
+    async def aget_clean_strong(spec):
+        if spec.tier == STRONG:
+            spec = replace(spec, backend_options=())
+        return await aget(spec)
+
+    monkeypatch.setattr(registry, "aget", aget_clean_strong)
+    monkeypatch.setattr(graph_module, "model_registry", registry)
+    return registry
+
+
+def invoke(offline_config, **configurable):
+    spec = ModelSpec(
+        "gemini-2.5-flash",
+        schema=SearchQueryList,
+        backend="fake",
+        backend_options=(("malformed_output_probability", 1.0),),
+        tier=FAST,
+    )
+    meter = UsageMeter("generate_query")
+    configuration = Configuration(
+        model_backend="fake", structured_output_reask=False, **configurable
+    )
+    parsed = asyncio.run(
+        graph_module.invoke_structured(
+            meter, spec, partial_prompt(), configuration, offline_config
+        )
+    )
+    return parsed, meter
+
+
+def escalation_counts():
+    stats = structured_output_stats.snapshot().get("SearchQueryList", {})
+    return stats.get("escalated", 0), stats.get("failed", 0)
+
+
+def test_invalid_fast_output_escalates_to_the_strong_tier(offline_config, registry):
+    escalated, failed = escalation_counts()
+
+    parsed, meter = invoke(offline_config)
+
+    assert isinstance(parsed, SearchQueryList)
+    assert [(record["model"], record["tier"]) for record in meter.records] == [
+        ("fake:gemini-2.5-flash", FAST),
+        ("fake:gemini-2.5-pro", STRONG),
+    ]
+    assert escalation_counts() == (escalated + 1, failed)
+
+
+@pytest.mark.parametrize(
+    "configurable",
+    [{"model_escalation": False}, {"strong_model": "gemini-2.5-flash"}],
+)
+def test_no_escalation_fails_the_call(offline_config, registry, configurable):
+    escalated, failed = escalation_counts()
+
+    with pytest.raises(StructuredOutputError):
+        invoke(offline_config, **configurable)
+
+    assert escalation_counts() == (escalated, failed + 1)
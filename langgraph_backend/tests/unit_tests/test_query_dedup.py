@@ -0,0 +1,82 @@
+import pytest
+
+from agent.configuration import Configuration
+from agent.convergence import decide_stop_reason
+from agent.query_dedup import dedupe_queries
+
+HISTORY = ["EU AI Act fines for providers", "GDPR enforcement statistics 2024"]
+
+
+def test_threshold_of_one_skips_only_exact_repeats():
+    kept, skipped = dedupe_queries(
+        [
+            "eu ai act fines for providers",
+            "EU AI Act fines for AI providers",
+            "new topic",
+        ],
+        HISTORY,
+        threshold=1.0,
+    )
+
+    assert kept == ["EU AI Act fines for AI providers", "new topic"]
+    assert skipped == [
+        {
+            "query": "eu ai act fines for providers",
+            "matched": "EU AI Act fines for providers",
+            "similarity": 1.0,
+        }
+    ]
+
+
+def test_default_threshold_also_skips_rephrasings():
+    threshold = Configuration().query_dedup_threshold
+
+    kept, skipped = dedupe_queries(
+        ["EU AI Act fines for AI providers", "new topic"], HISTORY, threshold
+    )
+
+    assert kept == ["new topic"]
+    assert skipped[0]["matched"] == "EU AI Act fines for providers"
+    assert skipped[0]["similarity"] >= threshold
+
+
+def test_candidates_are_deduplicated_against_each_other():
+    kept, skipped = dedupe_queries(
+        ["solar subsidies", "Solar subsidies?", "", "  "], [], threshold=1.0
+    )
+
+    assert kept == ["solar subsidies"]
+    assert [record["query"] for record in skipped] == ["Solar subsidies?"]
+
+
+def test_threshold_above_one_disables_dedup():
+    kept, skipped = dedupe_queries(HISTORY, HISTORY, threshold=1.01)
+
+    assert kept == HISTORY
+    assert skipped == []
+
+
+@pytest.mark.parametrize(
+    "kwargs, reason",
+    [
+        ({"is_sufficient": True, "loop": 5}, "sufficient"),
+        ({"loop": 3}, "max_loops"),
+        ({"loop_gain": {"gain": 0.1}, "policy": "gain"}, "low_gain"),
+        ({"loop_gain": {"gain": 0.1}, "policy": "off"}, ""),
+        ({"loop_gain": {"gain": 0.5}, "policy": "gain"}, ""),
+        ({"follow_up_queries": []}, "no_new_queries"),
+        ({}, ""),
+    ],
+)
+def test_decide_stop_reason(kwargs, reason):
+    arguments = {
+        "is_sufficient": False,
+        "loop": 1,
+        "max_loops": 3,
+        "follow_up_queries": ["next query"],
+        "loop_gain": None,
+        "policy": "off",
+        "min_gain": 0.15,
+    }
+
+    assert decide_stop_reason(**{**arguments, **kwargs}) == reason
@@ -0,0 +1,117 @@
+import asyncio
+import os
+
+import pytest
+
+from agent import rate_limit
+from agent.graph import graph
+from agent.rate_limit import (
+    TokenBucketRateLimiter,
+    cached_rate_limiter,
+    get_rate_limiter,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit.time, "time", clock.time)
+    return clock
+
+
+@pytest.fixture
+def limiter(tmp_path):
+    return TokenBucketRateLimiter(str(tmp_path / "rate_limits.sqlite3"))
+
+
+def test_requests_per_minute(limiter, clock):
+    assert [limiter.try_acquire("m", 1, rpm=2, tpm=1000) for _ in range(2)] == [
+        0.0,
+        0.0,
+    ]
+    assert limiter.try_acquire("m", 1, rpm=2, tpm=1000) == pytest.approx(30.0)
+
+    clock.now += 30
+    assert limiter.try_acquire("m", 1, rpm=2, tpm=1000) == 0.0
+
+
+def test_tokens_per_minute(limiter, clock):
+    assert limiter.try_acquire("m", 600, rpm=100, tpm=1000) == 0.0
+    assert limiter.try_acquire("m", 600, rpm=100, tpm=1000) == pytest.approx(12.0)
+
+    clock.now += 12
+    assert limiter.try_acquire("m", 600, rpm=100, tpm=1000) == 0.0
+
+
+def test_prompt_larger_than_the_budget_is_capped(limiter, clock):
+    assert limiter.try_acquire("m", 5000, rpm=100, tpm=1000) == 0.0
+    assert limiter.try_acquire("m", 5000, rpm=100, tpm=1000) == pytest.approx(60.0)
+
+
+def test_models_have_separate_buckets(limiter, clock):
+    assert limiter.try_acquire("a", 1, rpm=1, tpm=1000) == 0.0
+    assert limiter.try_acquire("b", 1, rpm=1, tpm=1000) == 0.0
+    assert limiter.try_acquire("a", 1, rpm=1, tpm=1000) > 0
+
+
+def test_limiters_on_one_file_share_the_buckets(tmp_path, clock):
+    path = str(tmp_path / "rate_limits.sqlite3")
+    first, second = TokenBucketRateLimiter(path), TokenBucketRateLimiter(path)
+
+    assert first.try_acquire("m", 1, rpm=1, tpm=1000) == 0.0
+    assert second.try_acquire("m", 1, rpm=1, tpm=1000) == pytest.approx(60.0)
+
+
+def test_acquire_waits_for_quota_and_records_it(limiter, clock, monkeypatch):
+    sleeps = []
+
+    async def sleep(seconds):
+        sleeps.append(seconds)
+        clock.now += seconds
+
+    monkeypatch.setattr(rate_limit.asyncio, "sleep", sleep)
+    monkeypatch.setattr(rate_limit, "MAX_POLL_INTERVAL", 60.0)
+
+    async def acquire_twice():
+        await limiter.acquire("m", 1, rpm=1, tpm=1000)
+        await limiter.acquire("m", 1, rpm=1, tpm=1000)
+
+    asyncio.run(acquire_twice())
+
+    assert len(sleeps) == 1 and 60 <= sleeps[0] <= 60.1
+    assert limiter.snapshot()["m"]["acquired"] == 2
+    assert limiter.queue_depth() == 0
+
+
+def test_acquire_is_a_no_op_when_disabled(limiter):
+    assert asyncio.run(limiter.acquire("m", 1, rpm=0, tpm=1000)) == 0.0
+    assert limiter.snapshot() == {}
+
+
+def test_get_rate_limiter_is_cached_per_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+
+    limiter = get_rate_limiter("rate_limits.sqlite3")
+
+    assert get_rate_limiter(str(tmp_path / "rate_limits.sqlite3")) is limiter
+    assert cached_rate_limiter("rate_limits.sqlite3") is limiter
+    assert cached_rate_limiter(str(tmp_path / "other.sqlite3")) is None
+
+
+def test_graph_leaves_the_limiter_off_by_default(offline_config):
+    asyncio.run(
+        graph.ainvoke(
+            {"messages": [("user", "EU AI act fines")], "max_research_loops": 1},
+            offline_config,
+        )
+    )
+
+    assert not os.path.exists(offline_config["configurable"]["rate_limit_db_path"])
@@ -0,0 +1,116 @@
+import asyncio
+import importlib
+
+import pytest
+from langchain_core.messages import HumanMessage
+
+from agent.tools_and_schemas import IncrementalReflection, Reflection
+from agent.tracing import end_run_span
+
+graph_module = importlib.import_module("agent.graph")
+
+SUMMARIES = [f"Summary {i} about fines." for i in range(4)]
+
+
+@pytest.fixture
+def prompts(monkeypatch):
+    """Record the reflection prompts and answer them without a model."""
+    sent = []
+
+    async def invoke_structured(meter, model_spec, prompt, configurable, config):
+        sent.append(prompt)
+        fields = {
+            "is_sufficient": False,
+            "knowledge_gap": "More on appeals.",
+            "follow_up_queries": ["EU AI act fine appeals"],
+        }
+        if model_spec.schema is IncrementalReflection:
+            return IncrementalReflection(knowledge_digest="New digest.", **fields)
+        return Reflection(**fields)
+
+    monkeypatch.setattr(graph_module, "invoke_structured", invoke_structured)
+    return sent
+
+
+def reflect(offline_config, reflection_mode, **state):
+    config = {
+        **offline_config,
+        "configurable": {
+            **offline_config["configurable"],
+            "thread_id": f"reflection-{reflection_mode}",
+            "reflection_mode": reflection_mode,
+        },
+    }
+    update = asyncio.run(
+        graph_module.reflection(
+            {
+                "messages": [HumanMessage("EU AI act fines")],
+                "web_research_result": SUMMARIES,
+                "search_query": ["EU AI act fines"],
+                "sources_gathered": [],
+                "research_loop_count": 1,
+                "max_research_loops": 3,
+                **state,
+            },
+            config,
+        )
+    )
+    # Reflection does not end its run; a graph run would end it in finalize_answer
+    end_run_span(config["configurable"]["thread_id"])
+    return update
+
+
+def test_incremental_reflection_sends_the_digest_and_new_summaries(
+    offline_config, prompts
+):
+    update = reflect(
+        offline_config,
+        "incremental",
+        knowledge_digest="Old digest.",
+        reflected_summary_count=2,
+    )
+
+    (prompt,) = prompts
+    assert "Old digest." in prompt
+    assert [summary in prompt for summary in SUMMARIES] == [False, False, True, True]
+    assert update["knowledge_digest"] == "New digest."
+    assert update["reflected_summary_count"] == len(SUMMARIES)
+
+
+def test_first_incremental_reflection_starts_an_empty_digest(offline_config, prompts):
+    update = reflect(offline_config, "incremental")
+
+    (prompt,) = prompts
+    assert "(empty)" in prompt
+    assert all(summary in prompt for summary in SUMMARIES)
+    assert update["reflected_summary_count"] == len(SUMMARIES)
+
+
+def test_full_reflection_resends_every_summary(offline_config, prompts):
+    update = reflect(
+        offline_config,
+        "full",
+        knowledge_digest="Old digest.",
+        reflected_summary_count=2,
+    )
+
+    (prompt,) = prompts
+    assert "Old digest." not in prompt
+    assert all(summary in prompt for summary in SUMMARIES)
+    assert "knowledge_digest" not in update
+    assert "reflected_summary_count" not in update
+
+
+def test_graph_keeps_the_digest_in_sync(offline_config):
+    offline_config["configurable"]["reflection_mode"] = "incremental"
+
+    values = asyncio.run(
+        graph_module.graph.ainvoke(
+            {"messages": [("user", "EU AI act fines")], "max_research_loops": 2},
+            offline_config,
+        )
+    )
+
+    assert values["research_loop_count"] == 2
+    assert values["knowledge_digest"]
+    assert values["reflected_summary_count"] == len(values["web_research_result"])
@@ -0,0 +1,70 @@
+import logging
+
+from agent import run_logging
+from agent.run_logging import RunLogRouter, get_server_logger, stop_run_logging
+
+
+def record(path, message, **extra):
+    record = logging.LogRecord("agent.run_log", logging.INFO, "", 0, message, (), None)
+    record.__dict__.update(run_log_path=str(path), **extra)
+    return record
+
+
+def messages(path):
+    return [line.rsplit(" - ", 1)[-1] for line in path.read_text().splitlines()]
+
+
+def test_records_go_to_the_file_of_their_run(tmp_path):
+    router = RunLogRouter()
+
+    router.handle(record(tmp_path / "a" / "run.log", "first"))
+    router.handle(record(tmp_path / "b.log", "second"))
+    router.handle(record(tmp_path / "a" / "run.log", "third"))
+    router.handle(logging.LogRecord("other", logging.INFO, "", 0, "x", (), None))
+    router.close()
+
+    assert messages(tmp_path / "a" / "run.log") == ["first", "third"]
+    assert messages(tmp_path / "b.log") == ["second"]
+
+
+def test_least_recently_used_file_is_closed_and_reopened(tmp_path):
+    router = RunLogRouter(max_open=2)
+
+    for name in ["a", "b", "a", "c"]:
+        router.handle(record(tmp_path / f"{name}.log", name))
+        assert router.open_files <= 2
+    # "b" was used least recently, so "c" took its place
+    assert sorted(router._handlers) == [
+        str(tmp_path / "a.log"),
+        str(tmp_path / "c.log"),
+    ]
+    router.handle(record(tmp_path / "b.log", "b again"))
+    router.close()
+
+    assert messages(tmp_path / "b.log") == ["b", "b again"]
+    assert router.open_files == 0
+
+
+def test_close_record_closes_only_its_run(tmp_path):
+    router = RunLogRouter()
+    router.handle(record(tmp_path / "a.log", "a"))
+    router.handle(record(tmp_path / "b.log", "b"))
+
+    router.handle(record(tmp_path / "a.log", "", run_log_close=True))
+    router.handle(record(tmp_path / "missing.log", "", run_log_close=True))
+
+    assert list(router._handlers) == [str(tmp_path / "b.log")]
+    assert not (tmp_path / "missing.log").exists()
+    router.close()
+
+
+def test_server_logger_writes_in_the_background(tmp_path):
+    config = {"configurable": {"server_log_path": str(tmp_path / "server.log")}}
+
+    get_server_logger(config).info("from the run")
+    run_logging.close_server_log(config)
+    stop_run_logging()
+
+    (line,) = (tmp_path / "server.log").read_text().splitlines()
+    assert line.endswith(" - SERVER - INFO - from the run")
+    assert run_logging._listener is None
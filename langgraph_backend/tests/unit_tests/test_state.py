@@ -0,0 +1,68 @@
+import asyncio
+
+from agent.graph import graph
+from agent.state import add_unique, merge_sources
+
+
+def test_add_unique_appends_only_new_items_in_order():
+    assert add_unique(["a", "b"], ["b", "c", "a", "d", "c"]) == ["a", "b", "c", "d"]
+
+
+def test_add_unique_keeps_left_unchanged():
+    left = ["a"]
+
+    add_unique(left, ["b"])
+
+    assert left == ["a"]
+
+
+def test_merge_sources_keeps_one_segment_per_url_with_aliases():
+    left = [{"value": "https://a", "short_url": "s/0-0", "label": "2"}]
+    right = [
+        {"value": "https://a", "short_url": "s/1-0", "label": "1"},
+        {"value": "https://b", "short_url": "s/1-1", "label": "1"},
+        {"value": "https://a", "short_url": "s/2-0", "label": "1"},
+        {"value": "https://a", "short_url": "s/1-0", "label": "1"},
+    ]
+
+    merged = merge_sources(left, right)
+
+    assert merged == [
+        {
+            "value": "https://a",
+            "short_url": "s/0-0",
+            "label": "2",
+            "aliases": ["s/1-0", "s/2-0"],
+        },
+        {"value": "https://b", "short_url": "s/1-1", "label": "1"},
+    ]
+    assert "aliases" not in left[0]
+
+
+def test_merge_sources_ignores_repeats_of_the_kept_short_url():
+    source = {"value": "https://a", "short_url": "s/0-0"}
+
+    assert merge_sources([source], [dict(source)]) == [source]
+
+
+def test_web_research_ids_are_unique_across_loops(offline_config):
+    async def web_research_ids():
+        ids = []
+        async for event in graph.astream(
+            {
+                "messages": [("user", "EU AI act fines")],
+                "initial_search_query_count": 3,
+                "max_research_loops": 3,
+            },
+            offline_config,
+            stream_mode="debug",
+        ):
+            payload = event["payload"]
+            if event["type"] == "task" and payload["name"] == "web_research":
+                ids.append(payload["input"]["id"])
+        return ids
+
+    ids = asyncio.run(web_research_ids())
+
+    assert len(ids) > 3
+    assert sorted(ids) == list(range(len(ids)))
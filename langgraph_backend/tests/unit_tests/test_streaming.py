@@ -0,0 +1,94 @@
+import asyncio
+import random
+
+import pytest
+
+from agent.graph import graph
+from agent.utils import SHORT_URL_PREFIX, StreamingUrlResolver, find_short_urls
+
+URLS = {
+    f"{SHORT_URL_PREFIX}{i}-{j}": f"https://source-{i}-{j}.example"
+    for i in range(3)
+    for j in range(12)
+}
+TEXT = (
+    f"Fines reach 7% of turnover [1]({SHORT_URL_PREFIX}0-1). Providers must register "
+    f"[2]({SHORT_URL_PREFIX}2-11) [3]({SHORT_URL_PREFIX}1-0), see https://vertexaisearch.cloud.google.com/ "
+    f"and the unknown [4]({SHORT_URL_PREFIX}9-9). Ends with {SHORT_URL_PREFIX}0-2"
+)
+
+
+EXPECTED = (
+    "Fines reach 7% of turnover [1](https://source-0-1.example). Providers must register "
+    "[2](https://source-2-11.example) [3](https://source-1-0.example), see https://vertexaisearch.cloud.google.com/ "
+    f"and the unknown [4]({SHORT_URL_PREFIX}9-9). Ends with https://source-0-2.example"
+)
+
+
+def stream(chunks):
+    resolver = StreamingUrlResolver(URLS)
+    pieces = [resolver.feed(chunk) for chunk in chunks]
+    pieces.append(resolver.flush())
+    return resolver, pieces
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_any_chunking_resolves_like_the_whole_text(seed):
+    rng = random.Random(seed)
+    cuts = sorted(rng.sample(range(1, len(TEXT)), rng.randrange(1, 40)))
+    chunks = [TEXT[start:end] for start, end in zip([0, *cuts], [*cuts, len(TEXT)])]
+
+    resolver, pieces = stream(chunks)
+
+    assert "".join(pieces) == EXPECTED
+    assert resolver.resolved == [
+        SHORT_URL_PREFIX + suffix for suffix in ("0-1", "2-11", "1-0", "0-2")
+    ]
+    assert resolver.unresolved == [SHORT_URL_PREFIX + "9-9"]
+
+
+def test_character_by_character_stream_never_emits_a_partial_short_url():
+    _, pieces = stream(list(TEXT))
+
+    assert "".join(pieces) == EXPECTED
+    emitted = ""
+    for piece in pieces:
+        emitted += piece
+        assert not emitted.endswith(SHORT_URL_PREFIX[:10])
+        assert not find_short_urls(emitted.replace(SHORT_URL_PREFIX + "9-9", ""))
+
+
+def test_text_without_urls_is_emitted_at_once():
+    resolver = StreamingUrlResolver(URLS)
+
+    assert resolver.feed("plain text. ") == "plain text. "
+    assert resolver.feed("more h") == "more "
+    assert resolver.feed("ere") == "here"
+    assert resolver.flush() == ""
+
+
+def test_graph_streams_the_final_answer_with_resolved_urls(offline_config):
+    async def run():
+        deltas, values = [], None
+        async for mode, chunk in graph.astream(
+            {
+                "messages": [("user", "EU AI act fines")],
+                "initial_search_query_count": 3,
+                "max_research_loops": 2,
+            },
+            offline_config,
+            stream_mode=["custom", "values"],
+        ):
+            if mode == "custom" and "answer_delta" in chunk:
+                deltas.append(chunk["answer_delta"])
+            elif mode == "values":
+                values = chunk
+        return deltas, values
+
+    deltas, values = asyncio.run(run())
+    answer = values["messages"][-1].content
+
+    assert "".join(deltas) == answer
+    assert not find_short_urls(answer)
+    cited = {source["value"] for source in values["sources_gathered"]}
+    assert any(f"]({url})" in answer for url in cited)
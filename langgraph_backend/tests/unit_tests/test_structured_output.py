@@ -0,0 +1,105 @@
+import pytest
+from langchain_core.messages import AIMessage
+
+from agent.structured_output import (
+    loads_lenient,
+    missing_fields_schema,
+    raw_arguments,
+    recover_structured_output,
+    validate_partial,
+)
+from agent.tools_and_schemas import Reflection, SearchQueryList
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        '{"a": 1, "b": [true, null]}',
+        'Here you go:\n```json\n{"a": 1, "b": [true, null]}\n```\nAnything else?',
+        'Sure! {"a": 1, "b": [true, null]} Hope that helps.',
+        '{\n  "a": 1, // one\n  /* list */ "b": [true, null,],\n}',
+        '{"a": 1, "b": [True, None]}',
+        '{"a": 1, "b": [true, null',
+    ],
+)
+def test_loads_lenient_repairs_common_model_mistakes(text):
+    assert loads_lenient(text) == {"a": 1, "b": [True, None]}
+
+
+def test_loads_lenient_keeps_string_contents():
+    assert loads_lenient(
+        '{"url": "http://x.y/a,]", "note": "True // not a comment",}'
+    ) == {
+        "url": "http://x.y/a,]",
+        "note": "True // not a comment",
+    }
+
+
+def test_loads_lenient_closes_a_truncated_string():
+    assert loads_lenient('{"query": ["one", "tw') == {"query": ["one", "tw"]}
+
+
+@pytest.mark.parametrize("text", ["", "   ", "no json here", None])
+def test_loads_lenient_returns_none_without_json(text):
+    assert loads_lenient(text) is None
+
+
+def test_raw_arguments_prefers_tool_calls_then_invalid_calls_then_text():
+    tool_call = AIMessage(
+        content="", tool_calls=[{"name": "f", "args": {"a": 1}, "id": "1"}]
+    )
+    invalid_call = AIMessage(
+        content="",
+        invalid_tool_calls=[
+            {"name": "f", "args": '{"a": 2,}', "id": "1", "error": None}
+        ],
+    )
+    text = AIMessage(content=[{"type": "text", "text": '```json\n{"a": 3}\n```'}])
+
+    assert [raw_arguments(message) for message in (tool_call, invalid_call, text)] == [
+        {"a": 1},
+        {"a": 2},
+        {"a": 3},
+    ]
+    assert raw_arguments(AIMessage(content="[1, 2]")) is None
+
+
+def test_validate_partial_returns_the_object_when_complete():
+    parsed, valid, missing = validate_partial(
+        SearchQueryList, {"query": "one query", "rationale": "why", "extra": 1}
+    )
+
+    assert parsed == SearchQueryList(query=["one query"], rationale="why")
+    assert valid == {"query": ["one query"], "rationale": "why"}
+    assert missing == []
+
+
+def test_validate_partial_lists_missing_and_invalid_fields():
+    parsed, valid, missing = validate_partial(
+        Reflection, {"is_sufficient": "not a bool", "knowledge_gap": "gap"}
+    )
+
+    assert parsed is None
+    assert valid == {"knowledge_gap": "gap"}
+    assert missing == ["is_sufficient", "follow_up_queries"]
+
+
+def test_recover_structured_output_repairs_the_raw_message():
+    parsed = SearchQueryList(query=["q"], rationale="r")
+    assert recover_structured_output(
+        {"parsed": parsed, "parsing_error": None}, SearchQueryList
+    ) == (parsed, {}, [], "parsed")
+
+    raw = AIMessage(content='{"query": ["q"], // the query\n}')
+    result = recover_structured_output(
+        {"raw": raw, "parsed": None, "parsing_error": ValueError()}, SearchQueryList
+    )
+
+    assert result == (None, {"query": ["q"]}, ["rationale"], "repaired")
+
+
+def test_missing_fields_schema_is_cached_and_keeps_only_the_fields():
+    schema = missing_fields_schema(Reflection, ["knowledge_gap"])
+
+    assert missing_fields_schema(Reflection, ["knowledge_gap"]) is schema
+    assert list(schema.model_fields) == ["knowledge_gap"]
@@ -0,0 +1,184 @@
+import asyncio
+import importlib
+import sqlite3
+import time
+
+import pytest
+from langgraph.constants import CONFIG_KEY_CHECKPOINTER
+
+from agent import summary_store
+from agent.checkpoint_store import BlobCheckpointSaver
+from agent.configuration import Configuration
+from agent.summary_store import (
+    SummaryStore,
+    find_summary_refs,
+    get_summary_store,
+    is_summary_ref,
+)
+
+graph_module = importlib.import_module("agent.graph")
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SummaryStore(str(tmp_path / "summaries.sqlite3"))
+
+
+def age(store, ref, seconds):
+    store._conn.execute(
+        "UPDATE summaries SET used_at = ? WHERE ref = ?", (time.time() - seconds, ref)
+    )
+    store._conn.commit()
+
+
+def test_put_and_load_round_trip(store):
+    ref = store.put("a summary")
+
+    assert is_summary_ref(ref)
+    assert store.put("a summary") == ref
+    assert store.load([ref, "inline text", ref]) == [
+        "a summary",
+        "inline text",
+        "a summary",
+    ]
+    assert store.stats()["summaries"] == 1
+
+
+def test_load_of_a_missing_ref_raises(store):
+    ref = store.put("kept")
+    store.gc(max_age_seconds=-1)
+
+    with pytest.raises(KeyError):
+        store.load([ref])
+
+
+def test_gc_deletes_only_summaries_unused_for_max_age(store):
+    old, recent = store.put("old"), store.put("recent")
+    age(store, old, 3600)
+
+    assert store.gc(max_age_seconds=60) == {"summaries": 1}
+    assert store.load([recent]) == ["recent"]
+    with pytest.raises(KeyError):
+        store.load([old])
+
+
+@pytest.mark.parametrize("use", ["load", "put"])
+def test_use_keeps_a_summary_alive(store, use):
+    ref = store.put("summary")
+    age(store, ref, 3600)
+
+    if use == "load":
+        store.load([ref])
+    else:
+        store.put("summary")
+
+    assert store.gc(max_age_seconds=60) == {"summaries": 0}
+
+
+def test_expire_runs_at_most_once_per_interval(store, monkeypatch):
+    ref = store.put("summary")
+    age(store, ref, 3600)
+
+    assert store.expire(0) == {}
+    assert store.expire(60) == {"summaries": 1}
+    age(store, store.put("summary"), 3600)
+    assert store.expire(60) == {}
+
+    monkeypatch.setattr(summary_store, "EXPIRE_INTERVAL_SECONDS", 0)
+    assert store.expire(60) == {"summaries": 1}
+
+
+def test_store_without_used_at_is_migrated(tmp_path):
+    path = str(tmp_path / "summaries.sqlite3")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE summaries (ref TEXT PRIMARY KEY, content TEXT NOT NULL, created_at REAL NOT NULL)"
+    )
+    conn.execute(
+        "INSERT INTO summaries VALUES (?, ?, ?)",
+        (summary_store.summary_ref("old"), "old", time.time() - 3600),
+    )
+    conn.commit()
+    conn.close()
+
+    store = SummaryStore(path)
+
+    assert store.stats()["oldest_use_age_seconds"] >= 3600
+    assert store.gc(max_age_seconds=60) == {"summaries": 1}
+
+
+def test_inline_is_the_default_and_nothing_expires():
+    configuration = Configuration()
+
+    assert configuration.summary_store_mode == "inline"
+    assert configuration.summary_store_ttl_seconds == 0
+
+
+def test_find_summary_refs():
+    ref = summary_store.summary_ref("summary")
+
+    assert find_summary_refs(b"\x92\xa4text\xd9" + ref.encode() + b"\x00") == {ref}
+    assert find_summary_refs(b"summary:sha256:short") == set()
+
+
+def test_gc_keeps_referenced_summaries(store):
+    kept, dropped = store.put("kept"), store.put("dropped")
+    age(store, kept, 3600)
+    age(store, dropped, 3600)
+
+    assert store.gc(max_age_seconds=60, keep=[kept]) == {"summaries": 1}
+    assert store.load([kept]) == ["kept"]
+    assert store.expire(60, keep=[kept]) == {"summaries": 0}
+
+
+def test_gc_never_breaks_a_retained_thread(tmp_path, offline_config):
+    saver = BlobCheckpointSaver(str(tmp_path / "checkpoints.sqlite3"))
+    graph = graph_module.builder.compile(checkpointer=saver)
+    offline_config["configurable"]["summary_store_mode"] = "sqlite"
+    asyncio.run(
+        graph.ainvoke(
+            {"messages": [("user", "EU AI act fines")], "max_research_loops": 1},
+            offline_config,
+        )
+    )
+    refs = graph.get_state(offline_config).values["web_research_result"]
+    store = get_summary_store(offline_config["configurable"]["summary_store_path"])
+    for ref in [*refs, store.put("unreferenced")]:
+        age(store, ref, 3600)
+    configurable = {
+        **offline_config["configurable"],
+        "summary_store_ttl_seconds": 60,
+        CONFIG_KEY_CHECKPOINTER: saver,
+    }
+
+    asyncio.run(
+        graph_module.expire_summaries(
+            Configuration.from_runnable_config({"configurable": configurable}),
+            {"configurable": configurable},
+        )
+    )
+
+    assert all(is_summary_ref(ref) for ref in refs)
+    assert set(refs) <= saver.summary_refs()
+    assert store.stats()["summaries"] == len(set(refs))
+    assert len(store.load(refs)) == len(refs)
+
+
+def test_expiry_is_skipped_without_a_blob_checkpointer(tmp_path, offline_config):
+    configurable = {
+        **offline_config["configurable"],
+        "summary_store_mode": "sqlite",
+        "summary_store_ttl_seconds": 60,
+    }
+    store = get_summary_store(configurable["summary_store_path"])
+    ref = store.put("summary")
+    age(store, ref, 3600)
+
+    asyncio.run(
+        graph_module.expire_summaries(
+            Configuration.from_runnable_config({"configurable": configurable}),
+            {"configurable": configurable},
+        )
+    )
+
+    assert store.load([ref]) == ["summary"]
@@ -0,0 +1,135 @@
+import asyncio
+import importlib
+
+import pytest
+
+from agent import tracing
+from agent.tracing import end_run_span, enter_run, exit_run, run_span
+
+graph_module = importlib.import_module("agent.graph")
+
+
+@pytest.fixture
+def closed_logs(monkeypatch):
+    closed = []
+    monkeypatch.setattr(
+        graph_module,
+        "close_server_log",
+        lambda config: closed.append(config["configurable"]["thread_id"]),
+    )
+    return closed
+
+
+def node_config(offline_config, **configurable):
+    return {
+        **offline_config,
+        "configurable": {**offline_config["configurable"], **configurable},
+    }
+
+
+def test_run_ends_with_its_terminal_node():
+    enter_run("run")
+    assert exit_run("run") is None
+    enter_run("run")
+
+    span = exit_run("run", ends_run=True)
+
+    assert span.status == "OK"
+    assert "run" not in tracing._runs
+
+
+def test_failed_run_ends_after_its_last_active_node():
+    enter_run("run")
+    enter_run("run")
+
+    assert exit_run("run", error=ValueError("search failed")) is None
+    span = exit_run("run", error=asyncio.CancelledError())
+
+    assert span.status == "ERROR"
+    assert span.error == "ValueError: search failed"
+    assert "run" not in tracing._runs
+
+
+def test_end_run_span_keeps_a_recorded_error():
+    enter_run("run")
+    enter_run("run")
+    exit_run("run", error=ValueError("boom"))
+
+    assert end_run_span("run").error == "ValueError: boom"
+    assert end_run_span("run") is None
+
+
+def test_oldest_runs_are_evicted(monkeypatch):
+    monkeypatch.setattr(tracing, "MAX_OPEN_RUNS", 2)
+    first = run_span("first")
+    run_span("second")
+    run_span("third")
+
+    assert list(tracing._runs) == ["second", "third"]
+    assert first.status == "ERROR" and first.attributes["evicted"]
+    end_run_span("second")
+    end_run_span("third")
+
+
+def test_get_run_key():
+    assert graph_module.get_run_key({"metadata": {"run_id": "run"}}) == "run"
+    assert graph_module.get_run_key({"configurable": {"thread_id": "t"}}) == "t"
+    assert graph_module.get_run_key({}) is None
+
+
+def test_failing_branch_does_not_end_the_run_under_its_siblings(
+    offline_config, closed_logs
+):
+    release = asyncio.Event()
+
+    @graph_module.traced_node("web_research", index_key="id")
+    async def branch(state, config):
+        if state["id"] == 0:
+            raise ValueError("search failed")
+        await release.wait()
+        return {}
+
+    async def run_branches():
+        config = node_config(offline_config, thread_id="branches")
+        sibling = asyncio.create_task(branch({"id": 1}, config))
+        await asyncio.sleep(0)
+        with pytest.raises(ValueError):
+            await branch({"id": 0}, config)
+        assert "branches" in tracing._runs
+        assert closed_logs == []
+        sibling.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await sibling
+
+    asyncio.run(run_branches())
+
+    assert "branches" not in tracing._runs
+    assert closed_logs == ["branches"]
+
+
+def test_cancelled_terminal_node_cleans_up(offline_config, closed_logs):
+    @graph_module.traced_node("finalize_answer", ends_run=True)
+    async def finalize(state, config):
+        raise asyncio.CancelledError()
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(finalize({}, node_config(offline_config, thread_id="cancelled")))
+
+    assert "cancelled" not in tracing._runs
+    assert closed_logs == ["cancelled"]
+
+
+def test_nodes_without_an_id_do_not_share_a_run(offline_config, closed_logs):
+    seen = []
+
+    @graph_module.traced_node("generate_query")
+    async def node(state, config):
+        seen.append(tracing.current_span().trace_id)
+        return {}
+
+    config = node_config(offline_config, thread_id=None)
+    asyncio.run(node({}, config))
+    asyncio.run(node({}, config))
+
+    assert len(set(seen)) == 2
+    assert not any(key.startswith("local-") for key in tracing._runs)
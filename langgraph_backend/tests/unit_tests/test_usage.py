@@ -0,0 +1,98 @@
+import ast
+import pathlib
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from agent.usage import MODEL_PRICES, UsageMeter, estimate_cost, usage_from_message
+
+ADK_USAGE = pathlib.Path(__file__).parents[3] / "app" / "usage.py"
+
+
+def test_prices_match_the_adk_stack():
+    if not ADK_USAGE.exists():
+        pytest.skip("the ADK app is not next to this checkout")
+    tree = ast.parse(ADK_USAGE.read_text())
+    adk_prices = next(
+        ast.literal_eval(node.value)
+        for node in tree.body
+        if isinstance(node, ast.Assign)
+        and any(
+            getattr(target, "id", None) == "MODEL_PRICES" for target in node.targets
+        )
+    )
+
+    assert adk_prices == MODEL_PRICES
+
+
+def test_estimate_cost_bills_cached_and_thinking_tokens():
+    usage = {
+        "input_tokens": 1_000_000,
+        "cached_tokens": 400_000,
+        "output_tokens": 100_000,
+        "reasoning_tokens": 50_000,
+    }
+
+    # 600k input at 0.30, 400k cached at 0.075 and 150k output at 2.50 per million
+    assert estimate_cost("gemini-2.5-flash", usage) == pytest.approx(
+        0.18 + 0.03 + 0.375
+    )
+    assert estimate_cost("fake:gemini-2.5-flash", usage) == estimate_cost(
+        "gemini-2.5-flash", usage
+    )
+    assert estimate_cost("unknown-model", usage) == 0.0
+
+
+def test_usage_from_message_reads_langchain_and_vertex_metadata():
+    message = AIMessage(
+        content="answer",
+        usage_metadata={
+            "input_tokens": 10,
+            "output_tokens": 5,
+            "total_tokens": 25,
+            "input_token_details": {"cache_read": 4},
+            "output_token_details": {"reasoning": 10},
+        },
+    )
+    legacy = AIMessage(
+        content="answer",
+        usage_metadata={"input_tokens": 10, "output_tokens": 5, "total_tokens": 25},
+        response_metadata={
+            "usage_metadata": {
+                "thoughts_token_count": 10,
+                "cached_content_token_count": 4,
+            }
+        },
+    )
+
+    expected = {
+        "input_tokens": 10,
+        "output_tokens": 5,
+        "reasoning_tokens": 10,
+        "cached_tokens": 4,
+        "total_tokens": 25,
+    }
+    assert usage_from_message(message) == expected
+    assert usage_from_message(legacy) == expected
+    assert usage_from_message(None) == dict.fromkeys(expected, 0)
+
+
+def test_meter_records_every_call():
+    meter = UsageMeter("web_research", loop=2)
+    message = AIMessage(
+        content="",
+        usage_metadata={"input_tokens": 10, "output_tokens": 5, "total_tokens": 15},
+    )
+
+    meter.record("gemini-2.5-flash", message, latency=0.1234, tier="fast")
+    meter.record("gemini-2.5-flash", cache_hit=True)
+
+    assert [
+        (record["node"], record["loop"], record["cache_hit"])
+        for record in meter.records
+    ] == [
+        ("web_research", 2, False),
+        ("web_research", 2, True),
+    ]
+    assert meter.records[0]["latency"] == 0.123
+    assert meter.records[1]["cost_usd"] == 0.0
@@ -0,0 +1,4 @@
+import os
+
+# Importing app.config asks google.auth for a project unless the fake backend is selected
+os.environ.setdefault("MODEL_BACKEND", "fake")
@@ -0,0 +1,128 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+from google.adk.models import LlmResponse
+from google.genai import types
+
+from app.agent import (
+    CITATION_STREAM_KEY,
+    CiteTagStreamResolver,
+    citation_replacement_callback,
+    stream_citations_callback,
+)
+
+SOURCES = {
+    "src-1": {"title": "EU AI Act", "url": "https://eur-lex.example/ai-act"},
+    "src-12": {"domain": "example.org", "url": "https://example.org/fines"},
+}
+REPORT = (
+    'Fines reach 7% of turnover <cite source="src-1"/>. Member states enforce it '
+    "<cite source='src-12' /> and <b>not</b> <cite source=\"src-99\"/>, as 3 < 7."
+)
+EXPECTED = (
+    "Fines reach 7% of turnover  [EU AI Act](https://eur-lex.example/ai-act). Member states enforce it "
+    " [example.org](https://example.org/fines) and <b>not</b> , as 3 "
+)
+
+
+def stream(chunks):
+    resolver = CiteTagStreamResolver(SOURCES)
+    return [resolver.feed(chunk) for chunk in chunks]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_any_chunking_resolves_like_the_whole_report(seed):
+    # The text from the last "<" on is held back: it is shorter than a tag can be
+    rng = random.Random(seed)
+    cuts = sorted(rng.sample(range(1, len(REPORT)), rng.randrange(1, 40)))
+    chunks = [
+        REPORT[start:end]
+        for start, end in zip([0, *cuts], [*cuts, len(REPORT)], strict=True)
+    ]
+
+    assert "".join(stream(chunks)) == EXPECTED
+
+
+def test_unclosed_tag_is_held_back_until_it_closes():
+    assert stream(["See <cite sou", 'rce="src-1"', "/> now"]) == [
+        "See ",
+        "",
+        " [EU AI Act](https://eur-lex.example/ai-act) now",
+    ]
+
+
+def test_long_text_after_a_lone_angle_bracket_is_released():
+    text = "x < y " + "z" * 100
+
+    assert "".join(stream(["x < y ", "z" * 100])) == text
+
+
+def partial(text, partial=True):
+    return LlmResponse(
+        content=types.Content(role="model", parts=[types.Part(text=text)]),
+        partial=partial,
+    )
+
+
+def test_callback_resolves_partial_responses_per_invocation():
+    context = SimpleNamespace(invocation_id="inv-1", state={"sources": SOURCES})
+    other = SimpleNamespace(invocation_id="inv-2", state={"sources": SOURCES})
+
+    first = stream_citations_callback(context, partial("A <cite source="))
+    interleaved = stream_citations_callback(other, partial("B"))
+    second = stream_citations_callback(context, partial('"src-1"/>.'))
+    final = stream_citations_callback(context, partial(REPORT, partial=False))
+
+    assert first.content.parts[0].text == "A "
+    assert interleaved.content.parts[0].text == "B"
+    assert (
+        second.content.parts[0].text == " [EU AI Act](https://eur-lex.example/ai-act)."
+    )
+    # The final response keeps its tags for citation_replacement_callback
+    assert final is None
+
+
+def test_held_back_text_lives_in_invocation_state():
+    context = SimpleNamespace(invocation_id="inv-4", state={"sources": SOURCES})
+
+    stream_citations_callback(context, partial("A <cite sou"))
+    assert context.state[CITATION_STREAM_KEY] == "<cite sou"
+    stream_citations_callback(context, partial(REPORT, partial=False))
+
+    assert context.state[CITATION_STREAM_KEY] is None
+    # "temp:" state is dropped with the invocation, so a stream that errors or
+    # is cancelled before its final response leaves nothing behind
+    assert CITATION_STREAM_KEY.startswith("temp:")
+
+
+def test_callback_leaves_thoughts_alone():
+    context = SimpleNamespace(invocation_id="inv-3", state={"sources": SOURCES})
+    response = LlmResponse(
+        content=types.Content(
+            role="model",
+            parts=[
+                types.Part(text="<cite", thought=True),
+                types.Part(text='<cite source="src-1"/>'),
+            ],
+        ),
+        partial=True,
+    )
+
+    parts = stream_citations_callback(context, response).content.parts
+
+    assert [part.text for part in parts] == [
+        "<cite",
+        " [EU AI Act](https://eur-lex.example/ai-act)",
+    ]
+
+
+def test_final_replacement_resolves_the_whole_report():
+    context = SimpleNamespace(state={"sources": SOURCES, "final_cited_report": REPORT})
+
+    final = citation_replacement_callback(context).parts[0].text
+
+    assert final == (
+        "Fines reach 7% of turnover  [EU AI Act](https://eur-lex.example/ai-act). Member states enforce it "
+        " [example.org](https://example.org/fines) and <b>not</b>, as 3 < 7."
+    )
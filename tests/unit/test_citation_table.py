@@ -0,0 +1,77 @@
+from app.agent import MAX_CLAIM_CHARS, build_citation_table
+
+
+def source(number, *confidences, title=None, domain="example.com"):
+    return {
+        "short_id": f"src-{number}",
+        "title": title or f"Title {number}",
+        "url": f"https://example.com/{number}",
+        "domain": domain,
+        "supported_claims": [
+            {"text_segment": f"Claim {number}.{i}", "confidence": confidence}
+            for i, confidence in enumerate(confidences)
+        ],
+    }
+
+
+def sources(*items):
+    return {item["short_id"]: item for item in items}
+
+
+def test_table_lists_the_best_claims_in_short_id_order():
+    table = build_citation_table(
+        sources(
+            source(10, 0.4, 0.9, 0.7),
+            source(2, 0.5, title="example.com"),
+        ),
+        claims_per_source=2,
+        token_budget=1000,
+    )
+
+    assert table.splitlines() == [
+        "src-2 | example.com",
+        '  - "Claim 2.0" (0.50)',
+        "src-10 | Title 10 | example.com",
+        '  - "Claim 10.1" (0.90)',
+        '  - "Claim 10.2" (0.70)',
+    ]
+
+
+def test_budget_drops_claims_before_sources():
+    table = build_citation_table(
+        sources(source(1, 0.9, 0.8), source(2, 0.6, 0.5)),
+        claims_per_source=2,
+        # Both headers and each source's best claim, but no second claims
+        token_budget=30,
+    )
+
+    assert table.splitlines() == [
+        "src-1 | Title 1 | example.com",
+        '  - "Claim 1.0" (0.90)',
+        "src-2 | Title 2 | example.com",
+        '  - "Claim 2.0" (0.60)',
+    ]
+
+
+def test_budget_drops_the_weakest_sources():
+    table = build_citation_table(
+        sources(source(1, 0.2), source(2, 0.9)),
+        claims_per_source=1,
+        token_budget=8,
+    )
+
+    assert table.splitlines() == ["src-2 | Title 2 | example.com"]
+
+
+def test_long_and_empty_claims():
+    item = source(1, 0.9, 0.8)
+    item["supported_claims"][0]["text_segment"] = "word\n " * 200
+    item["supported_claims"][1]["text_segment"] = ""
+
+    (_header, claim) = build_citation_table(
+        sources(item), claims_per_source=2, token_budget=1000
+    ).splitlines()
+
+    text = claim.split('"')[1]
+    assert len(text) == MAX_CLAIM_CHARS
+    assert text.endswith("...") and "\n" not in text
@@ -0,0 +1,159 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from app import agent  # noqa: F401  registers the static blocks of every agent
+from app.config import config
+from app.context_cache import (
+    ContextCacheManager,
+    context_cache_mode,
+    get_context_cache,
+    make_context_cache_callback,
+    shared_static_instruction,
+)
+
+SEARCH = [types.Tool(google_search=types.GoogleSearch())]
+
+
+class RecordingBackend:
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    async def create(self, model, system_instruction, tools, ttl_seconds, display_name):
+        self.calls.append(("create", model))
+        if self.fail:
+            raise RuntimeError("500 INTERNAL")
+        return f"cachedContents/{len(self.calls)}"
+
+    async def refresh(self, name, ttl_seconds):
+        self.calls.append(("refresh", name))
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1_000_000.0)
+    monkeypatch.setattr("app.context_cache.time.time", lambda: clock.now)
+    return clock
+
+
+def test_shared_fast_prefix_reaches_the_api_minimum():
+    prefix = shared_static_instruction(config.fast_model)
+
+    assert (len(prefix) + 3) // 4 >= config.context_cache_min_tokens
+    for role in ("plan_generator", "goal_researcher", "follow_up_researcher"):
+        assert f"## Role: {role}\n" in prefix
+
+
+def test_manager_creates_reuses_refreshes_and_recreates(clock):
+    backend = RecordingBackend()
+    manager = ContextCacheManager(
+        backend, ttl_seconds=600, refresh_seconds=60, min_tokens=1
+    )
+
+    def get():
+        return asyncio.run(manager.aget("m", "prefix", SEARCH, "test"))
+
+    first = get()
+    clock.now += 100
+    assert get() == first
+    clock.now += 450
+    assert get() == first
+    clock.now += 700
+    assert get() != first
+
+    assert [call[0] for call in backend.calls] == ["create", "refresh", "create"]
+    assert manager.stats == {
+        "created": 2,
+        "refreshed": 1,
+        "reused": 1,
+        "too_small": 0,
+        "errors": 0,
+    }
+
+
+def test_manager_skips_small_prefixes_and_backs_off_after_errors(clock):
+    backend = RecordingBackend(fail=True)
+    manager = ContextCacheManager(
+        backend, ttl_seconds=600, refresh_seconds=60, min_tokens=2
+    )
+
+    def get(prefix):
+        return asyncio.run(manager.aget("m", prefix, None, "test"))
+
+    assert get("tiny") is None
+    assert get("long enough") is None
+    assert get("long enough") is None
+    clock.now += 61
+    assert get("long enough") is None
+
+    assert len(backend.calls) == 2
+    assert manager.stats["too_small"] == 1
+    assert manager.stats["errors"] == 2
+
+
+def request(model, system_instruction):
+    return LlmRequest(
+        model=model,
+        contents=[types.Content(role="user", parts=[types.Part(text="go")])],
+        config=types.GenerateContentConfig(
+            system_instruction=system_instruction, tools=SEARCH
+        ),
+    )
+
+
+def test_caching_is_off_by_default():
+    assert config.context_cache_mode == "off"
+    assert get_context_cache() is None
+
+
+def test_auto_caches_locally_with_the_fake_backend(monkeypatch):
+    monkeypatch.setattr(config, "context_cache_mode", "auto")
+
+    assert context_cache_mode() == "local"
+
+
+def test_callback_serves_the_static_block_from_the_shared_cache(monkeypatch):
+    monkeypatch.setattr(config, "context_cache_mode", "local")
+    assert get_context_cache() is not None
+    callback = make_context_cache_callback("test-model", "tester", "Static rules.\n")
+    llm_request = request("test-model", "Static rules.\nToday is Monday.")
+
+    asyncio.run(callback(SimpleNamespace(), llm_request))
+
+    assert llm_request.config.cached_content
+    assert llm_request.config.system_instruction is None
+    assert llm_request.config.tools is None
+    assert (
+        llm_request.contents[0].parts[0].text == "Your role: tester\n\nToday is Monday."
+    )
+    assert llm_request.contents[1].parts[0].text == "go"
+
+
+@pytest.mark.parametrize(
+    "model, system_instruction",
+    [("other-model", "Static rules.\nDynamic."), ("test-model", "Other rules.")],
+)
+def test_callback_leaves_other_requests_alone(model, system_instruction, monkeypatch):
+    monkeypatch.setattr(config, "context_cache_mode", "local")
+    callback = make_context_cache_callback("test-model", "tester", "Static rules.\n")
+    llm_request = request(model, system_instruction)
+
+    asyncio.run(callback(SimpleNamespace(), llm_request))
+
+    assert llm_request.config.cached_content is None
+    assert llm_request.config.system_instruction == system_instruction
+    assert len(llm_request.contents) == 1
+
+
+def test_callback_sends_everything_uncached_when_caching_is_off():
+    callback = make_context_cache_callback("test-model", "tester", "Static rules.\n")
+    llm_request = request("test-model", "Static rules.\nToday is Monday.")
+
+    asyncio.run(callback(SimpleNamespace(), llm_request))
+
+    assert llm_request.config.cached_content is None
+    assert llm_request.config.system_instruction == "Static rules.\nToday is Monday."
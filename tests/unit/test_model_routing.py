@@ -0,0 +1,105 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from google.adk.models import LlmRequest, LlmResponse
+from google.genai import types
+
+from app import agent, model_routing
+from app.agent import Feedback
+from app.config import config
+from app.model_routing import make_escalation_callback, remember_request_callback
+
+callback = make_escalation_callback(Feedback)
+
+
+def context():
+    return SimpleNamespace(
+        invocation_id="invocation", agent_name="research_evaluator", state={}
+    )
+
+
+def request(model):
+    return LlmRequest(
+        model=model,
+        contents=[types.Content(role="user", parts=[types.Part(text="evaluate")])],
+        config=types.GenerateContentConfig(response_schema=Feedback),
+    )
+
+
+def response(text):
+    return LlmResponse(
+        content=types.Content(role="model", parts=[types.Part(text=text)])
+    )
+
+
+def run(callback_context, llm_response, model=None):
+    if model is not None:
+        remember_request_callback(callback_context, request(model))
+    return asyncio.run(callback(callback_context, llm_response))
+
+
+@pytest.fixture
+def stats(monkeypatch):
+    counters = {"calls": 0, "escalated": 0, "failed": 0}
+    monkeypatch.setattr(model_routing, "escalation_stats", counters)
+    return counters
+
+
+def test_agents_route_to_their_tier():
+    assert agent.plan_generator.model.model == config.fast_model
+    assert agent.research_evaluator.model.model == config.fast_model
+    assert agent.report_composer.model.model == config.strong_model
+
+
+def test_valid_output_is_kept(stats):
+    valid = response('{"grade": "pass", "comment": "Thorough."}')
+
+    assert run(context(), valid, config.fast_model) is None
+    assert stats == {"calls": 1, "escalated": 0, "failed": 0}
+    assert not model_routing._requests_in_flight
+
+
+def test_invalid_fast_output_is_asked_again_of_the_strong_tier(stats):
+    callback_context = context()
+
+    strong_response = run(
+        callback_context, response('{"grade": "pass"}'), config.fast_model
+    )
+
+    Feedback.model_validate_json(strong_response.content.parts[0].text)
+    assert stats == {"calls": 1, "escalated": 1, "failed": 0}
+    (record,) = callback_context.state["token_usage:research_evaluator"]
+    assert (record["model"], record["tier"]) == (config.strong_model, "strong")
+
+
+@pytest.mark.parametrize("remembered", [True, False])
+def test_invalid_output_without_escalation_fails(stats, monkeypatch, remembered):
+    monkeypatch.setattr(config, "model_escalation", not remembered)
+
+    result = run(
+        context(),
+        response('{"grade": "pass"}'),
+        config.fast_model if remembered else None,
+    )
+
+    assert result is None
+    assert stats == {"calls": 1, "escalated": 0, "failed": 1}
+
+
+def test_strong_tier_output_is_not_escalated_again(stats):
+    assert run(context(), response("not json"), config.strong_model) is None
+    assert stats == {"calls": 1, "escalated": 0, "failed": 1}
+
+
+def test_old_model_names_are_deprecated_aliases(monkeypatch):
+    monkeypatch.setattr(config, "strong_model", config.strong_model)
+    monkeypatch.setattr(config, "fast_model", config.fast_model)
+
+    with pytest.deprecated_call():
+        assert config.critic_model == config.strong_model
+    with pytest.deprecated_call():
+        assert config.worker_model == config.fast_model
+    with pytest.deprecated_call():
+        config.worker_model = "gemini-2.0-flash"
+    assert config.fast_model == "gemini-2.0-flash"
@@ -0,0 +1,59 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from google.adk.models import LlmRequest
+from google.genai import types
+
+from app import rate_limit
+from app.config import config
+from app.rate_limit import TokenBucketRateLimiter, rate_limit_callback
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    path = tmp_path / "rate_limits.sqlite3"
+    monkeypatch.setattr(config, "rate_limit_db_path", str(path))
+    monkeypatch.setattr(rate_limit, "_rate_limiter", None)
+    return path
+
+
+def request(text="hello"):
+    return LlmRequest(
+        model="test-model",
+        contents=[types.Content(role="user", parts=[types.Part(text=text)])],
+    )
+
+
+def call(llm_request):
+    return asyncio.run(
+        rate_limit_callback(SimpleNamespace(agent_name="tester"), llm_request)
+    )
+
+
+def test_no_limit_never_creates_the_store(db_path):
+    assert config.rate_limit_rpm == 0
+
+    call(request())
+
+    assert rate_limit._rate_limiter is None
+    assert not db_path.exists()
+
+
+def test_limit_creates_the_store_on_first_call(db_path, monkeypatch):
+    monkeypatch.setattr(config, "rate_limit_rpm", 60)
+    monkeypatch.setattr(config, "rate_limit_tpm", 100_000)
+
+    call(request())
+    call(request())
+
+    assert db_path.exists()
+    limiter = rate_limit.get_rate_limiter()
+    assert limiter.snapshot()["test-model"]["acquired"] == 2
+
+
+def test_buckets_refuse_requests_over_the_limit(tmp_path):
+    limiter = TokenBucketRateLimiter(str(tmp_path / "rate_limits.sqlite3"))
+
+    assert limiter.try_acquire("model", 10, rpm=1, tpm=1000) == 0
+    assert limiter.try_acquire("model", 10, rpm=1, tpm=1000) > 0
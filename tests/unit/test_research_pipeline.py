@@ -0,0 +1,54 @@
+import asyncio
+
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from app.agent import research_pipeline
+
+PLAN = """* [RESEARCH] Analyze the fines of the EU AI act.
+* [RESEARCH] Identify the enforcement bodies.
+* [RESEARCH] Investigate the timeline.
+* [DELIVERABLE][IMPLIED] Create a summary table."""
+
+
+def run_pipeline() -> dict:
+    async def run():
+        runner = InMemoryRunner(agent=research_pipeline, app_name="app")
+        session = await runner.session_service.create_session(
+            app_name="app", user_id="user", state={"research_plan": PLAN}
+        )
+        async for _ in runner.run_async(
+            user_id="user",
+            session_id=session.id,
+            new_message=types.Content(role="user", parts=[types.Part(text="go")]),
+        ):
+            pass
+        session = await runner.session_service.get_session(
+            app_name="app", user_id="user", session_id=session.id
+        )
+        return session.state
+
+    return asyncio.run(run())
+
+
+def test_parallel_passes_keep_only_the_merged_findings():
+    state = run_pipeline()
+
+    assert not [
+        key
+        for key in state
+        if key.startswith(("section_researcher", "enhanced_search_executor"))
+    ]
+    findings = state["section_research_findings"]
+    headings = [line for line in findings.splitlines() if line.startswith("## ")]
+    assert headings[:3] == [
+        "## Analyze the fines of the EU AI act.",
+        "## Identify the enforcement bodies.",
+        "## Investigate the timeline.",
+    ]
+    # The fake evaluator fails the first evaluation, so one follow-up pass runs
+    assert headings[3:] == ["## Follow-up research"]
+    stages = state["usage_summary"]["by_stage"]
+    assert stages["section_researcher"]["calls"] == 3
+    assert stages["section_researcher_deliverables"]["calls"] == 1
+    assert state["final_cited_report"]
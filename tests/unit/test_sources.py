@@ -0,0 +1,114 @@
+from types import SimpleNamespace
+
+from google.adk.events import Event
+from google.genai import types
+
+from app.agent import collect_research_sources_callback
+
+
+def grounded_event(*claims, branch=None):
+    """An event citing one source per (url, text, confidence) claim."""
+    return Event(
+        author="section_researcher",
+        branch=branch,
+        grounding_metadata=types.GroundingMetadata(
+            grounding_chunks=[
+                types.GroundingChunk(
+                    web=types.GroundingChunkWeb(uri=url, title=url, domain=url)
+                )
+                for url, _, _ in claims
+            ],
+            grounding_supports=[
+                types.GroundingSupport(
+                    segment=types.Segment(text=text),
+                    grounding_chunk_indices=[idx],
+                    confidence_scores=[confidence],
+                )
+                for idx, (_, text, confidence) in enumerate(claims)
+            ],
+        ),
+    )
+
+
+def context(events):
+    return SimpleNamespace(
+        _invocation_context=SimpleNamespace(session=SimpleNamespace(events=events)),
+        state={},
+    )
+
+
+def claims(state, short_id):
+    return [
+        (claim["text_segment"], claim["confidence"])
+        for claim in state["sources"][short_id]["supported_claims"]
+    ]
+
+
+def test_each_call_only_walks_new_events():
+    first = grounded_event(("a.com", "Fines reach 7%.", 0.6))
+    callback_context = context([first])
+    collect_research_sources_callback(callback_context)
+
+    # An event behind the cursor is not looked at again
+    first.grounding_metadata.grounding_chunks[0].web.uri = "changed.com"
+    callback_context._invocation_context.session.events.append(
+        grounded_event(("b.com", "The AI office enforces.", 0.9))
+    )
+    collect_research_sources_callback(callback_context)
+
+    state = callback_context.state
+    assert state["url_to_short_id"] == {"a.com": "src-1", "b.com": "src-2"}
+    assert state["sources_event_cursor"] == 2
+    assert state["sources_event_cursor_id"] == (
+        callback_context._invocation_context.session.events[-1].id
+    )
+
+
+def test_repeated_claims_keep_the_highest_confidence():
+    events = [grounded_event(("a.com", "Fines reach 7%.", 0.6))]
+    callback_context = context(events)
+    collect_research_sources_callback(callback_context)
+
+    events.append(
+        grounded_event(
+            ("a.com", "Fines reach 7%.", 0.8), ("a.com", "Up to 35 million.", 0.5)
+        )
+    )
+    collect_research_sources_callback(callback_context)
+    events.append(grounded_event(("a.com", "Fines reach 7%.", 0.7)))
+    collect_research_sources_callback(callback_context)
+
+    assert claims(callback_context.state, "src-1") == [
+        ("Fines reach 7%.", 0.8),
+        ("Up to 35 million.", 0.5),
+    ]
+
+
+def test_rewritten_session_is_rescanned_without_duplicates():
+    callback_context = context([grounded_event(("a.com", "Fines reach 7%.", 0.6))])
+    collect_research_sources_callback(callback_context)
+
+    callback_context._invocation_context.session.events = [
+        grounded_event(("a.com", "Fines reach 7%.", 0.6)),
+        grounded_event(("b.com", "The AI office enforces.", 0.9)),
+    ]
+    collect_research_sources_callback(callback_context)
+
+    assert claims(callback_context.state, "src-1") == [("Fines reach 7%.", 0.6)]
+    assert claims(callback_context.state, "src-2") == [("The AI office enforces.", 0.9)]
+    assert callback_context.state["sources_event_cursor"] == 2
+
+
+def test_short_ids_follow_branch_order():
+    callback_context = context(
+        [
+            grounded_event(("late.com", "Second task.", 0.5), branch="pipeline.task_2"),
+            grounded_event(("early.com", "First task.", 0.5), branch="pipeline.task_1"),
+        ]
+    )
+    collect_research_sources_callback(callback_context)
+
+    assert callback_context.state["url_to_short_id"] == {
+        "early.com": "src-1",
+        "late.com": "src-2",
+    }
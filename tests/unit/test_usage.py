@@ -0,0 +1,161 @@
+import ast
+import asyncio
+import pathlib
+from types import SimpleNamespace
+
+import pytest
+from google.adk.agents import LlmAgent
+from google.adk.models import LlmRequest, LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from app.fake_llm import FakeLlm
+from app.usage import (
+    MODEL_PRICES,
+    append_usage_record,
+    estimate_cost,
+    record_usage_callback,
+    start_model_timer_callback,
+    summarize_usage,
+    usage_records,
+)
+
+LANGGRAPH_USAGE = (
+    pathlib.Path(__file__).parents[2]
+    / "langgraph_backend"
+    / "src"
+    / "agent"
+    / "usage.py"
+)
+
+
+def test_prices_match_the_langgraph_stack():
+    if not LANGGRAPH_USAGE.exists():
+        pytest.skip("the LangGraph backend is not next to this checkout")
+    tree = ast.parse(LANGGRAPH_USAGE.read_text())
+    langgraph_prices = next(
+        ast.literal_eval(node.value)
+        for node in tree.body
+        if isinstance(node, ast.Assign)
+        and any(
+            getattr(target, "id", None) == "MODEL_PRICES" for target in node.targets
+        )
+    )
+
+    assert langgraph_prices == MODEL_PRICES
+
+
+def test_estimate_cost_bills_cached_and_thinking_tokens():
+    record = {
+        "prompt_tokens": 1_000_000,
+        "cached_tokens": 400_000,
+        "output_tokens": 100_000,
+        "thoughts_tokens": 50_000,
+    }
+
+    # The LangGraph stack bills the same call the same way
+    assert estimate_cost("gemini-2.5-flash", record) == pytest.approx(0.585)
+    assert estimate_cost("unknown-model", record) == 0.0
+
+
+def test_each_agent_appends_to_its_own_key():
+    state = {"research_plan": "..."}
+    usage = types.GenerateContentResponseUsageMetadata(
+        prompt_token_count=100,
+        candidates_token_count=20,
+        thoughts_token_count=5,
+        total_token_count=125,
+    )
+
+    for agent in (
+        "section_researcher_1",
+        "section_researcher_2",
+        "section_researcher_1",
+    ):
+        append_usage_record(
+            SimpleNamespace(agent_name=agent, state=state),
+            "gemini-2.5-flash",
+            0.5,
+            usage,
+        )
+    append_usage_record(
+        SimpleNamespace(agent_name="report_composer", state=state),
+        "gemini-2.5-pro",
+        1.0,
+        None,
+    )
+
+    assert [
+        len(state[key]) for key in sorted(state) if key.startswith("token_usage:")
+    ] == [1, 2, 1]
+    records = usage_records(state)
+    assert len(records) == 4
+    summary = summarize_usage(records)
+    assert summary["total"]["calls"] == 4
+    assert summary["total"]["prompt_tokens"] == 300
+    assert summary["by_stage"]["section_researcher"]["calls"] == 3
+    assert summary["by_model"]["gemini-2.5-pro"]["total_tokens"] == 0
+
+
+def test_timer_records_latency_and_model_of_the_call():
+    callback_context = SimpleNamespace(agent_name="plan_generator", state={})
+
+    start_model_timer_callback(callback_context, LlmRequest(model="gemini-2.5-flash"))
+    record_usage_callback(callback_context, LlmResponse())
+
+    (record,) = callback_context.state["token_usage:plan_generator"]
+    assert record["model"] == "gemini-2.5-flash"
+    assert record["latency"] >= 0
+    assert callback_context.state["temp:model_call:plan_generator"] is None
+
+
+def run_agent(model):
+    """Run one invocation and return the stored session state and the error, if any."""
+    agent = LlmAgent(
+        name="plan_generator",
+        model=model,
+        before_model_callback=start_model_timer_callback,
+        after_model_callback=record_usage_callback,
+    )
+
+    async def run():
+        runner = InMemoryRunner(agent=agent, app_name="app")
+        session = await runner.session_service.create_session(
+            app_name="app", user_id="user"
+        )
+        error = None
+        try:
+            async for _ in runner.run_async(
+                user_id="user",
+                session_id=session.id,
+                new_message=types.Content(role="user", parts=[types.Part(text="go")]),
+            ):
+                pass
+        except Exception as e:
+            error = e
+        session = await runner.session_service.get_session(
+            app_name="app", user_id="user", session_id=session.id
+        )
+        return session.state, error
+
+    return asyncio.run(run())
+
+
+def test_failed_model_call_leaves_no_timer_behind():
+    state, error = run_agent(
+        FakeLlm(model="gemini-2.5-flash", rate_limit_probability=1.0)
+    )
+
+    # The call never reached record_usage_callback; its timer died with the invocation
+    assert "429" in str(error)
+    assert not [key for key in state if key.startswith("temp:")]
+    assert "token_usage:plan_generator" not in state
+
+
+def test_successful_model_call_keeps_only_its_usage():
+    state, error = run_agent(FakeLlm(model="gemini-2.5-flash"))
+
+    assert error is None
+    assert not [key for key in state if key.startswith("temp:")]
+    (record,) = state["token_usage:plan_generator"]
+    assert record["model"] == "gemini-2.5-flash"